@@ -1,5 +1,5 @@
-from flask import Flask, jsonify, render_template, Response
-from binance.client import Client
+from flask import Flask, jsonify, render_template, Response, request
+from binance.client import Client, BaseClient
 import pandas as pd
 import numpy as np
 from datetime import datetime
@@ -12,7 +12,37 @@ import threading
 import signal
 import atexit
 import functools
+import re
+import json
+import gzip
+import zlib
+import sqlite3
+import mmap
+import struct
+import fcntl
+import bisect
+import heapq
+import itertools
+import asyncio
+import websockets
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Brotli je volitelný - bez něj se snapshoty posílají jen jako gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# orjson je volitelný - bez něj se odpovědi Binance dekódují standardním json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Nastavení logování
 logging.basicConfig(
@@ -36,9 +66,11 @@ def add_cors_headers(response):
     response.headers['Access-Control-Allow-Origin'] = '*'
     response.headers['Access-Control-Allow-Headers'] = 'Content-Type,Authorization'
     response.headers['Access-Control-Allow-Methods'] = 'GET,PUT,POST,DELETE,OPTIONS'
-    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
+    # Odpovědi s vlastní cache politikou (verzované snapshoty s ETag) necháme být
+    if 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '0'
     return response
 
 # Globální cache pro výsledky
@@ -48,56 +80,979 @@ results_cache = {
     'last_update': None
 }
 
-# Globální slovník pro ukládání předchozích hodnot RSI pro každý symbol
-previous_rsi_values = {}
+# Proměnná pro sledování běžícího stavu
+running = True
+
+# Hranice bucketů histogramů latence (sekundy)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Hranice bucketů pro dlouhé operace - sken, čekání na rate limit, stáří dat (sekundy)
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+def format_labels(labelnames, labels, extra=()):
+    """Sestaví blok labelů ve formátu Prometheus, např. {endpoint="futures_klines"}"""
+    pairs = list(zip(labelnames, labels)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Counter:
+    """Monotónní čítač s volitelnými labely"""
+    
+    kind = 'counter'
+    
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.values = {}
+        self.lock = threading.Lock()
+    
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+    
+    def render(self, extra=()):
+        with self.lock:
+            values = list(self.values.items())
+        return [f"{self.name}{format_labels(self.labelnames, labels, extra)} {value}" for labels, value in values]
+
+class Gauge:
+    """Okamžitá hodnota - čte se až při scrapu z předané funkce, v hot path nic nestojí"""
+    
+    def __init__(self, name, help_text, read, kind='gauge'):
+        self.name = name
+        self.help = help_text
+        self.read = read
+        # Čítače vedené jinde (např. stats slovníky) se vystaví jako counter
+        self.kind = kind
+    
+    def render(self, extra=()):
+        value = self.read()
+        return [] if value is None else [f"{self.name}{format_labels((), (), extra)} {value}"]
+
+class Histogram:
+    """
+    Histogram ve stylu Prometheus s pevnými buckety.
+    
+    Pozorování jen najde bucket bisekcí a přičte ho pod krátkým zámkem,
+    kumulativní součty se počítají až při scrapu.
+    """
+    
+    kind = 'histogram'
+    
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.labelnames = labelnames
+        self.series = {}
+        self.lock = threading.Lock()
+    
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                # [počty v bucketech včetně +Inf, součet]
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+    
+    def render(self, extra=()):
+        with self.lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self.series.items()]
+        
+        lines = []
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, labels, extra + (('le', bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels, extra)} {total:.6f}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels, extra)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Seznam metrik vystavených na /metrics"""
+    
+    def __init__(self):
+        self.metrics = []
+    
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+    
+    def gauge(self, name, help_text, read, kind='gauge'):
+        return self.register(Gauge(name, help_text, read, kind))
+    
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS, labelnames=()):
+        return self.register(Histogram(name, help_text, buckets, labelnames))
+    
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+    
+    def render(self, extra=()):
+        """
+        Textový formát Prometheus (text/plain; version=0.0.4)
+        
+        Args:
+            extra: Labely přidané ke všem vzorkům jako tuple (název, hodnota)
+        """
+        lines = []
+        for metric in self.metrics:
+            try:
+                samples = metric.render(extra)
+            except Exception as e:
+                logger.error(f"Chyba při čtení metriky {metric.name}: {str(e)}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+
+# Metriky obsluhy HTTP a SSE - každý gunicorn worker vede vlastní a vystavuje je
+# s labely worker a role, metriky skeneru (metrics) jsou ve sdíleném režimu jen jedny
+worker_metrics = MetricsRegistry()
+
+binance_request_seconds = metrics.histogram(
+    'rsi_binance_request_seconds', 'Latence REST požadavků na Binance podle endpointu a timeframe',
+    labelnames=('endpoint', 'interval'))
+binance_request_errors = metrics.counter(
+    'rsi_binance_request_errors_total', 'Neúspěšné REST požadavky na Binance', ('endpoint', 'interval'))
+derived_mismatches = metrics.counter(
+    'rsi_derived_mismatches_total', 'Složené svíčky, které nesouhlasí s REST klines (ověřovací režim)', ('interval',))
+binance_retries = metrics.counter(
+    'rsi_binance_retries_total', 'Opakované pokusy o stažení klines podle důvodu', ('interval', 'reason'))
+rate_limit_wait_seconds = metrics.histogram(
+    'rsi_rate_limit_wait_seconds', 'Čekání požadavků v rate limiteru (jen požadavky, které čekaly)', DURATION_BUCKETS)
+kline_parse_seconds = metrics.histogram(
+    'rsi_kline_parse_seconds', 'Převod odpovědi klines do NumPy bufferů candle_store', labelnames=('interval',))
+rsi_compute_seconds = metrics.histogram(
+    'rsi_compute_seconds', 'Výpočet RSI jedné skupiny symbolů pro jeden timeframe', labelnames=('interval',))
+indicator_compute_seconds = metrics.histogram(
+    'rsi_indicator_compute_seconds', 'Výpočet jednoho indikátoru pro skupinu symbolů jednoho timeframe',
+    labelnames=('indicator', 'interval'))
+scan_duration_seconds = metrics.histogram(
+    'rsi_scan_duration_seconds', 'Doba skenu podle obnovovaných timeframe a rozsahu (all/hot/cold)', DURATION_BUCKETS,
+    ('intervals', 'scope'))
+snapshot_staleness_seconds = metrics.histogram(
+    'rsi_snapshot_staleness_seconds', 'Stáří snímku výsledků v okamžiku, kdy ho nahradil novější', DURATION_BUCKETS)
+rsi_data_requests = worker_metrics.counter(
+    'rsi_get_rsi_data_requests_total', 'Požadavky na /get_rsi_data podle stavového kódu', ('status',))
+api_rsi_requests = worker_metrics.counter(
+    'rsi_api_requests_total', 'Požadavky na /api/rsi podle stavového kódu', ('status',))
+alerts_generated = metrics.counter(
+    'rsi_alerts_total', 'Vytvořené alerty podle typu přechodu', ('kind',))
+alerts_suppressed = metrics.counter(
+    'rsi_alerts_suppressed_total', 'Alerty potlačené cooldownem podle typu přechodu', ('kind',))
+alert_sink_failures = metrics.counter(
+    'rsi_alert_sink_failures_total', 'Dávky alertů, které se nepodařilo doručit, podle sinku', ('sink',))
+alert_dispatch_seconds = metrics.histogram(
+    'rsi_alert_dispatch_seconds', 'Doručení jedné dávky alertů do sinku', labelnames=('sink',))
+
+# Limit váhy požadavků za minutu pro USDⓈ-M futures API (REQUEST_WEIGHT)
+BINANCE_WEIGHT_LIMIT = int(os.getenv('BINANCE_WEIGHT_LIMIT', '2400'))
+
+# Podíl limitu, který si dovolíme využít - rezerva pro ostatní procesy na stejné IP
+BINANCE_WEIGHT_SAFETY = float(os.getenv('BINANCE_WEIGHT_SAFETY', '0.9'))
+
+def request_weight(endpoint, params=None):
+    """
+    Vrátí váhu požadavku podle dokumentace Binance USDⓈ-M futures API
+    
+    Args:
+        endpoint: Název metody klienta (např. "futures_klines")
+        params: Parametry požadavku
+    
+    Returns:
+        Int s váhou požadavku
+    """
+    params = params or {}
+    
+    if endpoint == 'futures_klines':
+        # Váha klines závisí na parametru limit (výchozí limit je 500)
+        limit = int(params.get('limit', 500))
+        if limit < 100:
+            return 1
+        elif limit < 500:
+            return 2
+        elif limit <= 1000:
+            return 5
+        return 10
+    elif endpoint == 'futures_ticker':
+        # Ticker pro jeden symbol je levný, pro všechny symboly stojí 40
+        return 1 if params.get('symbol') else 40
+    elif endpoint == 'futures_exchange_info':
+        return 1
+    
+    return 1
+
+class RequestBlocked(Exception):
+    """Rate limiter je pozastavený (rate limit nebo ban) a volající nechce čekat"""
+    
+    def __init__(self, retry_after):
+        super().__init__(f"Požadavky jsou pozastavené ještě {retry_after:.0f} s")
+        self.retry_after = retry_after
+
+class RateLimiter:
+    """
+    Token bucket pro váhu požadavků na Binance sdílený všemi REST voláními.
+    
+    Bucket rozkládá požadavky rovnoměrně v čase, minutové okno zarovnané na celé
+    minuty odpovídá počítání na straně Binance a hlavička X-MBX-USED-WEIGHT-1M
+    z odpovědí ho průběžně koriguje, takže se k limitu přiblížíme, ale nepřekročíme ho.
+    """
+    
+    def __init__(self, limit_per_minute, safety=0.9, burst_seconds=10):
+        self.budget = max(1, int(limit_per_minute * safety))
+        self.rate = self.budget / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.window = int(time.time() // 60)
+        self.window_used = 0
+        self.blocked_until = 0.0
+        # Globální circuit při banu IP - do jeho konce nemá smysl posílat žádné požadavky
+        self.banned_until = 0.0
+        self.lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'weight': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'server_used_weight': None,
+            'rate_limit_responses': 0,
+            'bans': 0
+        }
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        
+        window = int(time.time() // 60)
+        if window != self.window:
+            self.window = window
+            self.window_used = 0
+        return now
+    
+    def acquire(self, weight=1, fail_fast=False):
+        """
+        Zablokuje volající vlákno, dokud není v rozpočtu místo pro požadavek dané váhy
+        
+        Args:
+            weight: Váha požadavku
+            fail_fast: Při pozastavení (429/418) nečekat a vyhodit RequestBlocked
+        """
+        waited = 0.0
+        
+        while True:
+            with self.lock:
+                now = self._refill()
+                
+                if now < self.blocked_until:
+                    wait_time = self.blocked_until - now
+                    if fail_fast:
+                        raise RequestBlocked(wait_time)
+                elif self.window_used + weight > self.budget:
+                    # Minutové okno je vyčerpané - čekáme na začátek další minuty
+                    wait_time = 60 - (time.time() % 60) + 0.05
+                elif self.tokens < min(weight, self.capacity):
+                    wait_time = (min(weight, self.capacity) - self.tokens) / self.rate
+                else:
+                    self.tokens -= weight
+                    self.window_used += weight
+                    self.stats['requests'] += 1
+                    self.stats['weight'] += weight
+                    if waited > 0:
+                        self.stats['waits'] += 1
+                        self.stats['wait_seconds'] = round(self.stats['wait_seconds'] + waited, 3)
+                        rate_limit_wait_seconds.observe(waited)
+                    return waited
+            
+            # Spíme po kratších úsecích, aby se projevil shutdown i nové hlavičky
+            sleep_time = min(wait_time, 1.0)
+            time.sleep(sleep_time)
+            waited += sleep_time
+            
+            if not running:
+                return waited
+    
+    def update_used_weight(self, used_weight):
+        """Sladí lokální stav s vahou, kterou Binance hlásí pro aktuální minutu"""
+        with self.lock:
+            self._refill()
+            self.stats['server_used_weight'] = used_weight
+            self.window_used = max(self.window_used, used_weight)
+            self.tokens = min(self.tokens, max(0, self.budget - used_weight))
+    
+    def block(self, seconds, response=False):
+        """
+        Pozastaví všechny požadavky na daný počet sekund
+        
+        Args:
+            response: True při odpovědi 429 od Binance (započítá se do rate_limit_responses)
+        """
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+            if response:
+                self.stats['rate_limit_responses'] += 1
+    
+    def ban(self, seconds):
+        """Otevře globální circuit po banu IP (418) - požadavky se pozastaví a skeny skončí hned"""
+        with self.lock:
+            now = time.monotonic()
+            self.banned_until = max(self.banned_until, now + seconds)
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = 0
+            self.stats['bans'] += 1
+            self.stats['rate_limit_responses'] += 1
+    
+    def blocked_for(self):
+        with self.lock:
+            return max(0.0, self.blocked_until - time.monotonic())
+    
+    def banned_for(self):
+        with self.lock:
+            return max(0.0, self.banned_until - time.monotonic())
+    
+    def snapshot(self):
+        with self.lock:
+            self._refill()
+            return dict(self.stats, budget=self.budget, window_used=self.window_used,
+                        blocked_for=round(max(0.0, self.blocked_until - time.monotonic()), 1),
+                        banned_for=round(max(0.0, self.banned_until - time.monotonic()), 1))
+
+rate_limiter = RateLimiter(BINANCE_WEIGHT_LIMIT, BINANCE_WEIGHT_SAFETY)
+
+def track_used_weight(response, *args, **kwargs):
+    """Response hook pro client.session - čte využitou váhu a Retry-After z futures API"""
+    try:
+        if '/fapi/' not in response.url:
+            return
+        
+        used_weight = response.headers.get('X-MBX-USED-WEIGHT-1M')
+        if used_weight is not None:
+            rate_limiter.update_used_weight(int(used_weight))
+        
+        if response.status_code in (418, 429):
+            # 429 = rate limit, 418 = IP ban; Retry-After udává čekání v sekundách
+            retry_after = int(response.headers.get('Retry-After', 60 if response.status_code == 429 else 300))
+            if response.status_code == 418:
+                rate_limiter.ban(retry_after)
+            else:
+                rate_limiter.block(retry_after, response=True)
+            logger.warning(f"Binance vrátil {response.status_code}, pozastavuji požadavky na {retry_after} s")
+    except Exception as e:
+        logger.error(f"Chyba při čtení hlaviček rate limitu: {str(e)}")
+
+# Maximální počet souběžně běžících požadavků na klines
+FETCH_CONCURRENCY = max(1, int(os.getenv('FETCH_CONCURRENCY', '8')))
+
+# Počet keep-alive spojení na Binance - fetch engine a k tomu seznam symbolů a ticker
+HTTP_POOL_SIZE = max(1, int(os.getenv('HTTP_POOL_SIZE', str(FETCH_CONCURRENCY + 2))))
+
+# Timeout navázání spojení a čtení odpovědi (sekundy)
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '3.05'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '10'))
+
+class CountingHTTPConnection(HTTPConnection):
+    """Spojení urllib3, které započítá každé nové TCP spojení"""
+    
+    def connect(self):
+        super().connect()
+        http_transport.connected(tls=False)
+
+class CountingHTTPSConnection(HTTPSConnection):
+    """Spojení urllib3, které započítá každé nové TCP spojení a TLS handshake"""
+    
+    def connect(self):
+        super().connect()
+        http_transport.connected(tls=True)
+
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = CountingHTTPConnection
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = CountingHTTPSConnection
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter, jehož pooly počítají navázaná spojení"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool
+        }
+
+class BinanceTransport:
+    """
+    Transportní vrstva nad client.session.
+    
+    Výchozí adapter requests drží jen 10 spojení a nadbytečná po požadavku
+    zahazuje, takže souběžný fetch engine navazoval stále nová (TLS) spojení.
+    Pool je proto velký jako souběžnost, spojení zůstávají keep-alive mezi skeny
+    a timeout je rozdělený na navázání spojení a čtení odpovědi. Počítá požadavky
+    a nově navázaná spojení - z nich je vidět míra znovupoužití spojení.
+    """
+    
+    def __init__(self, pool_size, connect_timeout, read_timeout):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.adapter = None
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'connections': 0, 'tls_handshakes': 0, 'resets': 0}
+    
+    def install(self, session):
+        """Nastaví session Binance klienta - pool spojení, timeouty a hooky odpovědí"""
+        self.adapter = CountingHTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size, max_retries=0)
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+        session.request = functools.partial(session.request, timeout=self.timeout)
+        session.hooks['response'].append(self.on_response)
+        session.hooks['response'].append(track_used_weight)
+        return session
+    
+    def reset(self):
+        """Zavře spojení v poolu (po opakovaných selháních), nastavení session zůstává"""
+        if self.adapter is not None:
+            self.adapter.poolmanager.clear()
+        with self.lock:
+            self.stats['resets'] += 1
+    
+    def connected(self, tls):
+        with self.lock:
+            self.stats['connections'] += 1
+            if tls:
+                self.stats['tls_handshakes'] += 1
+    
+    def on_response(self, response, *args, **kwargs):
+        """Response hook - počítá požadavky a s orjson nahradí dekódování JSON"""
+        with self.lock:
+            self.stats['requests'] += 1
+        
+        if orjson is not None:
+            content = response.content
+            response.json = lambda **kwargs: orjson.loads(content)
+    
+    def counters(self):
+        with self.lock:
+            return dict(self.stats)
+    
+    def usage_since(self, before):
+        """Požadavky, nová spojení a míra znovupoužití spojení od stavu before (např. za jeden sken)"""
+        now = self.counters()
+        requests_count = now['requests'] - before['requests']
+        connections = now['connections'] - before['connections']
+        return {
+            'requests': requests_count,
+            'connections': connections,
+            'tls_handshakes': now['tls_handshakes'] - before['tls_handshakes'],
+            'reuse_rate': round(1 - connections / requests_count, 3) if requests_count else None
+        }
+    
+    def snapshot(self):
+        return dict(self.usage_since(dict.fromkeys(self.stats, 0)), resets=self.stats['resets'],
+                    pool_size=self.pool_size, timeout=self.timeout, orjson=orjson is not None)
+
+http_transport = BinanceTransport(HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+def configure_client_session(session):
+    """Nastaví session Binance klienta přes transportní vrstvu"""
+    return http_transport.install(session)
+
+def reset_client_session():
+    """Zahodí spojení Binance klienta (po opakovaných selháních) - pool a hooky zůstávají"""
+    http_transport.reset()
+
+def binance_request(endpoint, fail_fast=False, **params):
+    """
+    Zavolá REST metodu Binance klienta až po rezervaci její váhy v rate limiteru
+    
+    Args:
+        endpoint: Název metody klienta (např. "futures_klines")
+        fail_fast: Při pozastavených požadavcích vyhodit RequestBlocked místo čekání
+        **params: Parametry požadavku
+    """
+    rate_limiter.acquire(request_weight(endpoint, params), fail_fast)
+    
+    labels = (endpoint, params.get('interval', ''))
+    started = time.perf_counter()
+    try:
+        return getattr(client, endpoint)(**params)
+    except Exception:
+        binance_request_errors.inc(*labels)
+        raise
+    finally:
+        binance_request_seconds.observe(time.perf_counter() - started, *labels)
 
 # Kontrola API klíčů
 api_key = os.getenv('BINANCE_API_KEY')
 api_secret = os.getenv('BINANCE_API_SECRET')
 
+# Volitelná adresa futures REST API (např. lokální fake server pro testování bez sítě)
+BINANCE_FUTURES_URL = os.getenv('BINANCE_FUTURES_URL')
+
+def create_client_without_ping(key="", secret=""):
+    """Vytvoří Binance klienta bez úvodního pingu - spojení se naváže až při prvním požadavku"""
+    offline_client = Client.__new__(Client)
+    BaseClient.__init__(offline_client, key, secret)
+    return offline_client
+
 # Inicializace Binance klienta - podporuje i provoz bez API klíčů
 try:
-    # Pokud jsou k dispozici API klíče, použijeme je
-    if api_key and api_secret:
-        client = Client(api_key, api_secret)
-        logger.info("API klíče načteny úspěšně, používám autentizované API")
+    if BINANCE_FUTURES_URL:
+        # Lokální server - ping ani status reálného Binance neověřujeme
+        client = create_client_without_ping(api_key or "", api_secret or "")
+        client.FUTURES_URL = BINANCE_FUTURES_URL.rstrip('/')
+        configure_client_session(client.session)
+        logger.info(f"Používám futures API na adrese {client.FUTURES_URL}")
     else:
-        # Pro veřejné API nepotřebujeme klíče
-        client = Client("", "")
-        logger.info("Používám veřejné Binance API bez autentizace")
-    
-    # Modifikujeme timeout pro zvýšení stability
-    client.session.request = functools.partial(client.session.request, timeout=30)
-    
-    # Test připojení
-    client.get_system_status()
-    logger.info("Připojení k Binance API úspěšné")
+        # Pokud jsou k dispozici API klíče, použijeme je
+        if api_key and api_secret:
+            client = Client(api_key, api_secret)
+            logger.info("API klíče načteny úspěšně, používám autentizované API")
+        else:
+            # Pro veřejné API nepotřebujeme klíče
+            client = Client("", "")
+            logger.info("Používám veřejné Binance API bez autentizace")
+        
+        # Modifikujeme timeout pro zvýšení stability a sledujeme váhu požadavků
+        configure_client_session(client.session)
+        
+        # Test připojení
+        client.get_system_status()
+        logger.info("Připojení k Binance API úspěšné")
 except Exception as e:
     logger.error(f"Chyba při připojení k Binance API: {str(e)}")
     # I v případě selhání budeme pokračovat a zkusíme to znovu později
-    client = Client("", "")
-    client.session.request = functools.partial(client.session.request, timeout=30)
+    try:
+        client = Client("", "")
+    except Exception:
+        # Bez sítě selže i ping v konstruktoru - spojení zkusíme až při stahování dat
+        client = create_client_without_ping()
+    configure_client_session(client.session)
     logger.warning("Nouzová inicializace Binance klienta bez autentizace po selhání")
 
-# Proměnná pro sledování běžícího stavu
-running = True
 
 # Proměnná pro sledování změn dat
 data_version = 0
 
+# Maximální počet pokusů o stažení jedněch klines v rámci skenu
+FETCH_MAX_ATTEMPTS = max(1, int(os.getenv('FETCH_MAX_ATTEMPTS', '5')))
+
+# Exponenciální backoff mezi pokusy (sekundy) - počáteční a maximální zpoždění
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '1'))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '30'))
+
+# Po kolika selháních symbolu v řadě se jeho circuit rozpojí a na jak dlouho (sekundy)
+CIRCUIT_FAILURES = max(1, int(os.getenv('CIRCUIT_FAILURES', '3')))
+CIRCUIT_COOLDOWN = float(os.getenv('CIRCUIT_COOLDOWN', '300'))
+
+# Počet párů ve skupině - po každé dokončené skupině se aktualizuje cache
+SCAN_BATCH_SIZE = max(1, int(os.getenv('SCAN_BATCH_SIZE', '20')))
+
+# Časové rámce stahované pro každý symbol
+SCAN_INTERVALS = [Client.KLINE_INTERVAL_1HOUR, Client.KLINE_INTERVAL_15MINUTE, Client.KLINE_INTERVAL_1DAY]
+
+# Prahy 1h RSI pro zařazení do výsledků (možný SHORT / možný LONG)
+RSI_HIGH = float(os.getenv('RSI_HIGH', '55'))
+RSI_LOW = float(os.getenv('RSI_LOW', '28'))
+
+# Dvoufázový sken: 15m a 1d svíčky se stahují jen pro symboly, jejichž 1h RSI splňuje podmínky
+TWO_STAGE_SCAN = os.getenv('TWO_STAGE_SCAN', 'false').lower() == 'true'
+
+# Rezerva v bodech RSI kolem prahů RSI_HIGH/RSI_LOW - symboly, jejichž odhad z tickeru je dál od prahů, se nestahují
+PREFILTER_MARGIN = float(os.getenv('PREFILTER_MARGIN', '5'))
+
+# Odvozené timeframy: přes REST/WebSocket se stahují jen svíčky BASE_INTERVAL a ostatní timeframy
+# ze SCAN_INTERVALS se z nich skládají lokálně na UTC hranicích. Přes REST se stáhnou jen jednou
+# jako historie pro RSI (seed), v ustáleném stavu stačí na symbol jeden požadavek místo tří.
+DERIVED_TIMEFRAMES = os.getenv('DERIVED_TIMEFRAMES', 'false').lower() == 'true'
+
+# Základní timeframe odvozených svíček (15m nebo 1m)
+BASE_INTERVAL = os.getenv('BASE_INTERVAL', Client.KLINE_INTERVAL_15MINUTE)
+if BASE_INTERVAL not in (Client.KLINE_INTERVAL_1MINUTE, Client.KLINE_INTERVAL_15MINUTE):
+    logger.error(f"Nepodporovaný BASE_INTERVAL {BASE_INTERVAL} - používám 15m")
+    BASE_INTERVAL = Client.KLINE_INTERVAL_15MINUTE
+
+# Timeframy skládané z BASE_INTERVAL (prázdné, pokud jsou odvozené timeframy vypnuté)
+DERIVED_INTERVALS = [interval for interval in SCAN_INTERVALS if interval != BASE_INTERVAL] if DERIVED_TIMEFRAMES else []
+
+# Ověřovací režim: kolik symbolů po každém skenu porovnat s REST klines (postupně celý trh, 0 = vypnuto)
+DERIVED_VERIFY_SYMBOLS = max(0, int(os.getenv('DERIVED_VERIFY_SYMBOLS', '0')))
+
+# Povolená relativní odchylka odvozené svíčky od REST (objem je součet zaokrouhlených hodnot)
+DERIVED_VERIFY_TOLERANCE = 1e-6
+
+# Zpoždění obnovy timeframe po uzavření jeho svíčky (sekundy) - Binance svíčku uzavírá s malým zpožděním
+SCHEDULE_CLOSE_DELAY = float(os.getenv('SCHEDULE_CLOSE_DELAY', '2'))
+
+# Interval průběžné obnovy tvořících se svíček mezi uzavřeními (sekundy), 0 = vypnuto.
+# Ceny a RSI tvořících se svíček se tak obnovují každou minutu jako v původní smyčce,
+# ne až při uzavření 15m svíčky. Se zapnutou horkou množinou obnovuje jen studený zbytek trhu.
+PROVISIONAL_INTERVAL = float(os.getenv('PROVISIONAL_INTERVAL', '60'))
+
+# Horká množina - HOT_SET_SIZE symbolů s nejvyšší prioritou se obnovuje každých HOT_REFRESH_INTERVAL sekund (0 = vypnuto)
+HOT_SET_SIZE = max(1, int(os.getenv('HOT_SET_SIZE', '50')))
+HOT_REFRESH_INTERVAL = float(os.getenv('HOT_REFRESH_INTERVAL', '10'))
+
+# Výchozí váhy složek priority symbolu
+DEFAULT_PRIORITY_WEIGHTS = {'distance': 1.0, 'volatility': 0.5, 'staleness': 0.5}
+
+def load_priority_weights():
+    """Váhy priority z PRIORITY_WEIGHTS (formát "distance:1,volatility:0.5,staleness:0.5"), neplatné položky se ignorují"""
+    value = os.getenv('PRIORITY_WEIGHTS', '')
+    if not value.strip():
+        return dict(DEFAULT_PRIORITY_WEIGHTS)
+    
+    weights = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition(':')
+        name = name.strip()
+        try:
+            if name not in DEFAULT_PRIORITY_WEIGHTS:
+                raise ValueError(f"neznámá složka {name}")
+            weights[name] = float(weight)
+        except ValueError as e:
+            logger.error(f"Neplatná položka PRIORITY_WEIGHTS '{item}' - ignoruji ji: {str(e)}")
+    
+    if not weights:
+        logger.error("PRIORITY_WEIGHTS neobsahuje žádnou platnou váhu, používám výchozí")
+        return dict(DEFAULT_PRIORITY_WEIGHTS)
+    return weights
+
+# Váhy složek priority symbolu (chybějící složka má váhu 0)
+PRIORITY_WEIGHTS = load_priority_weights()
+
+# Vzdálenost od prahu v bodech RSI, na které blízkost klesne na 1/e
+PRIORITY_RSI_SCALE = 5.0
+
+# Počet 15m svíček pro odhad nedávné volatility
+PRIORITY_VOLATILITY_WINDOW = 16
+
+# Stáří dat (sekundy), při kterém je složka zastaralosti maximální
+PRIORITY_STALENESS_HORIZON = 900
+
+# Výchozí časový rozpočet obnovy jednotlivých timeframe v sekundách
+DEFAULT_SCAN_TIER_BUDGETS = {'15m': 60.0, '1h': 120.0, '1d': 300.0}
+
+def load_scan_tier_budgets():
+    """
+    Rozpočty timeframe z SCAN_TIER_BUDGETS (formát "15m:60,1h:120,1d:300") nad výchozími.
+    Neplatné položky a neznámé timeframy se zalogují a ignorují.
+    """
+    budgets = dict(DEFAULT_SCAN_TIER_BUDGETS)
+    for item in os.getenv('SCAN_TIER_BUDGETS', '').split(','):
+        if not item.strip():
+            continue
+        interval, _, budget = item.partition(':')
+        interval = interval.strip()
+        try:
+            if interval not in INTERVAL_MS:
+                raise ValueError(f"neznámý timeframe {interval}")
+            budget = float(budget)
+            if budget <= 0:
+                raise ValueError("rozpočet musí být kladný")
+            budgets[interval] = budget
+        except ValueError as e:
+            logger.error(f"Neplatná položka SCAN_TIER_BUDGETS '{item}' - ignoruji ji: {str(e)}")
+    return budgets
+
+# Statistiky posledního dokončeného skenu
+scan_stats = {
+    'last_scan_started': None,
+    'last_scan_duration': None,
+    'intervals': None,
+    'symbols': 0,
+    'processed': 0,
+    'kline_requests': 0,
+    'failed_requests': 0,
+    'concurrency': FETCH_CONCURRENCY,
+    'two_stage': TWO_STAGE_SCAN,
+    'prefilter': None,
+    'http': None,
+    'scope': None
+}
+
+# Poslední pořadí symbolů podle priority (pro /diagnostics)
+priority_stats = {'ranked': 0, 'top': [], 'hot_set': []}
+
+# Režim získávání dat: "rest" (pravidelné stahování) nebo "stream" (WebSocket kline streamy)
+INGESTION_MODE = os.getenv('INGESTION_MODE', 'rest').lower()
+
+# Adresa futures WebSocket API (lze přesměrovat na lokální fake server)
+BINANCE_FUTURES_WS_URL = os.getenv('BINANCE_FUTURES_WS_URL', 'wss://fstream.binance.com')
+
+# Maximální počet streamů na jedno WebSocket spojení
+STREAMS_PER_CONNECTION = max(1, int(os.getenv('STREAMS_PER_CONNECTION', '200')))
+
+# Jak často se ve stream režimu přepočítá RSI změněných symbolů a publikuje cache (sekundy)
+STREAM_PUBLISH_INTERVAL = float(os.getenv('STREAM_PUBLISH_INTERVAL', '2'))
+
+# Počáteční pauza před opakováním neúspěšného backfillu symbolů ve stream režimu (sekundy,
+# při dalších neúspěších se zdvojnásobuje až na 10 minut)
+STREAM_BACKFILL_RETRY = float(os.getenv('STREAM_BACKFILL_RETRY', '30'))
+
+class Indicator:
+    """Indikátor registrovaný pro sken - počítá se vektorově nad maticemi svíček jednoho timeframe"""
+    
+    __slots__ = ('name', 'lookback', 'columns', 'compute', 'description')
+    
+    def __init__(self, name, lookback, columns, compute, description):
+        self.name = name
+        self.lookback = lookback
+        self.columns = columns
+        self.compute = compute
+        self.description = description
+
+# Registr dostupných indikátorů podle názvu
+INDICATOR_REGISTRY = {}
+
+def register_indicator(name, lookback, columns=('close',)):
+    """
+    Dekorátor pro registraci indikátoru. Funkce dostane IndicatorInput se všemi
+    symboly skupiny a vrátí vektor hodnot po poslední (tvořící se) svíčce.
+    
+    Args:
+        name: Název indikátoru (sloupce v /api/rsi jsou "<název>_<timeframe>")
+        lookback: Kolik posledních svíček indikátor potřebuje
+        columns: Sloupce svíček, ze kterých počítá (open, high, low, close, volume)
+    """
+    def decorator(compute):
+        INDICATOR_REGISTRY[name] = Indicator(name, lookback, tuple(columns), compute,
+                                             (compute.__doc__ or '').strip().split('\n')[0])
+        return compute
+    return decorator
+
+class IndicatorInput:
+    """
+    Matice svíček jednoho timeframe (symboly x svíčky) sdílené všemi indikátory
+    jednoho průchodu - společné mezivýsledky (RSI řada, EMA) se spočítají jen jednou
+    """
+    
+    def __init__(self, columns):
+        self.columns = columns
+        self.cache = {}
+    
+    def __getitem__(self, name):
+        return self.columns[name]
+    
+    @property
+    def candles(self):
+        return next(iter(self.columns.values())).shape[1]
+    
+    def cached(self, key, compute):
+        if key not in self.cache:
+            self.cache[key] = compute()
+        return self.cache[key]
+
+def ema_matrix(values, span):
+    """EMA podél osy svíček pro všechny řádky matice (začíná první svíčkou)"""
+    alpha = 2 / (span + 1)
+    result = np.empty_like(values)
+    result[:, 0] = values[:, 0]
+    for i in range(1, values.shape[1]):
+        result[:, i] = alpha * values[:, i] + (1 - alpha) * result[:, i - 1]
+    return result
+
+def ema_spread_matrix(data, fast=9, slow=21):
+    """Rozdíl EMA fast a EMA slow v procentech EMA slow po každé svíčce"""
+    def compute():
+        slow_ema = ema_matrix(data['close'], slow)
+        return (ema_matrix(data['close'], fast) - slow_ema) / slow_ema * 100
+    return data.cached(('ema_spread', fast, slow), compute)
+
+@register_indicator('stoch_rsi', lookback=2 * 14 + 3)
+def stoch_rsi(data, periods=14, smooth=3):
+    """Stochastic RSI - %K vyhlazené přes 3 svíčky (0-100)"""
+    rsi = data.cached(('rsi', periods), lambda: rsi_series_matrix(data['close'], periods))
+    windows = np.lib.stride_tricks.sliding_window_view(rsi[:, -(periods + smooth - 1):], periods, axis=1)
+    lowest = windows.min(axis=2)
+    highest = windows.max(axis=2)
+    current = rsi[:, -smooth:]
+    # Bez rozpětí RSI v okně (plochý trh) je stochastic uprostřed
+    stoch = np.divide(current - lowest, highest - lowest, out=np.full_like(current, 0.5), where=highest > lowest)
+    return stoch.mean(axis=1) * 100
+
+@register_indicator('ema_spread', lookback=3 * 21)
+def ema_spread(data):
+    """Rozdíl EMA 9 a EMA 21 v procentech (kladný = rychlá EMA nad pomalou)"""
+    return ema_spread_matrix(data)[:, -1]
+
+@register_indicator('ema_cross', lookback=3 * 21)
+def ema_cross(data):
+    """Křížení EMA 9 a EMA 21 na poslední svíčce: 1 nahoru, -1 dolů, 0 bez křížení"""
+    spread = ema_spread_matrix(data)
+    previous, current = spread[:, -2], spread[:, -1]
+    return np.where((previous <= 0) & (current > 0), 1.0, np.where((previous >= 0) & (current < 0), -1.0, 0.0))
+
+@register_indicator('atr_pct', lookback=2 * 14 + 1, columns=('high', 'low', 'close'))
+def atr_pct(data, periods=14):
+    """ATR (Wilder) v procentech ceny"""
+    high, low, close = data['high'][:, 1:], data['low'][:, 1:], data['close']
+    previous_close = close[:, :-1]
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - previous_close), np.abs(low - previous_close)))
+    atr = true_range[:, :periods].mean(axis=1)
+    for i in range(periods, true_range.shape[1]):
+        atr = (atr * (periods - 1) + true_range[:, i]) / periods
+    return atr / close[:, -1] * 100
+
+@register_indicator('volume_ratio', lookback=21, columns=('volume',))
+def volume_ratio(data, periods=20):
+    """Objem tvořící se svíčky vůči průměru předchozích 20 svíček"""
+    volume = data['volume']
+    average = volume[:, -(periods + 1):-1].mean(axis=1)
+    return np.divide(volume[:, -1], average, out=np.full(len(average), np.nan), where=average > 0)
+
+def load_enabled_indicators():
+    """Indikátory zapnuté proměnnou INDICATORS (názvy oddělené čárkou)"""
+    enabled = []
+    for name in os.getenv('INDICATORS', '').split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in INDICATOR_REGISTRY:
+            logger.error(f"Neznámý indikátor {name} - dostupné: {', '.join(INDICATOR_REGISTRY)}")
+            continue
+        enabled.append(INDICATOR_REGISTRY[name])
+    return enabled
+
+# Indikátory počítané při skenu navíc k RSI (např. INDICATORS="stoch_rsi,ema_cross,atr_pct")
+ENABLED_INDICATORS = load_enabled_indicators()
+
+# Nejdelší lookback zapnutých indikátorů - tolik posledních svíček se jim předává
+INDICATOR_LOOKBACK = max((indicator.lookback for indicator in ENABLED_INDICATORS), default=0)
+
+# Počet svíček stahovaných při prvním načtení symbolu (seed RSI a lookback indikátorů)
+KLINE_HISTORY = max(50, INDICATOR_LOOKBACK)
+
+# Hloubka ring bufferu svíček pro každý symbol a timeframe
+CANDLE_STORE_DEPTH = max(KLINE_HISTORY, int(os.getenv('CANDLE_STORE_DEPTH', '200')))
+
+# Počet bodů historie RSI a ceny (jeden na svíčku) pro každý symbol a timeframe
+HISTORY_DEPTH = max(2, int(os.getenv('HISTORY_DEPTH', '500')))
+
+# Výchozí a maximální počet bodů řady vracené /history (delší historie se zředí)
+HISTORY_DEFAULT_POINTS = 120
+HISTORY_MAX_POINTS = HISTORY_DEPTH
+
+# Trend RSI: sklon lineární regrese přes posledních TREND_WINDOW svíček (včetně tvořící se)
+TREND_WINDOW = max(2, int(os.getenv('TREND_WINDOW', '5')))
+
+# Sklon (body RSI za svíčku), od kterého je trend "up"/"down"
+TREND_SLOPE_THRESHOLD = float(os.getenv('TREND_SLOPE_THRESHOLD', '0.5'))
+
+# Jak dlouho platí stažený seznam symbolů, než se na pozadí obnoví (sekundy)
+SYMBOL_UNIVERSE_TTL = int(os.getenv('SYMBOL_UNIVERSE_TTL', '3600'))
+
+# Soubor perzistentní cache (SQLite) pro rychlý start po restartu, prázdná hodnota ji vypne
+CANDLE_CACHE_PATH = os.getenv('CANDLE_CACHE_PATH', 'candles.db')
+
+# Perzistentní cache - inicializuje se v restore_state_cache()
+state_cache = None
+
+# Počty odpovědí /get_rsi_data (celý snímek vs. 304 Not Modified) a objem SSE událostí proti celým snímkům
+snapshot_stats = {'full': 0, 'not_modified': 0, 'event_bytes': 0, 'snapshot_bytes': 0}
+
+# Sdílený režim pro více gunicorn workerů: skenuje jen proces držící zámek,
+# ostatní workery čtou jeho snímky ze sdíleného souboru
+SHARED_STATE = os.getenv('SHARED_STATE', 'false').lower() == 'true'
+SCANNER_LOCK_PATH = os.getenv('SCANNER_LOCK_PATH', 'scanner.lock')
+SHARED_SNAPSHOT_PATH = os.getenv('SHARED_SNAPSHOT_PATH', 'snapshot.bin')
+
+# Kolik posledních SSE událostí skener předává workerům (pro navázání klientů bez mezery)
+SHARED_EVENTS = 32
+
+# SSE události nesou změněné řádky (True) místo pouhé notifikace o nových datech
+SSE_DELTAS = os.getenv('SSE_DELTAS', 'true').lower() == 'true'
+
+# Interval SSE heartbeatu (sekundy) a počet posledních událostí pro obnovení přes Last-Event-ID
+SSE_HEARTBEAT = float(os.getenv('SSE_HEARTBEAT', '15'))
+SSE_HISTORY = max(1, int(os.getenv('SSE_HISTORY', '100')))
+
+# Přechody symbolů, ze kterých vznikají alerty (zóna výsledků a shoda všech timeframe)
+ALERT_ZONES = {'high': 'overbought', 'low': 'oversold'}
+ALERT_KIND_NAMES = ('entered_overbought', 'left_overbought', 'entered_oversold', 'left_oversold',
+                    'confluence_overbought', 'confluence_oversold')
+
+# Alerty na straně serveru z přechodů symbolů mezi zónami při každé publikaci výsledků
+ALERTS_ENABLED = os.getenv('ALERTS_ENABLED', 'true').lower() == 'true'
+
+# Odesílané typy alertů (výchozí všechny) a cooldown opakování stejného alertu symbolu (sekundy)
+ALERT_KINDS = [kind.strip() for kind in os.getenv('ALERT_KINDS', '').split(',') if kind.strip()] or list(ALERT_KIND_NAMES)
+ALERT_COOLDOWN = float(os.getenv('ALERT_COOLDOWN', '900'))
+
+# Kapacita fronty alertů každého sinku (při přetečení se nové zahazují) a maximální velikost dávky
+ALERT_QUEUE_SIZE = max(1, int(os.getenv('ALERT_QUEUE_SIZE', '1000')))
+ALERT_BATCH_SIZE = max(1, int(os.getenv('ALERT_BATCH_SIZE', '100')))
+
+# Sinky: webhook (POST JSON {"alerts": [...]}), soubor (JSON lines) a událost 'alert' na /sse
+ALERT_WEBHOOK_URL = os.getenv('ALERT_WEBHOOK_URL', '')
+ALERT_WEBHOOK_TIMEOUT = float(os.getenv('ALERT_WEBHOOK_TIMEOUT', '5'))
+ALERT_WEBHOOK_RETRIES = max(1, int(os.getenv('ALERT_WEBHOOK_RETRIES', '3')))
+ALERT_FILE_PATH = os.getenv('ALERT_FILE_PATH', '')
+ALERT_SSE = os.getenv('ALERT_SSE', 'true').lower() == 'true'
+
+# Symboly se změněnými svíčkami od poslední publikace (stream režim)
+dirty_symbols = set()
+dirty_symbols_lock = threading.Lock()
+
+# Symboly čekající po výpadku WebSocket spojení na doplnění svíček přes REST -
+# jejich události se do té doby nezapracují, aby mezera nevymazala historii
+stream_gaps = set()
+stream_gaps_lock = threading.Lock()
+
+# Perzistentní Wilder RSI stav: (symbol, interval) -> RsiState
+rsi_states = {}
+
+# Generace WebSocket spojení - při změně seznamu symbolů se spojení naváží znovu
+stream_generation = 0
+
+# Statistiky WebSocket streamů
+stream_stats = {
+    'connections': 0,
+    'events': 0,
+    'reconnects': 0,
+    'backfill_pending': 0,
+    'gap_backfills': 0,
+    'restarts': 0,
+    'last_event': None
+}
+
 # Handler pro graceful shutdown
 def shutdown_handler(signum=None, frame=None):
     global running
     logger.info("Přijat signál pro ukončení, provádím graceful shutdown...")
     running = False
+    
+    # Předáme signál i původnímu handleru (např. gunicorn workeru), aby se proces ukončil
+    previous = previous_signal_handlers.get(signum)
+    if callable(previous):
+        previous(signum, frame)
 
 # Registrace signal handlerů
-signal.signal(signal.SIGINT, shutdown_handler)
-signal.signal(signal.SIGTERM, shutdown_handler)
+previous_signal_handlers = {
+    signal.SIGINT: signal.signal(signal.SIGINT, shutdown_handler),
+    signal.SIGTERM: signal.signal(signal.SIGTERM, shutdown_handler)
+}
 
 # Registrace funkce pro čistý exit
 def cleanup():
     logger.info("Úklid aplikace před ukončením")
+    sse_broadcaster.close()
+    alert_dispatcher.close()
+    flush_state_cache()
 
 atexit.register(cleanup)
 
@@ -137,74 +1092,949 @@ def calculate_rsi(data, periods=14):
         logger.error(f"Chyba při výpočtu RSI: {str(e)}")
         return None
 
-# Funkce pro získání dat z Binance s mnohem robustnější implementací opakovaných pokusů
-def get_futures_data_with_retry(symbol, interval, max_retries=7, initial_delay=1):
+def klines_to_close_matrix(klines_list):
     """
-    Získá data z Binance s opakovanými pokusy v případě selhání.
+    Převede klines více symbolů stejné délky rovnou na matici uzavíracích cen
     
     Args:
-        symbol: Symbol, pro který chceme data
-        interval: Časový interval (např. "1h", "15m")
-        max_retries: Maximální počet pokusů
-        initial_delay: Počáteční zpoždění mezi pokusy v sekundách
+        klines_list: List klines ve formátu REST (jeden prvek na symbol)
     
     Returns:
-        List s daty nebo None v případě selhání
+        NumPy matice float64 (symboly x svíčky)
     """
-    delay = initial_delay
+    return np.array([[kline[4] for kline in klines] for klines in klines_list], dtype=np.float64)
+
+def wilder_averages(closes, periods=14):
+    """
+    Wilderovy průměry zisků a ztrát pro všechny řádky matice najednou
     
-    for attempt in range(max_retries):
-        try:
-            if attempt > 0:
-                logger.info(f"Pokus {attempt+1}/{max_retries} o získání {interval} dat pro {symbol}")
-            
-            if attempt >= 2:
-                # Po dvou selhaných pokusech se pokusíme reinicializovat klienta
-                client.session = requests.Session()
-                client.session.request = functools.partial(client.session.request, timeout=30)
-                logger.info(f"Reinicializuji klienta před pokusem {attempt+1}")
-            
-            klines = client.futures_klines(symbol=symbol, interval=interval, limit=50)
-            
-            # Ověření, že data mají správný formát
-            if not klines or not isinstance(klines, list) or len(klines) < 2:
-                logger.warning(f"Získaná data pro {symbol} - {interval} jsou neplatná nebo prázdná")
-                if attempt < max_retries - 1:
-                    time.sleep(delay * (2 ** attempt))
-                    continue
-                else:
-                    return None
-                    
-            return klines
-            
-        except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Chyba při získávání {interval} dat pro {symbol}: {error_msg}")
-            
-            if "IP banned" in error_msg:
-                logger.error(f"IP adresa byla dočasně zablokována Binance API. Čekám 5 minut: {error_msg}")
-                time.sleep(300)  # Čekáme 5 minut při IP banned
-            elif "429" in error_msg or "too many requests" in error_msg.lower(): 
-                # Rate limit - exponenciální backoff
-                wait_time = delay * (2 ** attempt)
-                logger.warning(f"Rate limit dosažen, čekám {wait_time} sekund: {error_msg}")
-                time.sleep(wait_time)
-            elif "Connection" in error_msg or "Timeout" in error_msg or "timeout" in error_msg.lower():
-                # Síťové problémy - zkusíme to znovu s delším timeoutem
-                wait_time = delay * (2 ** attempt)
-                logger.warning(f"Síťový problém při získávání dat, čekám {wait_time} sekund: {error_msg}")
-                time.sleep(wait_time)
-            elif attempt < max_retries - 1:
-                # Běžná chyba, zkusíme znovu
-                wait_time = delay * (2 ** attempt)
-                logger.warning(f"Pokus {attempt+1} o získání {interval} dat pro {symbol} selhal: {error_msg}. Zkouším znovu za {wait_time}s")
-                time.sleep(wait_time)
+    Args:
+        closes: Matice uzavíracích cen (symboly x svíčky), alespoň periods sloupců
+        periods: Perioda RSI
+    
+    Returns:
+        Tuple (avg_gain, avg_loss) - vektory po poslední svíčce každého řádku
+    """
+    for _, avg_gain, avg_loss in wilder_steps(closes, periods):
+        pass
+    return avg_gain, avg_loss
+
+def wilder_steps(closes, periods=14):
+    """
+    Wilderovy průměry po každé svíčce pro všechny řádky matice
+    
+    Yields:
+        Tuple (index svíčky, avg_gain, avg_loss) - od svíčky periods - 1 (první SMA)
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    deltas = np.diff(closes, axis=1)
+    
+    # První delta neexistuje a calculate_rsi ji počítá jako nulový zisk i ztrátu
+    zeros = np.zeros((closes.shape[0], 1))
+    gains = np.ascontiguousarray(np.hstack((zeros, np.where(deltas > 0, deltas, 0.0))))
+    losses = np.ascontiguousarray(np.hstack((zeros, np.where(deltas < 0, -deltas, 0.0))))
+    
+    # První průměr - SMA
+    avg_gain = gains[:, :periods].sum(axis=1) / periods
+    avg_loss = losses[:, :periods].sum(axis=1) / periods
+    yield periods - 1, avg_gain, avg_loss
+    
+    # Následující průměry - Wilderovo vyhlazení podél osy svíček pro všechny řádky
+    for i in range(periods, closes.shape[1]):
+        avg_gain = (avg_gain * (periods - 1) + gains[:, i]) / periods
+        avg_loss = (avg_loss * (periods - 1) + losses[:, i]) / periods
+        yield i, avg_gain, avg_loss
+
+def rsi_series_matrix(closes, periods=14):
+    """
+    RSI po každé svíčce pro všechny řádky matice - sloupec i odpovídá batch_rsi(closes[:, :i + 1])
+    
+    Returns:
+        Matice RSI tvaru closes, NaN pro svíčky, kde RSI ještě nelze určit
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    result = np.full(closes.shape, np.nan)
+    if closes.shape[1] < periods + 1:
+        return result
+    
+    for i, avg_gain, avg_loss in wilder_steps(closes, periods):
+        if i >= periods:
+            result[:, i] = rsi_from_averages_array(avg_gain, avg_loss)
+    return result
+
+def rsi_from_averages_array(avg_gain, avg_loss):
+    """Vektorová verze rsi_from_averages - NaN tam, kde RSI nelze určit"""
+    rs = np.divide(avg_gain, avg_loss, out=np.full_like(avg_gain, 100.0), where=avg_loss != 0)
+    return 100 - (100 / (1 + rs))
+
+def batch_rsi(closes, periods=14):
+    """
+    RSI poslední svíčky pro všechny řádky matice jedním vektorovým průchodem.
+    Pro každý řádek dává stejný výsledek jako calculate_rsi.
+    
+    Args:
+        closes: Matice uzavíracích cen (symboly x svíčky)
+        periods: Perioda RSI
+    
+    Returns:
+        Vektor RSI (NaN pro řádky, kde RSI nelze určit)
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    if closes.shape[1] < periods + 1:
+        return np.full(closes.shape[0], np.nan)
+    return rsi_from_averages_array(*wilder_averages(closes, periods))
+
+def rsi_from_averages(avg_gain, avg_loss):
+    """Převede Wilderovy průměry na RSI - stejně jako calculate_rsi"""
+    rs = avg_gain / avg_loss if avg_loss != 0 else 100
+    rsi = 100 - (100 / (1 + rs))
+    return float(rsi) if not np.isnan(rsi) else None
+
+class RsiState:
+    """
+    Perzistentní Wilder RSI stav pro jeden symbol a timeframe.
+    
+    Drží průměry zisků a ztrát po poslední uzavřené svíčce, takže nová uzavřená
+    svíčka se zapracuje v O(1) a RSI tvořící se svíčky se dopočítá bez změny stavu.
+    Výsledky odpovídají calculate_rsi nad celou historií (včetně tvořící se svíčky)
+    od založení stavu, ne nad posledními KLINE_HISTORY svíčkami - proti dřívějšímu
+    přepočtu posuvného okna se záměrně liší (typicky do 1-2 bodů RSI).
+    """
+    
+    __slots__ = ('periods', 'avg_gain', 'avg_loss', 'last_close', 'last_open_time')
+    
+    def __init__(self, avg_gain, avg_loss, last_close, last_open_time, periods=14):
+        self.periods = periods
+        self.avg_gain = avg_gain
+        self.avg_loss = avg_loss
+        self.last_close = last_close
+        self.last_open_time = last_open_time
+    
+    @classmethod
+    def from_closes(cls, closes, open_times, periods=14):
+        """
+        Vytvoří stav z uzavřených svíček
+        
+        Args:
+            closes: Uzavírací ceny uzavřených svíček (od nejstarší)
+            open_times: Časy otevření odpovídajících svíček
+            periods: Perioda RSI
+        
+        Returns:
+            RsiState nebo None, pokud je historie kratší než perioda
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        if len(closes) < periods:
+            return None
+        
+        avg_gain, avg_loss = wilder_averages(closes[np.newaxis, :], periods)
+        return cls(float(avg_gain[0]), float(avg_loss[0]), float(closes[-1]), int(open_times[-1]), periods)
+    
+    def _step(self, close):
+        delta = close - self.last_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        avg_gain = (self.avg_gain * (self.periods - 1) + gain) / self.periods
+        avg_loss = (self.avg_loss * (self.periods - 1) + loss) / self.periods
+        return avg_gain, avg_loss
+    
+    def advance(self, open_time, close):
+        """Zapracuje novou uzavřenou svíčku (O(1))"""
+        self.avg_gain, self.avg_loss = self._step(close)
+        self.last_close = close
+        self.last_open_time = open_time
+    
+    def provisional(self, close):
+        """RSI pro tvořící se svíčku s aktuální cenou close - stav se nemění"""
+        return rsi_from_averages(*self._step(close))
+    
+    @property
+    def value(self):
+        """RSI po poslední uzavřené svíčce"""
+        return rsi_from_averages(self.avg_gain, self.avg_loss)
+
+def klines_to_series(klines):
+    """Převede klines ve formátu REST na (open_time, close) NumPy pole"""
+    return (np.array([kline[0] for kline in klines], dtype=np.int64),
+            np.array([kline[4] for kline in klines], dtype=np.float64))
+
+def update_rsi_states(interval, series_by_symbol, periods=14):
+    """
+    Posune RSI stavy všech symbolů jednoho timeframe a vrátí RSI včetně tvořící se svíčky.
+    
+    Navazující stavy se posunou jen o nově uzavřené svíčky, nové stavy se založí
+    jedním vektorovým průchodem přes matici uzavíracích cen a RSI tvořících se
+    svíček se spočítá pro všechny symboly najednou.
+    
+    Args:
+        interval: Časový interval (např. "1h")
+        series_by_symbol: Dict symbol -> (open_time, close) NumPy pole, poslední svíčka se tvoří
+        periods: Perioda RSI
+    
+    Returns:
+        Dict symbol -> RSI (None pro symboly, kde RSI nelze určit)
+    """
+    results = {}
+    ready = []
+    to_seed = {}
+    
+    for symbol, series in series_by_symbol.items():
+        results[symbol] = None
+        if series is None or len(series[1]) < periods + 1:
+            continue
+        
+        open_times, closes = series
+        state = rsi_states.get((symbol, interval))
+        
+        if state is not None and open_times[0] <= state.last_open_time <= open_times[-2]:
+            # Stav navazuje na data - zapracujeme jen nově uzavřené svíčky
+            first_new = int(np.searchsorted(open_times[:-1], state.last_open_time, side='right'))
+            for open_time, close in zip(open_times[first_new:-1].tolist(), closes[first_new:-1].tolist()):
+                state.advance(open_time, close)
+            ready.append(symbol)
+        else:
+            # Žádný stav nebo mezera v datech - stav založíme znovu (seskupeno podle délky)
+            to_seed.setdefault(len(closes), []).append(symbol)
+    
+    for symbols in to_seed.values():
+        closes = np.vstack([series_by_symbol[symbol][1][:-1] for symbol in symbols])
+        avg_gain, avg_loss = wilder_averages(closes, periods)
+        for i, symbol in enumerate(symbols):
+            last_open_time = int(series_by_symbol[symbol][0][-2])
+            rsi_states[(symbol, interval)] = RsiState(float(avg_gain[i]), float(avg_loss[i]), float(closes[i, -1]), last_open_time, periods)
+        ready.extend(symbols)
+    
+    if not ready:
+        return results
+    
+    # RSI tvořících se svíček - jeden Wilderův krok pro všechny symboly najednou
+    states = [rsi_states[(symbol, interval)] for symbol in ready]
+    avg_gain = np.array([state.avg_gain for state in states])
+    avg_loss = np.array([state.avg_loss for state in states])
+    last_close = np.array([state.last_close for state in states])
+    close = np.array([series_by_symbol[symbol][1][-1] for symbol in ready])
+    
+    deltas = close - last_close
+    avg_gain = (avg_gain * (periods - 1) + np.where(deltas > 0, deltas, 0.0)) / periods
+    avg_loss = (avg_loss * (periods - 1) + np.where(deltas < 0, -deltas, 0.0)) / periods
+    
+    for symbol, rsi in zip(ready, rsi_from_averages_array(avg_gain, avg_loss).tolist()):
+        results[symbol] = rsi if not np.isnan(rsi) else None
+    
+    return results
+
+def update_rsi_state(symbol, interval, klines, periods=14):
+    """
+    Posune RSI stav jednoho symbolu a vrátí RSI včetně tvořící se svíčky
+    
+    Args:
+        klines: Klines ve formátu REST - poslední svíčka je ta tvořící se
+    
+    Returns:
+        Float s RSI nebo None, pokud není dost dat
+    """
+    try:
+        return update_rsi_states(interval, {symbol: klines_to_series(klines)}, periods)[symbol]
+    except Exception as e:
+        logger.error(f"Chyba při výpočtu RSI: {str(e)}")
+        return None
+
+# Délky podporovaných intervalů v milisekundách
+INTERVAL_MS = {
+    Client.KLINE_INTERVAL_1MINUTE: 60 * 1000,
+    Client.KLINE_INTERVAL_15MINUTE: 15 * 60 * 1000,
+    Client.KLINE_INTERVAL_1HOUR: 60 * 60 * 1000,
+    Client.KLINE_INTERVAL_1DAY: 24 * 60 * 60 * 1000
+}
+
+# Časový rozpočet obnovy jednotlivých timeframe v sekundách
+SCAN_TIER_BUDGETS = load_scan_tier_budgets()
+
+class CandleBuffer:
+    """
+    Ring buffer svíček jednoho symbolu a timeframe v předalokovaných NumPy polích.
+    Poslední svíčka je ta tvořící se - aktualizuje se na místě, nová svíčka přepíše nejstarší.
+    """
+    
+    __slots__ = ('capacity', 'interval_ms', 'open_time', 'open', 'high', 'low', 'close', 'volume', 'start', 'count', 'unflushed')
+    
+    def __init__(self, capacity, interval_ms):
+        self.capacity = capacity
+        self.interval_ms = interval_ms
+        self.open_time = np.zeros(capacity, dtype=np.int64)
+        self.open = np.zeros(capacity, dtype=np.float64)
+        self.high = np.zeros(capacity, dtype=np.float64)
+        self.low = np.zeros(capacity, dtype=np.float64)
+        self.close = np.zeros(capacity, dtype=np.float64)
+        self.volume = np.zeros(capacity, dtype=np.float64)
+        self.start = 0
+        self.count = 0
+        self.unflushed = 0
+    
+    def __len__(self):
+        return self.count
+    
+    @property
+    def last_open_time(self):
+        if not self.count:
+            return None
+        return int(self.open_time[(self.start + self.count - 1) % self.capacity])
+    
+    def clear(self):
+        self.start = 0
+        self.count = 0
+        self.unflushed = 0
+    
+    def append(self, open_time, o, h, l, c, v):
+        """
+        Přidá svíčku, nebo aktualizuje poslední, pokud má stejný čas otevření
+        
+        Returns:
+            True pokud přibyla nová svíčka, False při aktualizaci nebo ignorování
+        """
+        last_open_time = self.last_open_time
+        
+        if last_open_time is not None and open_time < last_open_time:
+            # Starší svíčku už máme - ignorujeme
+            return False
+        
+        if last_open_time is not None and open_time == last_open_time:
+            i = (self.start + self.count - 1) % self.capacity
+            is_new = False
+        else:
+            if last_open_time is not None and open_time > last_open_time + self.interval_ms:
+                # Mezera v datech - navazující historie by zkreslila RSI, začneme znovu
+                self.clear()
+            
+            if self.count < self.capacity:
+                i = (self.start + self.count) % self.capacity
+                self.count += 1
+            else:
+                i = self.start
+                self.start = (self.start + 1) % self.capacity
+            is_new = True
+        
+        self.open_time[i] = open_time
+        self.open[i] = o
+        self.high[i] = h
+        self.low[i] = l
+        self.close[i] = c
+        self.volume[i] = v
+        
+        if is_new:
+            # Počet nových svíček od posledního zápisu na disk (tvořící se svíčka se zapisuje vždy)
+            self.unflushed = min(self.unflushed + 1, self.count)
+        return is_new
+    
+    def merge_klines(self, klines):
+        """
+        Zapracuje klines ve formátu REST (od nejstarší)
+        
+        Returns:
+            Počet nově přidaných svíček
+        """
+        added = 0
+        for kline in klines:
+            if self.append(int(kline[0]), float(kline[1]), float(kline[2]), float(kline[3]), float(kline[4]), float(kline[5])):
+                added += 1
+        return added
+    
+    def column(self, name, count=None):
+        """Vrátí sloupec v chronologickém pořadí (kopie), volitelně jen posledních count svíček"""
+        count = self.count if count is None else min(count, self.count)
+        indexes = (self.start + self.count - count + np.arange(count)) % self.capacity
+        return getattr(self, name)[indexes]
+    
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ('open_time', 'open', 'high', 'low', 'close', 'volume'))
+
+class CandleStore:
+    """In-process úložiště svíček - ring buffer pro každý (symbol, timeframe)"""
+    
+    def __init__(self, depth, depths=None):
+        self.depth = depth
+        self.depths = depths or {}
+        self.buffers = {}
+        self.dirty = set()
+        self.lock = threading.Lock()
+    
+    def _buffer(self, symbol, interval):
+        buffer = self.buffers.get((symbol, interval))
+        if buffer is None:
+            buffer = CandleBuffer(self.depths.get(interval, self.depth), INTERVAL_MS[interval])
+            self.buffers[(symbol, interval)] = buffer
+        return buffer
+    
+    def merge(self, symbol, interval, klines):
+        """Zapracuje klines ve formátu REST a vrátí počet nových svíček"""
+        with self.lock:
+            self.dirty.add((symbol, interval))
+            return self._buffer(symbol, interval).merge_klines(klines)
+    
+    def replace(self, symbol, interval, klines):
+        """Nahradí celý buffer klines ve formátu REST a vrátí počet svíček"""
+        with self.lock:
+            self.dirty.add((symbol, interval))
+            buffer = self._buffer(symbol, interval)
+            buffer.clear()
+            return buffer.merge_klines(klines)
+    
+    def derive(self, symbol, base, interval, since=None):
+        """
+        Složí svíčky timeframe interval ze svíček base na UTC hranicích (open první
+        svíčky, high/low extrém, close poslední, objem součet). Skládají se jen úseky,
+        které buffer base pokrývá od začátku, volitelně až od úseku obsahujícího since.
+        
+        Returns:
+            Počet složených (nových nebo aktualizovaných) svíček
+        """
+        step = INTERVAL_MS[interval]
+        with self.lock:
+            source = self.buffers.get((symbol, base))
+            if source is None or not source.count:
+                return 0
+            
+            open_time = source.column('open_time')
+            first = int(open_time[0]) // step * step
+            if open_time[0] != first:
+                # První úsek buffer nepokrývá celý - jeho svíčka by byla neúplná
+                first += step
+            if since is not None:
+                first = max(first, since // step * step)
+            begin = int(np.searchsorted(open_time, first))
+            if begin == len(open_time):
+                return 0
+            
+            count = len(open_time) - begin
+            o, h, l, c, v = (source.column(name, count) for name in ('open', 'high', 'low', 'close', 'volume'))
+            buckets = open_time[begin:] // step * step
+            starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+            ends = np.append(starts[1:], count) - 1
+            
+            target = self._buffer(symbol, interval)
+            for bar in zip(buckets[starts].tolist(), o[starts].tolist(), np.maximum.reduceat(h, starts).tolist(),
+                           np.minimum.reduceat(l, starts).tolist(), c[ends].tolist(), np.add.reduceat(v, starts).tolist()):
+                target.append(*bar)
+            self.dirty.add((symbol, interval))
+            return len(starts)
+    
+    def load(self, symbol, interval, open_time, o, h, l, c, v):
+        """Vloží svíčku načtenou z perzistentní cache (neoznačuje buffer ke zápisu)"""
+        with self.lock:
+            buffer = self._buffer(symbol, interval)
+            buffer.append(open_time, o, h, l, c, v)
+            buffer.unflushed = 0
+    
+    def has_gap(self, symbol, interval, open_time):
+        """Zda by svíčka open_time vynechala za poslední svíčkou bufferu aspoň jednu svíčku"""
+        with self.lock:
+            buffer = self.buffers.get((symbol, interval))
+            last_open_time = buffer.last_open_time if buffer is not None else None
+            return last_open_time is not None and open_time > last_open_time + buffer.interval_ms
+    
+    def update(self, symbol, interval, open_time, o, h, l, c, v):
+        """Aktualizuje existující buffer jednou svíčkou (stream režim)"""
+        with self.lock:
+            buffer = self.buffers.get((symbol, interval))
+            if buffer is None:
+                return None
+            self.dirty.add((symbol, interval))
+            return buffer.append(open_time, o, h, l, c, v)
+    
+    def take_dirty(self):
+        """
+        Vrátí svíčky změněné od posledního volání (nové + tvořící se) pro zápis na disk
+        
+        Returns:
+            List ((symbol, interval), dict sloupců včetně first_open_time bufferu)
+        """
+        with self.lock:
+            changes = []
+            for key in self.dirty:
+                buffer = self.buffers.get(key)
+                if buffer is None or not buffer.count:
+                    continue
+                count = buffer.unflushed + 1
+                columns = {name: buffer.column(name, count) for name in ('open_time', 'open', 'high', 'low', 'close', 'volume')}
+                columns['first_open_time'] = int(buffer.column('open_time', buffer.count)[0])
+                buffer.unflushed = 0
+                changes.append((key, columns))
+            self.dirty.clear()
+            return changes
+    
+    def last_open_time(self, symbol, interval):
+        with self.lock:
+            buffer = self.buffers.get((symbol, interval))
+            return buffer.last_open_time if buffer is not None else None
+    
+    def length(self, symbol, interval):
+        with self.lock:
+            buffer = self.buffers.get((symbol, interval))
+            return len(buffer) if buffer is not None else 0
+    
+    def series(self, symbol, interval, count=None):
+        """
+        Vrátí (open_time, close) v chronologickém pořadí
+        
+        Returns:
+            Tuple NumPy polí nebo None, pokud pro symbol nemáme data
+        """
+        with self.lock:
+            buffer = self.buffers.get((symbol, interval))
+            if buffer is None or not buffer.count:
+                return None
+            return buffer.column('open_time', count), buffer.column('close', count)
+    
+    def columns(self, symbol, interval, names, count=None):
+        """
+        Vrátí vybrané sloupce svíček v chronologickém pořadí (vstup indikátorů)
+        
+        Returns:
+            Dict název -> NumPy pole nebo None, pokud pro symbol nemáme data
+        """
+        with self.lock:
+            buffer = self.buffers.get((symbol, interval))
+            if buffer is None or not buffer.count:
+                return None
+            return {name: buffer.column(name, count) for name in names}
+    
+    def evict(self, symbol):
+        """Odstraní všechny buffery symbolu"""
+        with self.lock:
+            for key in [key for key in self.buffers if key[0] == symbol]:
+                del self.buffers[key]
+                self.dirty.discard(key)
+    
+    def memory_usage(self):
+        """Report využití paměti úložiště"""
+        with self.lock:
+            buffers = list(self.buffers.values())
+        return {
+            'buffers': len(buffers),
+            'candles': sum(len(buffer) for buffer in buffers),
+            'depth': self.depth,
+            'bytes': sum(buffer.nbytes for buffer in buffers)
+        }
+
+# Buffer základního timeframe musí pokrýt celý úsek nejdelšího odvozeného timeframe (např. den 15m svíček)
+candle_store = CandleStore(CANDLE_STORE_DEPTH, {
+    BASE_INTERVAL: max(CANDLE_STORE_DEPTH, max(INTERVAL_MS[interval] for interval in DERIVED_INTERVALS) // INTERVAL_MS[BASE_INTERVAL] + KLINE_HISTORY)
+} if DERIVED_INTERVALS else None)
+
+class RsiHistoryBuffer:
+    """
+    Ring buffer historie jednoho symbolu a timeframe - RSI a cena po každé svíčce.
+    Bod tvořící se svíčky se při dalším skenu přepíše, nová svíčka přepíše nejstarší bod.
+    """
+    
+    __slots__ = ('capacity', 'open_time', 'rsi', 'price', 'start', 'count', 'unflushed')
+    
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.open_time = np.zeros(capacity, dtype=np.int64)
+        self.rsi = np.zeros(capacity, dtype=np.float32)
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.start = 0
+        self.count = 0
+        self.unflushed = 0
+    
+    def __len__(self):
+        return self.count
+    
+    @property
+    def last_open_time(self):
+        if not self.count:
+            return None
+        return int(self.open_time[(self.start + self.count - 1) % self.capacity])
+    
+    def append(self, open_time, rsi, price):
+        """Přidá bod, nebo přepíše poslední se stejným časem otevření (starší body ignoruje)"""
+        last_open_time = self.last_open_time
+        
+        if last_open_time is not None and open_time < last_open_time:
+            return
+        
+        if last_open_time is not None and open_time == last_open_time:
+            i = (self.start + self.count - 1) % self.capacity
+        else:
+            if self.count < self.capacity:
+                i = (self.start + self.count) % self.capacity
+                self.count += 1
             else:
-                # Poslední pokus selhal
-                logger.error(f"Všechny pokusy o získání {interval} dat pro {symbol} selhaly: {error_msg}")
+                i = self.start
+                self.start = (self.start + 1) % self.capacity
+            self.unflushed = min(self.unflushed + 1, self.count)
+        
+        self.open_time[i] = open_time
+        self.rsi[i] = rsi
+        self.price[i] = price
+    
+    def column(self, name, count=None):
+        """Vrátí sloupec v chronologickém pořadí (kopie), volitelně jen posledních count bodů"""
+        count = self.count if count is None else min(count, self.count)
+        indexes = (self.start + self.count - count + np.arange(count)) % self.capacity
+        return getattr(self, name)[indexes]
+    
+    @property
+    def nbytes(self):
+        return self.open_time.nbytes + self.rsi.nbytes + self.price.nbytes
+
+class RsiHistory:
+    """
+    Historie RSI a ceny pro každý (symbol, timeframe) - sparkline řady pro /history
+    a trend z regrese přes posledních TREND_WINDOW svíček
+    """
+    
+    def __init__(self, depth):
+        self.depth = depth
+        self.buffers = {}
+        self.dirty = set()
+        self.lock = threading.Lock()
+    
+    def _buffer(self, symbol, interval):
+        buffer = self.buffers.get((symbol, interval))
+        if buffer is None:
+            buffer = RsiHistoryBuffer(self.depth)
+            self.buffers[(symbol, interval)] = buffer
+        return buffer
+    
+    def record(self, interval, series_by_symbol, rsi_by_symbol):
+        """
+        Zapíše RSI a cenu tvořící se svíčky pro skupinu symbolů jednoho timeframe.
+        Symbolům bez historie ji nejdřív dopočítá z uzavřených svíček v candle_store
+        (jeden vektorový průchod pro každou délku řady).
+        
+        Args:
+            interval: Časový interval
+            series_by_symbol: Dict symbol -> (open_time, close), poslední svíčka se tvoří
+            rsi_by_symbol: Dict symbol -> RSI tvořící se svíčky (None se přeskočí)
+        """
+        with self.lock:
+            missing = {}
+            for symbol, rsi in rsi_by_symbol.items():
+                if rsi is not None and (symbol, interval) not in self.buffers:
+                    missing.setdefault(len(series_by_symbol[symbol][1]), []).append(symbol)
+        
+        backfill = []
+        for symbols in missing.values():
+            closes = np.vstack([series_by_symbol[symbol][1][:-1] for symbol in symbols])
+            rsi = rsi_series_matrix(closes)
+            for i, symbol in enumerate(symbols):
+                valid = ~np.isnan(rsi[i])
+                backfill.append((symbol, series_by_symbol[symbol][0][:-1][valid], rsi[i][valid], closes[i][valid]))
+        
+        with self.lock:
+            for symbol, open_times, rsi, closes in backfill:
+                buffer = self._buffer(symbol, interval)
+                for open_time, value, close in zip(open_times.tolist(), rsi.tolist(), closes.tolist()):
+                    buffer.append(open_time, value, close)
+            
+            for symbol, rsi in rsi_by_symbol.items():
+                if rsi is None:
+                    continue
+                open_times, closes = series_by_symbol[symbol]
+                self._buffer(symbol, interval).append(int(open_times[-1]), rsi, float(closes[-1]))
+                self.dirty.add((symbol, interval))
+    
+    def load(self, symbol, interval, open_time, rsi, price):
+        """Vloží bod načtený z perzistentní cache (neoznačuje buffer ke zápisu)"""
+        with self.lock:
+            buffer = self._buffer(symbol, interval)
+            buffer.append(open_time, rsi, price)
+            buffer.unflushed = 0
+    
+    def take_dirty(self):
+        """
+        Vrátí body změněné od posledního volání (nové + tvořící se svíčka) pro zápis na disk
+        
+        Returns:
+            List ((symbol, interval), dict sloupců včetně first_open_time bufferu)
+        """
+        with self.lock:
+            changes = []
+            for key in self.dirty:
+                buffer = self.buffers.get(key)
+                if buffer is None or not buffer.count:
+                    continue
+                count = buffer.unflushed + 1
+                columns = {name: buffer.column(name, count) for name in ('open_time', 'rsi', 'price')}
+                columns['first_open_time'] = int(buffer.open_time[buffer.start])
+                buffer.unflushed = 0
+                changes.append((key, columns))
+            self.dirty.clear()
+            return changes
+    
+    def series(self, symbol, interval, count=None):
+        """
+        Vrátí (open_time, rsi, price) v chronologickém pořadí
+        
+        Returns:
+            Tuple NumPy polí nebo None, pokud historii symbolu nemáme
+        """
+        with self.lock:
+            buffer = self.buffers.get((symbol, interval))
+            if buffer is None or not buffer.count:
                 return None
+            return buffer.column('open_time', count), buffer.column('rsi', count), buffer.column('price', count)
+    
+    def symbols(self):
+        with self.lock:
+            return {symbol for symbol, _ in self.buffers}
+    
+    def evict(self, symbol):
+        """Odstraní historii symbolu"""
+        with self.lock:
+            for key in [key for key in self.buffers if key[0] == symbol]:
+                del self.buffers[key]
+                self.dirty.discard(key)
+    
+    def memory_usage(self):
+        with self.lock:
+            buffers = list(self.buffers.values())
+        return {
+            'series': len(buffers),
+            'points': sum(len(buffer) for buffer in buffers),
+            'depth': self.depth,
+            'bytes': sum(buffer.nbytes for buffer in buffers)
+        }
+
+rsi_history = RsiHistory(HISTORY_DEPTH)
+
+def rsi_slope(rsi):
+    """
+    Sklon lineární regrese RSI proti pořadí svíčky (body RSI za svíčku).
+    Pro matici se počítá po řádcích a vrací vektor sklonů.
+    """
+    x = np.arange(rsi.shape[-1], dtype=np.float64)
+    x -= x.mean()
+    slope = (rsi - rsi.mean(axis=-1, keepdims=True)) @ x / np.dot(x, x)
+    return float(slope) if np.ndim(slope) == 0 else slope
+
+def classify_trend(slope):
+    """Převede sklon RSI na trend "up", "down" nebo "stable" (pro pole sklonů vrací pole)"""
+    trend = np.where(slope > TREND_SLOPE_THRESHOLD, "up", np.where(slope < -TREND_SLOPE_THRESHOLD, "down", "stable"))
+    return str(trend) if np.ndim(trend) == 0 else trend
+
+def downsample(columns, points):
+    """
+    Zředí řady na nejvýše points bodů - z každého úseku se vezme poslední bod,
+    takže poslední (aktuální) hodnota zůstane přesná
+    """
+    count = len(columns[0])
+    if count <= points:
+        return columns
+    indexes = np.linspace(0, count, points + 1).astype(np.int64)[1:] - 1
+    return tuple(column[indexes] for column in columns)
+
+class StateCache:
+    """
+    Perzistentní cache v SQLite - svíčky, RSI stavy, historie RSI a poslední výsledky.
+    Zapisuje se průběžně po každé publikaci, po restartu se z ní obnoví stav aplikace.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS candles (
+                symbol TEXT, interval TEXT, open_time INTEGER,
+                open REAL, high REAL, low REAL, close REAL, volume REAL,
+                PRIMARY KEY (symbol, interval, open_time)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS rsi_state (
+                symbol TEXT, interval TEXT, avg_gain REAL, avg_loss REAL,
+                last_close REAL, last_open_time INTEGER, periods INTEGER,
+                PRIMARY KEY (symbol, interval)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS rsi_history (
+                symbol TEXT, interval TEXT, open_time INTEGER, rsi REAL, price REAL,
+                PRIMARY KEY (symbol, interval, open_time)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY, payload TEXT
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY, value TEXT
+            );
+        """)
+        self.conn.commit()
+    
+    def flush(self, dirty_candles, dirty_history):
+        """
+        Zapíše změněné svíčky a s nimi související stav symbolů
+        
+        Args:
+            dirty_candles: List ((symbol, interval), sloupce) z CandleStore.take_dirty()
+            dirty_history: List ((symbol, interval), sloupce) z RsiHistory.take_dirty()
+        """
+        symbols = {symbol for (symbol, _), _ in dirty_candles}
+        
+        with self.lock:
+            for (symbol, interval), columns in dirty_candles:
+                rows = zip([symbol] * len(columns['open_time']), [interval] * len(columns['open_time']),
+                           columns['open_time'].tolist(), columns['open'].tolist(), columns['high'].tolist(),
+                           columns['low'].tolist(), columns['close'].tolist(), columns['volume'].tolist())
+                self.conn.executemany("INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                # Svíčky, které z ring bufferu vypadly, nepotřebujeme ani na disku
+                self.conn.execute("DELETE FROM candles WHERE symbol = ? AND interval = ? AND open_time < ?",
+                                  (symbol, interval, columns['first_open_time']))
+            
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO rsi_state VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(symbol, interval, state.avg_gain, state.avg_loss, state.last_close, state.last_open_time, state.periods)
+                 for (symbol, interval), state in list(rsi_states.items()) if symbol in symbols]
+            )
+            for (symbol, interval), columns in dirty_history:
+                count = len(columns['open_time'])
+                self.conn.executemany("INSERT OR REPLACE INTO rsi_history VALUES (?, ?, ?, ?, ?)", zip(
+                    [symbol] * count, [interval] * count, columns['open_time'].tolist(),
+                    columns['rsi'].tolist(), columns['price'].tolist()))
+                self.conn.execute("DELETE FROM rsi_history WHERE symbol = ? AND interval = ? AND open_time < ?",
+                                  (symbol, interval, columns['first_open_time']))
+            self.conn.execute("INSERT OR REPLACE INTO results VALUES (1, ?)", (json.dumps({
+                'high_rsi': results_cache['high_rsi'],
+                'low_rsi': results_cache['low_rsi'],
+                'last_update': results_cache['last_update'],
+                'data_version': data_version
+            }),))
+            self.conn.commit()
+    
+    def save_universe(self, symbols):
+        """Uloží poslední úspěšně stažený seznam symbolů"""
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('symbol_universe', ?)", (json.dumps(symbols),))
+            self.conn.commit()
+    
+    def evict_symbols(self, symbols):
+        """Smaže veškerý uložený stav odebraných symbolů"""
+        with self.lock:
+            for symbol in symbols:
+                self.conn.execute("DELETE FROM candles WHERE symbol = ?", (symbol,))
+                self.conn.execute("DELETE FROM rsi_state WHERE symbol = ?", (symbol,))
+                self.conn.execute("DELETE FROM rsi_history WHERE symbol = ?", (symbol,))
+            self.conn.commit()
+    
+    def load(self):
+        """
+        Obnoví candle_store, RSI stavy, historii RSI a výsledky z disku
+        
+        Returns:
+            Počet obnovených svíček
+        """
+        global data_version
+        
+        with self.lock:
+            candles = self.conn.execute(
+                "SELECT symbol, interval, open_time, open, high, low, close, volume FROM candles ORDER BY symbol, interval, open_time"
+            ).fetchall()
+            states = self.conn.execute("SELECT * FROM rsi_state").fetchall()
+            history = self.conn.execute(
+                "SELECT symbol, interval, open_time, rsi, price FROM rsi_history ORDER BY symbol, interval, open_time"
+            ).fetchall()
+            results = self.conn.execute("SELECT payload FROM results WHERE id = 1").fetchone()
+            universe = self.conn.execute("SELECT value FROM meta WHERE key = 'symbol_universe'").fetchone()
+        
+        if universe:
+            symbol_universe.restore(json.loads(universe[0]))
+        
+        for symbol, interval, open_time, o, h, l, c, v in candles:
+            if interval in INTERVAL_MS:
+                candle_store.load(symbol, interval, open_time, o, h, l, c, v)
+        
+        for symbol, interval, avg_gain, avg_loss, last_close, last_open_time, periods in states:
+            rsi_states[(symbol, interval)] = RsiState(avg_gain, avg_loss, last_close, last_open_time, periods)
+        
+        for symbol, interval, open_time, rsi, price in history:
+            rsi_history.load(symbol, interval, open_time, rsi, price)
+        
+        if results:
+            payload = json.loads(results[0])
+            results_cache['high_rsi'] = payload['high_rsi']
+            results_cache['low_rsi'] = payload['low_rsi']
+            results_cache['last_update'] = payload['last_update']
+            data_version = max(data_version, payload.get('data_version', 0))
+        
+        return len(candles)
+    
+    def history(self, symbol, interval, count):
+        """
+        Posledních count bodů historie symbolu (pro workery, které samy neskenují)
+        
+        Returns:
+            Tuple (open_time, rsi, price) NumPy polí nebo None
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT open_time, rsi, price FROM rsi_history WHERE symbol = ? AND interval = ? ORDER BY open_time DESC LIMIT ?",
+                (symbol, interval, count)
+            ).fetchall()
+        if not rows:
+            return None
+        rows.reverse()
+        open_times, rsi, prices = zip(*rows)
+        return np.array(open_times, dtype=np.int64), np.array(rsi, dtype=np.float32), np.array(prices, dtype=np.float64)
     
-    return None
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def flush_state_cache():
+    """Zapíše změny od posledního zápisu do perzistentní cache (pokud je zapnutá)"""
+    if state_cache is None:
+        return
+    try:
+        state_cache.flush(candle_store.take_dirty(), rsi_history.take_dirty())
+    except Exception as e:
+        logger.error(f"Chyba při zápisu perzistentní cache: {str(e)}")
+
+def restore_state_cache():
+    """Při startu obnoví poslední známý stav z disku, aby /get_rsi_data hned vracel data"""
+    global state_cache
+    
+    if not CANDLE_CACHE_PATH:
+        return
+    
+    try:
+        state_cache = StateCache(CANDLE_CACHE_PATH)
+        started = time.monotonic()
+        restored = state_cache.load()
+        build_snapshot()
+        logger.info(f"Obnoveno {restored} svíček, {len(rsi_states)} RSI stavů a výsledky z {results_cache['last_update']} "
+                    f"z {CANDLE_CACHE_PATH} za {time.monotonic() - started:.2f} s")
+    except Exception as e:
+        logger.error(f"Nepodařilo se načíst perzistentní cache {CANDLE_CACHE_PATH}: {str(e)}")
+
+def get_futures_klines(symbol, interval, start_time=None, limit=KLINE_HISTORY):
+    """
+    Jeden pokus o stažení klines - opakování řídí KlineFetcher, aby se nečekalo ve workeru
+    
+    Args:
+        symbol: Symbol, pro který chceme data
+        interval: Časový interval (např. "1h", "15m")
+        start_time: Volitelný čas otevření první svíčky (ms) - stahujeme jen chybějící svíčky
+        limit: Maximální počet svíček
+    
+    Returns:
+        List s klines
+    
+    Raises:
+        RequestBlocked: Požadavky jsou pozastavené rate limitem
+        ValueError: Binance vrátil neplatná nebo prázdná data
+    """
+    params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+    if start_time is not None:
+        params['startTime'] = start_time
+    klines = binance_request('futures_klines', fail_fast=True, **params)
+    
+    # Ověření, že data mají správný formát (při startTime stačí jediná svíčka)
+    if not klines or not isinstance(klines, list) or len(klines) < (1 if start_time is not None else 2):
+        raise ValueError(f"Získaná data pro {symbol} - {interval} jsou neplatná nebo prázdná")
+    
+    return klines
 
 # Funkce pro získání seznamu futures symbolů s opakovanými pokusy
 def get_futures_symbols_with_retry(max_retries=7, initial_delay=1):
@@ -227,11 +2057,10 @@ def get_futures_symbols_with_retry(max_retries=7, initial_delay=1):
             
             if attempt >= 2:
                 # Po dvou selhaných pokusech se pokusíme reinicializovat klienta
-                client.session = requests.Session()
-                client.session.request = functools.partial(client.session.request, timeout=30)
+                reset_client_session()
                 logger.info(f"Reinicializuji klienta před pokusem {attempt+1} pro futures symboly")
             
-            futures_exchange_info = client.futures_exchange_info()
+            futures_exchange_info = binance_request('futures_exchange_info')
             
             # Filtrování symbolů
             if not futures_exchange_info or not isinstance(futures_exchange_info, dict) or 'symbols' not in futures_exchange_info:
@@ -251,7 +2080,7 @@ def get_futures_symbols_with_retry(max_retries=7, initial_delay=1):
                     logger.info("Zkusím to znovu s jiným přístupem...")
                     # Alternativní přístup - získat všechny USDT páry
                     try:
-                        all_tickers = client.futures_ticker()
+                        all_tickers = binance_request('futures_ticker')
                         symbols = [t['symbol'] for t in all_tickers if 'USDT' in t['symbol']]
                         if symbols:
                             logger.info(f"Úspěšně načteno {len(symbols)} futures symbolů alternativní metodou")
@@ -272,13 +2101,16 @@ def get_futures_symbols_with_retry(max_retries=7, initial_delay=1):
             logger.error(f"Chyba při získávání seznamu futures symbolů: {error_msg}")
             
             if "IP banned" in error_msg:
-                logger.error(f"IP adresa byla dočasně zablokována Binance API. Čekám 5 minut: {error_msg}")
-                time.sleep(300)  # Čekáme 5 minut při IP banned
+                # Ban platí pro celou IP - pozastavíme všechny požadavky přes rate limiter
+                # (Retry-After z odpovědi už nastavil hook, jinak čekáme 5 minut)
+                wait_time = rate_limiter.blocked_for() or 300
+                logger.error(f"IP adresa byla dočasně zablokována Binance API. Čekám {wait_time:.0f} sekund: {error_msg}")
+                rate_limiter.block(wait_time)
             elif "429" in error_msg or "too many requests" in error_msg.lower(): 
-                # Rate limit - exponenciální backoff
-                wait_time = delay * (2 ** attempt)
-                logger.warning(f"Rate limit dosažen, čekám {wait_time} sekund: {error_msg}")
-                time.sleep(wait_time)
+                # Rate limit - pozastavíme všechny požadavky s exponenciálním backoffem
+                wait_time = rate_limiter.blocked_for() or delay * (2 ** attempt)
+                logger.warning(f"Rate limit dosažen, čekám {wait_time:.0f} sekund: {error_msg}")
+                rate_limiter.block(wait_time)
             elif "Connection" in error_msg or "Timeout" in error_msg or "timeout" in error_msg.lower():
                 # Síťové problémy - zkusíme to znovu s delším timeoutem
                 wait_time = delay * (2 ** attempt)
@@ -293,278 +2125,2270 @@ def get_futures_symbols_with_retry(max_retries=7, initial_delay=1):
                 # Poslední pokus selhal, zkusíme alternativní přístup
                 logger.error(f"Všechny pokusy o získání seznamu futures symbolů selhaly: {error_msg}")
                 
-                # Záchranný mechanismus - zkusíme získat nejběžnější páry ručně
-                logger.info("Používám záložní seznam základních párů")
-                return ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "XRPUSDT", "ADAUSDT", "DOGEUSDT", "MATICUSDT", "AVAXUSDT", "DOTUSDT"]
+                # Záchranný mechanismus - SymbolUniverse ponechá poslední známý seznam
+                return []
     
     # Pokud jsme došli sem, všechny pokusy selhaly
     logger.error("Nepodařilo se získat futures symboly žádným způsobem")
-    return ["BTCUSDT", "ETHUSDT"]  # Vrátíme alespoň základní páry
+    return []
+
+# Záložní seznam základních párů pro případ, že se seznam symbolů nepodařilo získat ani jednou
+DEFAULT_SYMBOLS = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "XRPUSDT", "ADAUSDT", "DOGEUSDT", "MATICUSDT", "AVAXUSDT", "DOTUSDT"]
+
+class SymbolUniverse:
+    """
+    Cache seznamu obchodovatelných symbolů s TTL a obnovou na pozadí.
+    
+    futures_exchange_info je těžký požadavek a seznam symbolů se mění zřídka,
+    proto se stahuje jen jednou za TTL. Při změně se volají posluchači
+    s přidanými a odebranými symboly. Při selhání zůstává poslední známý seznam.
+    """
+    
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.symbols = []
+        self.updated = None
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.refreshing = threading.Lock()
+        self.refresh_thread = None
+        self.stats = {'refreshes': 0, 'failures': 0, 'last_refresh': None, 'added': 0, 'removed': 0}
+    
+    def subscribe(self, listener):
+        """Zaregistruje posluchače listener(added, removed) pro změny seznamu symbolů"""
+        self.listeners.append(listener)
+    
+    def restore(self, symbols):
+        """Nastaví poslední známý seznam (z perzistentní cache) - bez událostí, považuje se za zastaralý"""
+        with self.lock:
+            if not self.symbols:
+                self.symbols = list(symbols)
+    
+    def is_stale(self):
+        return self.updated is None or time.monotonic() - self.updated >= self.ttl
+    
+    def get(self):
+        """
+        Vrátí aktuální seznam symbolů. Poprvé ho stáhne synchronně, zastaralý
+        seznam vrátí hned a obnovu spustí na pozadí.
+        """
+        if not self.symbols:
+            self.refresh()
+        elif self.is_stale():
+            self.refresh_async()
+        
+        with self.lock:
+            return list(self.symbols) if self.symbols else list(DEFAULT_SYMBOLS)
+    
+    def refresh(self):
+        """
+        Stáhne seznam symbolů a ohlásí změny posluchačům
+        
+        Returns:
+            True pokud se seznam podařilo stáhnout
+        """
+        if not self.refreshing.acquire(blocking=False):
+            # Obnova už běží v jiném vlákně - počkáme na ni
+            with self.refreshing:
+                return self.symbols != []
+        
+        try:
+            symbols = get_futures_symbols_with_retry()
+            if not symbols:
+                self.stats['failures'] += 1
+                logger.warning(f"Seznam symbolů se nepodařilo obnovit, ponechávám posledních {len(self.symbols)} symbolů")
+                return False
+            
+            with self.lock:
+                previous = set(self.symbols)
+                self.symbols = symbols
+                self.updated = time.monotonic()
+            
+            self.stats['refreshes'] += 1
+            self.stats['last_refresh'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+            # Při prvním načtení bez známého seznamu nejde o změnu
+            if previous:
+                added = [symbol for symbol in symbols if symbol not in previous]
+                removed = sorted(previous - set(symbols))
+                if added or removed:
+                    self.stats['added'] += len(added)
+                    self.stats['removed'] += len(removed)
+                    logger.info(f"Změna seznamu symbolů: přidáno {added}, odebráno {removed}")
+                    for listener in self.listeners:
+                        try:
+                            listener(added, removed)
+                        except Exception as e:
+                            logger.error(f"Chyba při zpracování změny seznamu symbolů: {str(e)}")
+            
+            if state_cache is not None:
+                state_cache.save_universe(symbols)
+            return True
+        finally:
+            self.refreshing.release()
+    
+    def refresh_async(self):
+        """Spustí obnovu na pozadí, pokud už neběží"""
+        if self.refresh_thread is not None and self.refresh_thread.is_alive():
+            return
+        self.refresh_thread = threading.Thread(target=self.refresh, name='symbol-universe')
+        self.refresh_thread.daemon = True
+        self.refresh_thread.start()
+    
+    def start(self):
+        """Spustí pravidelnou obnovu seznamu symbolů jednou za TTL"""
+        def refresh_loop():
+            while running:
+                if self.is_stale():
+                    self.refresh()
+                time.sleep(5)
+        
+        thread = threading.Thread(target=refresh_loop, name='symbol-universe-refresh')
+        thread.daemon = True
+        thread.start()
+    
+    def snapshot(self):
+        return dict(self.stats, symbols=len(self.symbols), ttl=self.ttl, stale=self.is_stale())
+
+symbol_universe = SymbolUniverse(SYMBOL_UNIVERSE_TTL)
+
+# Symboly, které se přestaly obchodovat - jejich stav uvolní skenovací vlákno před dalším skenem
+evicted_symbols = set()
+evicted_symbols_lock = threading.Lock()
+
+def evict_removed_symbols(added, removed):
+    """
+    Posluchač změn seznamu symbolů. Běží ve vlákně obnovy seznamu, proto vyřazené
+    symboly jen zařadí k uvolnění - rsi_states a další stav mění jen skenovací vlákno.
+    """
+    if removed:
+        with evicted_symbols_lock:
+            evicted_symbols.update(removed)
+    
+    # Stav přidaných symbolů (buffery, RSI stav) vznikne při jejich prvním stažení
+    if added:
+        logger.info(f"Nové symboly {added} budou načteny při příštím skenu")
+
+def apply_symbol_evictions():
+    """Uvolní stav vyřazených symbolů - volá skenovací vlákno na začátku skenu"""
+    with evicted_symbols_lock:
+        removed = sorted(evicted_symbols)
+        evicted_symbols.clear()
+    if not removed:
+        return
+    
+    for symbol in removed:
+        candle_store.evict(symbol)
+        rsi_table.remove(symbol)
+        symbol_circuits.forget([symbol])
+        rsi_history.evict(symbol)
+        for key in [key for key in rsi_states if key[0] == symbol]:
+            del rsi_states[key]
+    
+    if state_cache is not None:
+        state_cache.evict_symbols(removed)
+    logger.info(f"Uvolněn stav {len(removed)} vyřazených symbolů")
+
+symbol_universe.subscribe(evict_removed_symbols)
 
 # Funkce pro určení trendu RSI
-def determine_trend(symbol, current_rsi, timeframe="1h"):
+def determine_trend(symbol, timeframe="1h"):
     """
-    Určí trend RSI pro daný symbol porovnáním s předchozí hodnotou
+    Určí trend RSI pro daný symbol ze sklonu regrese přes posledních TREND_WINDOW svíček historie
     
     Args:
         symbol: Symbol (např. BTCUSDT)
-        current_rsi: Aktuální hodnota RSI
         timeframe: Časový rámec (1h, 15m, 1d)
     
     Returns:
-        String: "up", "down", "stable" nebo None pokud nemáme předchozí hodnotu
+        String: "up", "down", "stable" nebo None pokud nemáme aspoň dva body historie
     """
-    key = f"{symbol}_{timeframe}"
-    
-    if key not in previous_rsi_values:
-        # Pro první spuštění nemáme předchozí hodnotu
-        previous_rsi_values[key] = current_rsi
+    series = rsi_history.series(symbol, timeframe, TREND_WINDOW)
+    if series is None or len(series[1]) < 2:
         return None
     
-    previous_rsi = previous_rsi_values[key]
+    return classify_trend(rsi_slope(series[1].astype(np.float64)))
+
+def build_result_row(symbol, rsi_1h, rsi_15m, rsi_1d, current_price):
+    """
+    Sestaví řádek výsledku včetně trendů pro všechny časové rámce
     
-    # Aktualizujeme hodnotu pro příští běh
-    previous_rsi_values[key] = current_rsi
+    Args:
+        symbol: Symbol (např. BTCUSDT)
+        rsi_1h: RSI pro 1h timeframe
+        rsi_15m: RSI pro 15m timeframe
+        rsi_1d: RSI pro 1d timeframe
+        current_price: Aktuální cena
     
-    # Určíme trend (použijeme malý práh 0.5 pro stabilitu)
-    if current_rsi > previous_rsi + 0.5:
-        return "up"
-    elif current_rsi < previous_rsi - 0.5:
-        return "down"
-    else:
-        return "stable"
-
-def get_futures_data():
+    Returns:
+        Dict s daty pro tabulku
+    """
+    # Určení trendu pro všechny časové rámce
+    trend_1h = determine_trend(symbol, "1h")
+    trend_15m = determine_trend(symbol, "15m")
+    trend_1d = determine_trend(symbol, "1d")
+    
+    logger.info(f"✓ Nalezen {symbol} s RSI 1h {rsi_1h:.2f} ({trend_1h or 'initial'}), 15m {rsi_15m:.2f} ({trend_15m or 'initial'}), 1d {rsi_1d:.2f} ({trend_1d or 'initial'}) (možný {'SHORT' if rsi_1h >= RSI_HIGH else 'LONG'})")
+    
+    return {
+        'symbol': symbol,
+        'rsi': round(rsi_1h, 2),
+        'rsi_15m': round(rsi_15m, 2),
+        'rsi_1d': round(rsi_1d, 2),
+        'price': f"${current_price:.4f}",
+        'trend': trend_1h or "stable",  # Trend pro 1h timeframe
+        'trend_15m': trend_15m or "stable",  # Trend pro 15m timeframe
+        'trend_1d': trend_1d or "stable",  # Trend pro 1d timeframe
+        'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')  # Čas obnovy dat symbolu
+    }
+
+# Číselné sloupce tabulky všech symbolů pro /api/rsi (+ zapnuté indikátory pro každý timeframe)
+RSI_TABLE_COLUMNS = ('rsi_1h', 'rsi_15m', 'rsi_1d', 'price', 'updated') + tuple(
+    f"{indicator.name}_{interval}" for indicator in ENABLED_INDICATORS for interval in SCAN_INTERVALS)
+
+# Výchozí a maximální počet řádků jedné odpovědi /api/rsi
+API_DEFAULT_LIMIT = 100
+API_MAX_LIMIT = 1000
+
+# Parametry /api/rsi - jiné se odmítnou (nezakódované & ve filtru by jinak podmínku tiše zahodilo)
+API_RSI_PARAMS = ('filter', 'sort', 'limit', 'offset', 'fields')
+
+class RsiTable:
+    """
+    Poslední hodnoty RSI a ceny všech symbolů (zapisovaná strana tabulky).
+    Při publikaci se z ní sestaví neměnný sloupcový RsiTableView.
+    """
+    
+    def __init__(self):
+        self.rows = {}
+        self.lock = threading.Lock()
+    
+    def update(self, symbol, **values):
+        """Zapíše hodnoty symbolu, nezadané sloupce si ponechají předchozí hodnotu"""
+        with self.lock:
+            row = self.rows.get(symbol)
+            if row is None:
+                row = self.rows[symbol] = dict.fromkeys(RSI_TABLE_COLUMNS, np.nan)
+            row.update(values)
+            row['updated'] = time.time()
+    
+    def remove(self, symbol):
+        with self.lock:
+            self.rows.pop(symbol, None)
+    
+    def view(self, version):
+        with self.lock:
+            symbols = list(self.rows)
+            columns = {name: [self.rows[symbol][name] for symbol in symbols] for name in RSI_TABLE_COLUMNS}
+        return RsiTableView(version, symbols, columns)
+
+class RsiTableView:
+    """
+    Neměnný sloupcový pohled na tabulku všech symbolů s předpočítanými
+    seřazenými indexy pro každý sloupec. Dotaz /api/rsi pak jen vyhodnotí
+    masku filtru a vybere stránku z hotového pořadí.
+    """
+    
+    def __init__(self, version, symbols, columns):
+        self.version = version
+        self.symbols = np.array(symbols, dtype=object)
+        self.columns = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+        
+        # Vzestupné i sestupné pořadí, chybějící hodnoty (NaN) vždy na konci
+        self.order = {'symbol': (np.argsort(self.symbols, kind='stable'), np.argsort(self.symbols, kind='stable')[::-1])}
+        for name, values in self.columns.items():
+            self.order[name] = (np.argsort(values, kind='stable'), np.argsort(-values, kind='stable'))
+    
+    def __len__(self):
+        return len(self.symbols)
+    
+    def fields(self):
+        return ('symbol',) + tuple(self.columns)
+    
+    def to_payload(self):
+        """Sloupce jako JSON bajty (předání čtecím workerům ve sdíleném režimu)"""
+        return json.dumps({
+            'version': self.version,
+            'symbols': self.symbols.tolist(),
+            'columns': {name: [None if np.isnan(value) else value for value in values.tolist()]
+                        for name, values in self.columns.items()}
+        }).encode()
+    
+    @classmethod
+    def from_payload(cls, data):
+        payload = json.loads(data)
+        columns = {name: [np.nan if value is None else value for value in values]
+                   for name, values in payload['columns'].items()}
+        return cls(payload['version'], payload['symbols'], columns)
+    
+    def mask(self, conditions):
+        """Vyhodnotí podmínky filtru (AND) jako booleovskou masku"""
+        return filter_mask(self.symbols, self.columns, conditions)
+    
+    def query(self, conditions=(), sort='symbol', descending=False, offset=0, limit=API_DEFAULT_LIMIT, fields=None):
+        """
+        Vybere stránku řádků podle filtru a řazení
+        
+        Returns:
+            Tuple (počet řádků vyhovujících filtru, list řádků stránky)
+        """
+        order = self.order[sort][1 if descending else 0]
+        if conditions:
+            order = order[self.mask(conditions)[order]]
+        page = order[offset:offset + limit]
+        
+        fields = fields or self.fields()
+        columns = {field: self.symbols[page] if field == 'symbol' else self.columns[field][page] for field in fields}
+        rows = []
+        for i in range(len(page)):
+            row = {}
+            for field in fields:
+                value = columns[field][i]
+                if field == 'symbol':
+                    row[field] = value
+                elif np.isnan(value):
+                    row[field] = None
+                else:
+                    row[field] = round(float(value), 2) if field.startswith('rsi') else float(value)
+            rows.append(row)
+        
+        return len(order), rows
+
+# Operátory filtrovacích výrazů /api/rsi (porovnání s NaN je vždy False)
+FILTER_OPERATORS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '=': np.equal,
+    '==': np.equal,
+    '!=': np.not_equal
+}
+
+FILTER_CONDITION = re.compile(r'^\s*([a-z0-9_]+)\s*(>=|<=|!=|==|=|>|<)\s*(\S+?)\s*$')
+
+def parse_filter(expression, fields):
+    """
+    Rozloží filtrovací výraz na podmínky spojené AND
+    
+    Args:
+        expression: Výraz jako "rsi_1h>70&rsi_15m<30" (oddělovač & nebo čárka,
+            v URL query je nutné & zakódovat jako %26)
+        fields: Povolené názvy sloupců
+    
+    Returns:
+        List (sloupec, operátor, hodnota)
+    
+    Raises:
+        ValueError: Neplatný výraz
+    """
+    conditions = []
+    for part in re.split(r'[&,]', expression or ''):
+        if not part.strip():
+            continue
+        match = FILTER_CONDITION.match(part)
+        if not match:
+            raise ValueError(f"Neplatná podmínka filtru: {part}")
+        field, op, value = match.groups()
+        if field not in fields:
+            raise ValueError(f"Neznámý sloupec ve filtru: {field}")
+        if field == 'symbol':
+            if op not in ('=', '==', '!='):
+                raise ValueError(f"Sloupec symbol podporuje jen = a !=")
+            value = value.upper()
+        else:
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"Neplatná hodnota ve filtru: {value}")
+        conditions.append((field, op, value))
+    return conditions
+
+def filter_mask(symbols, columns, conditions):
+    """
+    Vyhodnotí podmínky filtru (AND) nad sloupci jako booleovskou masku
+    
+    Args:
+        symbols: NumPy pole symbolů
+        columns: Dict sloupec -> NumPy pole hodnot ve stejném pořadí
+        conditions: Podmínky z parse_filter
+    """
+    mask = np.ones(len(symbols), dtype=bool)
+    for field, op, value in conditions:
+        values = symbols if field == 'symbol' else columns[field]
+        mask &= FILTER_OPERATORS[op](values, value)
+    return mask
+
+def load_screen_rule(name):
+    """Načte doplňkové podmínky skenu z proměnné prostředí (syntaxe filtru /api/rsi)"""
+    try:
+        return parse_filter(os.getenv(name, ''), ('symbol',) + RSI_TABLE_COLUMNS)
+    except ValueError as e:
+        logger.error(f"Neplatné pravidlo {name} - ignoruji ho: {str(e)}")
+        return []
+
+# Doplňkové podmínky pro zařazení do výsledků, platí spolu s prahy RSI_HIGH/RSI_LOW
+# (např. SCREEN_HIGH="stoch_rsi_1h>80&volume_ratio_1h>=1.5", SCREEN_LOW="ema_cross_15m=1")
+SCREEN_HIGH = load_screen_rule('SCREEN_HIGH')
+SCREEN_LOW = load_screen_rule('SCREEN_LOW')
+
+def screen_masks(symbols, columns):
+    """
+    Pravidla skenu nad sloupci tabulky - 1h RSI vůči prahům a podmínky SCREEN_HIGH/SCREEN_LOW
+    
+    Returns:
+        Tuple booleovských masek (možný SHORT, možný LONG)
+    """
+    high = (columns['rsi_1h'] >= RSI_HIGH) & filter_mask(symbols, columns, SCREEN_HIGH)
+    low = (columns['rsi_1h'] <= RSI_LOW) & filter_mask(symbols, columns, SCREEN_LOW)
+    return high, low & ~high
+
+# Tabulka všech symbolů a její aktuální publikovaný pohled
+rsi_table = RsiTable()
+rsi_table_view = RsiTableView(0, [], {name: [] for name in RSI_TABLE_COLUMNS})
+
+def compute_indicators(interval, symbols):
+    """
+    Spočítá zapnuté indikátory pro symboly jednoho timeframe z candle_store.
+    Symboly se stejnou délkou řady tvoří jednu matici (symboly x svíčky)
+    a každý indikátor nad ní proběhne jedním vektorovým průchodem.
+    
+    Returns:
+        Dict název indikátoru -> NumPy pole hodnot v pořadí symbols (NaN bez dostatku dat)
+    """
+    results = {indicator.name: np.full(len(symbols), np.nan) for indicator in ENABLED_INDICATORS}
+    if not ENABLED_INDICATORS:
+        return results
+    
+    names = sorted({column for indicator in ENABLED_INDICATORS for column in indicator.columns})
+    groups = {}
+    for i, symbol in enumerate(symbols):
+        columns = candle_store.columns(symbol, interval, names, INDICATOR_LOOKBACK)
+        if columns is not None:
+            groups.setdefault(len(columns[names[0]]), []).append((i, columns))
+    
+    for length, members in groups.items():
+        rows = [i for i, _ in members]
+        data = IndicatorInput({name: np.vstack([columns[name] for _, columns in members]) for name in names})
+        for indicator in ENABLED_INDICATORS:
+            if length < indicator.lookback:
+                continue
+            started = time.perf_counter()
+            try:
+                results[indicator.name][rows] = indicator.compute(data)
+            except Exception as e:
+                logger.error(f"Chyba při výpočtu indikátoru {indicator.name} ({interval}): {str(e)}")
+            indicator_compute_seconds.observe(time.perf_counter() - started, indicator.name, interval)
+    
+    return results
+
+def process_batch(symbols, high_rsi_results, low_rsi_results):
+    """
+    Spočítá RSI a zapnuté indikátory pro skupinu symbolů z candle_store
+    (vektorově pro každý timeframe) a zařadí je do výsledků
+    
+    Args:
+        symbols: Symboly ke zpracování
+        high_rsi_results: List pro RSI >= RSI_HIGH a SCREEN_HIGH (možný SHORT)
+        low_rsi_results: List pro RSI <= RSI_LOW a SCREEN_LOW (možný LONG)
+    """
+    series = {}
+    for symbol in symbols:
+        series_by_interval = {interval: candle_store.series(symbol, interval) for interval in SCAN_INTERVALS}
+        missing = [interval for interval, values in series_by_interval.items() if values is None]
+        if missing:
+            logger.warning(f"Žádná {missing[0]} data pro {symbol}")
+            continue
+        series[symbol] = series_by_interval
+    
+    if not series:
+        return
+    
+    # Výpočet RSI a indikátorů pro všechny symboly skupiny - jeden vektorový průchod na timeframe
+    batch = list(series)
+    rsi_by_interval = {}
+    columns = {}
+    try:
+        for interval in SCAN_INTERVALS:
+            started = time.perf_counter()
+            series_by_symbol = {symbol: values[interval] for symbol, values in series.items()}
+            rsi_by_interval[interval] = update_rsi_states(interval, series_by_symbol)
+            rsi_compute_seconds.observe(time.perf_counter() - started, interval)
+            rsi_history.record(interval, series_by_symbol, rsi_by_interval[interval])
+            
+            columns[f"rsi_{interval}"] = np.array([np.nan if rsi_by_interval[interval][symbol] is None
+                                                   else rsi_by_interval[interval][symbol] for symbol in batch])
+            for name, values in compute_indicators(interval, batch).items():
+                columns[f"{name}_{interval}"] = values
+    except Exception as e:
+        logger.error(f"Chyba při výpočtu RSI: {str(e)}")
+        return
+    
+    columns['price'] = np.array([float(series[symbol][Client.KLINE_INTERVAL_1HOUR][1][-1]) for symbol in batch])
+    
+    # Pravidla skenu (pouze podle 1h RSI + volitelné podmínky nad indikátory) pro celou skupinu najednou
+    high_mask, low_mask = screen_masks(np.array(batch, dtype=object), columns)
+    indicator_columns = [name for name in columns if name not in ('rsi_1h', 'rsi_15m', 'rsi_1d', 'price')]
+    
+    for i, symbol in enumerate(batch):
+        # Výpočet RSI - 1h
+        rsi_1h = rsi_by_interval[Client.KLINE_INTERVAL_1HOUR][symbol]
+        if rsi_1h is None:
+            logger.warning(f"Nelze vypočítat 1h RSI pro {symbol}")
+            continue
+        
+        # Výpočet RSI - 15m
+        rsi_15m = rsi_by_interval[Client.KLINE_INTERVAL_15MINUTE][symbol]
+        if rsi_15m is None:
+            logger.warning(f"Nelze vypočítat 15m RSI pro {symbol}")
+            rsi_15m = 0  # Nastavíme na 0, abychom mohli pokračovat
+        
+        # Výpočet RSI - 1d
+        rsi_1d = rsi_by_interval[Client.KLINE_INTERVAL_1DAY][symbol]
+        if rsi_1d is None:
+            logger.warning(f"Nelze vypočítat 1d RSI pro {symbol}")
+            rsi_1d = 0  # Nastavíme na 0, abychom mohli pokračovat
+        
+        current_price = float(columns['price'][i])
+        
+        # Tabulka všech symbolů pro /api/rsi (nezávisle na pravidlech skenu)
+        rsi_table.update(symbol, rsi_1h=rsi_1h, price=current_price,
+                         rsi_15m=columns['rsi_15m'][i], rsi_1d=columns['rsi_1d'][i],
+                         **{name: columns[name][i] for name in indicator_columns})
+        
+        if high_mask[i]:  # Signál pro možný SHORT
+            high_rsi_results.append(build_result_row(symbol, rsi_1h, rsi_15m, rsi_1d, current_price))
+        elif low_mask[i]:  # Signál pro možný LONG
+            low_rsi_results.append(build_result_row(symbol, rsi_1h, rsi_15m, rsi_1d, current_price))
+
+class Snapshot:
+    """
+    Neměnný snímek výsledků pro /get_rsi_data.
+    
+    JSON se serializuje a komprimuje jednou při publikaci, požadavky pak jen
+    posílají hotové bajty. Silný ETag je odvozen z data_version (a kontrolního
+    součtu obsahu, aby se verze nepletly mezi restarty bez perzistentní cache).
+    """
+    
+    __slots__ = ('version', 'etag', 'body', 'gzip', 'brotli', 'last_update')
+    
+    def __init__(self, version, payload):
+        self.version = version
+        self.last_update = payload.get('last_update')
+        self.body = json.dumps(payload, separators=(',', ':')).encode()
+        self.gzip = gzip.compress(self.body, compresslevel=6)
+        self.brotli = brotli.compress(self.body) if brotli is not None else None
+        self.etag = f'"{version}-{zlib.crc32(self.body):08x}"'
+    
+    @classmethod
+    def from_parts(cls, version, etag, last_update, body, gzip_body, brotli_body):
+        """Sestaví snímek z hotových bajtů (převzatý ze sdíleného souboru skeneru)"""
+        snapshot = cls.__new__(cls)
+        snapshot.version = version
+        snapshot.etag = etag
+        snapshot.last_update = last_update
+        snapshot.body = body
+        snapshot.gzip = gzip_body
+        snapshot.brotli = brotli_body
+        return snapshot
+    
+    def encoded(self, accept_encoding):
+        """
+        Vybere variantu podle hlavičky Accept-Encoding
+        
+        Returns:
+            Tuple (bajty, Content-Encoding nebo None)
+        """
+        if self.brotli is not None and 'br' in accept_encoding:
+            return self.brotli, 'br'
+        if 'gzip' in accept_encoding:
+            return self.gzip, 'gzip'
+        return self.body, None
+    
+    def sizes(self):
+        return {
+            'json': len(self.body),
+            'gzip': len(self.gzip),
+            'brotli': len(self.brotli) if self.brotli is not None else None
+        }
+
+# Aktuální snímek výsledků - při publikaci se celý nahradí novým
+current_snapshot = Snapshot(0, {'high_rsi': [], 'low_rsi': [], 'version': 0})
+
+def build_snapshot():
+    """Sestaví nový snímek z results_cache pro aktuální data_version"""
+    global current_snapshot
+    
+    if results_cache['last_update'] is None:
+        return current_snapshot
+    
+    current_snapshot = Snapshot(data_version, {
+        'high_rsi': results_cache['high_rsi'],
+        'low_rsi': results_cache['low_rsi'],
+        'last_update': results_cache['last_update'],
+        'version': data_version
+    })
+    return current_snapshot
+
+def snapshot_age(snapshot):
+    """Stáří snímku v sekundách podle jeho last_update (None pro prázdný snímek)"""
+    if not snapshot.last_update:
+        return None
+    return max(0.0, time.time() - datetime.strptime(snapshot.last_update, '%Y-%m-%d %H:%M:%S').timestamp())
+
+def diff_rows(previous, current):
+    """
+    Rozdíl tabulky výsledků proti předchozí verzi podle symbolu
+    
+    Returns:
+        Dict s novými nebo změněnými řádky (upsert) a symboly, které z tabulky zmizely (remove)
+    """
+    previous_by_symbol = {row['symbol']: row for row in previous}
+    current_symbols = set()
+    upsert = []
+    
+    for row in current:
+        current_symbols.add(row['symbol'])
+        if previous_by_symbol.get(row['symbol']) != row:
+            upsert.append(row)
+    
+    return {
+        'upsert': upsert,
+        'remove': [symbol for symbol in previous_by_symbol if symbol not in current_symbols]
+    }
+
+def merge_with_previous(rows, previous_rows, processed):
+    """Doplní výsledky průběžně publikovaného skenu o předchozí řádky dosud nezpracovaných symbolů"""
+    return rows + [row for row in previous_rows if row['symbol'] not in processed]
+
+def publish_results(high_rsi_results, low_rsi_results):
+    """
+    Seřadí výsledky, zapíše je do globální cache a zvýší verzi dat pro SSE
+    
+    Returns:
+        Tuple (high_rsi_sorted, low_rsi_sorted)
+    """
+    global data_version, rsi_table_view
+    
+    high_rsi_sorted = sorted(high_rsi_results, key=lambda x: x['rsi'], reverse=True)
+    low_rsi_sorted = sorted(low_rsi_results, key=lambda x: x['rsi'])
+    
+    # Výsledky obnovené z cache jsou výchozí stav pro alerty (po restartu jen skutečné změny)
+    if ALERTS_ENABLED and not alert_engine.primed and (results_cache['high_rsi'] or results_cache['low_rsi']):
+        alert_engine.prime(results_cache['high_rsi'], results_cache['low_rsi'])
+    
+    # Změny řádků proti předchozí verzi pro SSE klienty
+    changes = {
+        'high_rsi': diff_rows(results_cache['high_rsi'], high_rsi_sorted),
+        'low_rsi': diff_rows(results_cache['low_rsi'], low_rsi_sorted)
+    }
+    
+    results_cache['high_rsi'] = high_rsi_sorted
+    results_cache['low_rsi'] = low_rsi_sorted
+    results_cache['last_update'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    # Jak stará data klienti dostávali, než je nahradil tento snímek
+    age = snapshot_age(current_snapshot)
+    if age is not None:
+        snapshot_staleness_seconds.observe(age)
+    
+    # Inkrementace verze dat, nový snímek pro /get_rsi_data a /api/rsi a probuzení SSE klientů
+    data_version += 1
+    snapshot = build_snapshot()
+    rsi_table_view = rsi_table.view(data_version)
+    if SSE_DELTAS:
+        # Klient s verzí base změny aplikuje, jinak si načte celý snímek
+        event_bytes = sse_broadcaster.publish(data_version, {
+            'version': data_version,
+            'base': data_version - 1,
+            'last_update': results_cache['last_update'],
+            'changes': changes
+        })
+    else:
+        event_bytes = sse_broadcaster.publish(data_version, {'update_available': True, 'last_update': results_cache['last_update']})
+    snapshot_stats['event_bytes'] += event_bytes
+    snapshot_stats['snapshot_bytes'] += len(snapshot.body)
+    
+    # Přechody symbolů mezi zónami -> alerty; doručení běží mimo skener, tady jen předání do fronty
+    if ALERTS_ENABLED:
+        alert_dispatcher.submit(alert_engine.observe(high_rsi_sorted, low_rsi_sorted, data_version))
+    
+    # Ve sdíleném režimu předáme snímek ostatním workerům
+    if shared_state.is_scanner:
+        shared_state.write(snapshot, sse_broadcaster.recent(SHARED_EVENTS), rsi_table_view)
+    
+    # Průběžný zápis změn na disk pro rychlý start po restartu
+    flush_state_cache()
+    
+    return high_rsi_sorted, low_rsi_sorted
+
+def fetch_klines(symbol, interval):
+    """
+    Jeden pokus o stažení chybějících svíček a jejich zapracování do candle_store.
+    Odvozený timeframe se stahuje jen jako seed historie, po každém stažení
+    BASE_INTERVAL se odvozené timeframy složí znovu od první stažené svíčky.
+    
+    Returns:
+        Počet stažených svíček
+    """
+    if interval in DERIVED_INTERVALS:
+        # Jednorázová historie pro RSI - aktuální úseky se hned překryjí složenými svíčkami
+        klines = get_futures_klines(symbol, interval)
+        candle_store.replace(symbol, interval, klines)
+        derive_timeframes(symbol)
+        with fetch_stats_lock:
+            derived_stats['seeds'] += 1
+        return len(klines)
+    
+    start_time = candle_store.last_open_time(symbol, interval)
+    if start_time is not None and candle_store.length(symbol, interval) >= KLINE_HISTORY:
+        # Stahujeme jen od poslední uložené (tvořící se) svíčky dál
+        missing = (int(time.time() * 1000) - start_time) // INTERVAL_MS[interval] + 1
+        if missing <= KLINE_HISTORY:
+            klines = get_futures_klines(symbol, interval, start_time=start_time, limit=max(2, missing + 1))
+            merge_klines(symbol, interval, klines)
+            if interval == BASE_INTERVAL and DERIVED_INTERVALS:
+                derive_timeframes(symbol, since=start_time)
+            return len(klines)
+    
+    # První načtení, příliš dlouhá mezera nebo krátký buffer (nově zapnutý indikátor
+    # s delším lookbackem) - stáhneme celé okno pro seed RSI a indikátory
+    klines = get_futures_klines(symbol, interval, limit=full_history_limit(interval))
+    merge_klines(symbol, interval, klines)
+    if interval == BASE_INTERVAL and DERIVED_INTERVALS:
+        derive_timeframes(symbol)
+    return len(klines)
+
+def full_history_limit(interval):
+    """
+    Počet svíček plného stažení - u BASE_INTERVAL odvozených timeframe aspoň celý
+    aktuální úsek nejdelšího z nich, aby se jeho tvořící se svíčka dala složit od začátku
+    """
+    if interval != BASE_INTERVAL or not DERIVED_INTERVALS:
+        return KLINE_HISTORY
+    longest = max(INTERVAL_MS[derived] for derived in DERIVED_INTERVALS)
+    return max(KLINE_HISTORY, int(time.time() * 1000) % longest // INTERVAL_MS[interval] + 1)
+
+def derive_timeframes(symbol, since=None):
+    """Složí odvozené timeframy symbolu ze svíček BASE_INTERVAL (od úseku obsahujícího since)"""
+    bars = sum(candle_store.derive(symbol, BASE_INTERVAL, interval, since) for interval in DERIVED_INTERVALS)
+    with fetch_stats_lock:
+        derived_stats['bars'] += bars
+
+def needs_seed(symbol, interval):
+    """
+    Zda odvozený timeframe potřebuje historii z REST - chybí, je kratší než KLINE_HISTORY,
+    nebo by mezi ním a svíčkami BASE_INTERVAL (po výpadku) zůstala mezera
+    """
+    last_open_time = candle_store.last_open_time(symbol, interval)
+    if last_open_time is None or candle_store.length(symbol, interval) < KLINE_HISTORY:
+        return True
+    longest = max(INTERVAL_MS[derived] for derived in DERIVED_INTERVALS)
+    return last_open_time + INTERVAL_MS[interval] < int(time.time() * 1000) // longest * longest
+
+def fetch_plan(symbol, refresh, needed=SCAN_INTERVALS):
+    """
+    Timeframy, které je pro symbol potřeba stáhnout přes REST
+    
+    Args:
+        symbol: Symbol
+        refresh: Timeframy, jejichž svíčky se v tomto skenu obnovují
+        needed: Timeframy, které musí být po stažení k dispozici (chybějící se stáhnou)
+    
+    Returns:
+        List timeframe pro fetch engine - s odvozenými timeframy jen BASE_INTERVAL
+        (při jakékoli obnově) a seedy odvozených timeframe, které ho potřebují
+    """
+    if not DERIVED_INTERVALS:
+        return [interval for interval in needed
+                if interval in refresh or candle_store.last_open_time(symbol, interval) is None]
+    
+    plan = []
+    if refresh or candle_store.last_open_time(symbol, BASE_INTERVAL) is None:
+        plan.append(BASE_INTERVAL)
+    plan.extend(interval for interval in DERIVED_INTERVALS if interval in needed and needs_seed(symbol, interval))
+    return plan
+
+def verify_derived_timeframes(symbols):
+    """
+    Ověřovací režim - porovná uzavřené složené svíčky s REST klines
+    
+    Returns:
+        Dict timeframe -> {'bars': porovnané svíčky, 'mismatched': neshody, 'max_diff': největší relativní odchylka}
+    """
+    report = {interval: {'bars': 0, 'mismatched': 0, 'max_diff': 0.0} for interval in DERIVED_INTERVALS}
+    names = ('open_time', 'open', 'high', 'low', 'close', 'volume')
+    
+    for symbol in symbols:
+        base = candle_store.columns(symbol, BASE_INTERVAL, ('open_time',))
+        if base is None:
+            continue
+        base_first, base_last = int(base['open_time'][0]), int(base['open_time'][-1])
+        
+        for interval in DERIVED_INTERVALS:
+            derived = candle_store.columns(symbol, interval, names)
+            if derived is None:
+                continue
+            try:
+                klines = get_futures_klines(symbol, interval)
+            except Exception as e:
+                logger.warning(f"Ověření odvozených svíček {symbol} {interval} přerušeno: {str(e)}")
+                return report
+            
+            index = {open_time: i for i, open_time in enumerate(derived['open_time'].tolist())}
+            step = INTERVAL_MS[interval]
+            for kline in klines:
+                open_time = int(kline[0])
+                # Jen uzavřené svíčky složené z BASE_INTERVAL - tvořící se se mezi staženími liší
+                if open_time < base_first or open_time + step > base_last or open_time not in index:
+                    continue
+                i = index[open_time]
+                expected = np.array(kline[1:6], dtype=np.float64)
+                actual = np.array([derived[name][i] for name in names[1:]])
+                diff = float(np.max(np.abs(actual - expected) / np.maximum(np.abs(expected), 1e-12)))
+                
+                stats = report[interval]
+                stats['bars'] += 1
+                stats['max_diff'] = max(stats['max_diff'], diff)
+                if diff > DERIVED_VERIFY_TOLERANCE:
+                    stats['mismatched'] += 1
+                    derived_mismatches.inc(interval)
+                    logger.warning(f"Odvozená svíčka {symbol} {interval} {datetime.fromtimestamp(open_time / 1000)} "
+                                   f"nesouhlasí s REST: {actual.tolist()} vs. {expected.tolist()}")
+    return report
+
+def run_derived_verification(symbols):
+    """Ověří další skupinu DERIVED_VERIFY_SYMBOLS symbolů (postupně celý trh) a uloží výsledek"""
+    with fetch_stats_lock:
+        offset = derived_stats['verify_offset'] % max(1, len(symbols))
+        derived_stats['verify_offset'] = offset + DERIVED_VERIFY_SYMBOLS
+    sample = (symbols[offset:] + symbols[:offset])[:DERIVED_VERIFY_SYMBOLS]
+    
+    report = verify_derived_timeframes(sample)
+    mismatched = sum(stats['mismatched'] for stats in report.values())
+    logger.info(f"Ověření odvozených svíček: {len(sample)} symbolů, "
+                f"{sum(stats['bars'] for stats in report.values())} svíček, {mismatched} neshod")
+    with fetch_stats_lock:
+        derived_stats['last_verification'] = dict(report, symbols=sample,
+                                                  time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+def merge_klines(symbol, interval, klines):
+    """Zapracuje stažené klines do candle_store a změří dobu převodu"""
+    started = time.perf_counter()
+    candle_store.merge(symbol, interval, klines)
+    kline_parse_seconds.observe(time.perf_counter() - started, interval)
+
+class CircuitBreaker:
+    """
+    Circuit breaker pro jednotlivé symboly.
+    
+    Po threshold selháních v řadě se circuit symbolu rozpojí a po dobu cooldown
+    se na symbol neposílají požadavky. Po cooldownu projde další pokus - úspěch
+    circuit spojí, další selhání ho hned rozpojí znovu.
+    """
+    
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = {}
+        self.open_until = {}
+        self.lock = threading.Lock()
+        self.stats = {'opened': 0, 'rejected': 0}
+    
+    def allow(self, key):
+        with self.lock:
+            if self.open_until.get(key, 0) > time.monotonic():
+                self.stats['rejected'] += 1
+                return False
+            return True
+    
+    def record_success(self, key):
+        with self.lock:
+            self.failures.pop(key, None)
+            self.open_until.pop(key, None)
+    
+    def record_failure(self, key):
+        """
+        Returns:
+            True pokud se circuit tímto selháním rozpojil
+        """
+        with self.lock:
+            failures = self.failures.get(key, 0) + 1
+            self.failures[key] = failures
+            if failures < self.threshold:
+                return False
+            self.open_until[key] = time.monotonic() + self.cooldown
+            self.stats['opened'] += 1
+            return True
+    
+    def forget(self, keys):
+        """Zapomene stav odebraných symbolů"""
+        with self.lock:
+            for key in keys:
+                self.failures.pop(key, None)
+                self.open_until.pop(key, None)
+    
+    def open_keys(self):
+        now = time.monotonic()
+        with self.lock:
+            return sorted(key for key, until in self.open_until.items() if until > now)
+    
+    def snapshot(self):
+        open_keys = self.open_keys()
+        with self.lock:
+            return dict(self.stats, open=len(open_keys), open_symbols=open_keys[:20],
+                        threshold=self.threshold, cooldown=self.cooldown)
+
+symbol_circuits = CircuitBreaker(CIRCUIT_FAILURES, CIRCUIT_COOLDOWN)
+
+# Souhrnné statistiky fetch enginu za všechny skeny
+fetch_stats = {'attempts': 0, 'requeued': 0, 'blocked': 0, 'failed': 0, 'circuit_skipped': 0, 'ban_skipped': 0}
+
+# Odvozené timeframy - seedy z REST, složené svíčky a poslední ověření proti REST
+derived_stats = {'seeds': 0, 'bars': 0, 'verify_offset': 0, 'last_verification': None}
+fetch_stats_lock = threading.Lock()
+
+class KlineFetcher:
+    """
+    Fetch engine s neblokujícím opakováním pokusů.
+    
+    Každý pokus je samostatná úloha v poolu. Neúspěšný pokus ve workeru nespí,
+    ale vrátí se do fronty s vlastním deadlinem (exponenciální backoff) a worker
+    mezitím stahuje další symboly. Symboly s rozpojeným circuitem se přeskočí
+    a při banu IP skončí všechny zbývající úlohy hned, takže délku skenu
+    určují jen zdravé symboly.
+    """
+    
+    def __init__(self, executor, max_attempts=FETCH_MAX_ATTEMPTS):
+        self.executor = executor
+        self.max_attempts = max_attempts
+        self.retries = []  # Halda (deadline, pořadí, výsledek, symbol, interval, pokus)
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.stats = dict.fromkeys(fetch_stats, 0)
+        self.timer = threading.Thread(target=self._run_timer, name='kline-retry', daemon=True)
+        self.timer.start()
+    
+    def submit(self, symbol, interval):
+        """
+        Zařadí stažení klines symbolu a timeframe
+        
+        Returns:
+            Future s počtem stažených svíček, nebo None při selhání
+        """
+        result = Future()
+        self._start(result, symbol, interval, 0)
+        return result
+    
+    def close(self):
+        """Zastaví časovač opakování, nedokončené úlohy skončí jako selhání"""
+        with self.condition:
+            self.closed = True
+            pending = self.retries
+            self.retries = []
+            self.condition.notify_all()
+        
+        for entry in pending:
+            self._finish(entry[2], None)
+        self.timer.join()
+        
+        with fetch_stats_lock:
+            for key, value in self.stats.items():
+                fetch_stats[key] += value
+    
+    def _start(self, result, symbol, interval, attempt):
+        try:
+            task = self.executor.submit(self._attempt, result, symbol, interval, attempt)
+        except RuntimeError:
+            # Pool je už ukončený (shutdown)
+            self._finish(result, None)
+            return
+        
+        def on_done(task):
+            # Úloha zrušená při ukončení poolu nesmí nechat výsledek viset
+            if task.cancelled():
+                self._finish(result, None)
+        
+        task.add_done_callback(on_done)
+    
+    def _finish(self, result, value):
+        if not result.done():
+            result.set_result(value)
+    
+    def _count(self, key):
+        with self.condition:
+            self.stats[key] += 1
+    
+    def _attempt(self, result, symbol, interval, attempt):
+        if not running or self.closed:
+            self._finish(result, None)
+            return
+        
+        if rate_limiter.banned_for() > 0:
+            # Globální circuit - během banu IP se nic neposílá
+            self._count('ban_skipped')
+            self._finish(result, None)
+            return
+        
+        if not symbol_circuits.allow(symbol):
+            self._count('circuit_skipped')
+            self._finish(result, None)
+            return
+        
+        self._count('attempts')
+        try:
+            count = fetch_klines(symbol, interval)
+        except RequestBlocked as e:
+            # Požadavky jsou pozastavené (429) - nic se neposlalo, pokus se nepočítá
+            self._count('blocked')
+            self._schedule(e.retry_after, result, symbol, interval, attempt)
+            return
+        except Exception as e:
+            self._retry_or_fail(result, symbol, interval, attempt, e)
+            return
+        
+        symbol_circuits.record_success(symbol)
+        self._finish(result, count)
+    
+    def _retry_or_fail(self, result, symbol, interval, attempt, error):
+        error_msg = str(error)
+        
+        if rate_limiter.banned_for() > 0:
+            logger.error(f"IP adresa byla dočasně zablokována Binance API, {interval} data pro {symbol} nestahuji: {error_msg}")
+            self._count('ban_skipped')
+            self._finish(result, None)
+            return
+        
+        if isinstance(error, ValueError):
+            reason = 'invalid'
+        elif "429" in error_msg or "too many requests" in error_msg.lower():
+            reason = 'rate_limit'
+        elif "Connection" in error_msg or "Timeout" in error_msg or "timeout" in error_msg.lower():
+            reason = 'network'
+        else:
+            reason = 'error'
+        
+        # Rate limit není chyba symbolu - circuit symbolu kvůli němu nerozpojujeme
+        if reason != 'rate_limit' and symbol_circuits.record_failure(symbol):
+            logger.warning(f"Circuit pro {symbol} rozpojen na {CIRCUIT_COOLDOWN:.0f} s po {CIRCUIT_FAILURES} selháních v řadě: {error_msg}")
+            self._count('failed')
+            self._finish(result, None)
+            return
+        
+        if attempt + 1 >= self.max_attempts:
+            logger.error(f"Všechny pokusy o získání {interval} dat pro {symbol} selhaly: {error_msg}")
+            self._count('failed')
+            self._finish(result, None)
+            return
+        
+        delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+        if reason == 'rate_limit':
+            # Hook odpovědi už pozastavil rate limiter podle Retry-After
+            delay = max(delay, rate_limiter.blocked_for())
+        binance_retries.inc(interval, reason)
+        logger.warning(f"Pokus {attempt+1} o získání {interval} dat pro {symbol} selhal: {error_msg}. Zkouším znovu za {delay:.0f} s")
+        self._schedule(delay, result, symbol, interval, attempt + 1)
+    
+    def _schedule(self, delay, result, symbol, interval, attempt):
+        with self.condition:
+            if not self.closed:
+                heapq.heappush(self.retries, (time.monotonic() + delay, next(self.sequence), result, symbol, interval, attempt))
+                self.stats['requeued'] += 1
+                self.condition.notify()
+                return
+        self._finish(result, None)
+    
+    def _run_timer(self):
+        """Vrací naplánované pokusy do poolu, jakmile nastane jejich deadline"""
+        while True:
+            with self.condition:
+                while not self.closed and (not self.retries or self.retries[0][0] > time.monotonic()):
+                    self.condition.wait(self.retries[0][0] - time.monotonic() if self.retries else None)
+                if self.closed:
+                    return
+                _, _, result, symbol, interval, attempt = heapq.heappop(self.retries)
+            self._start(result, symbol, interval, attempt)
+
+def wait_for_futures(futures):
+    """
+    Čeká na dokončení futures a průběžně kontroluje požadavek na shutdown
+    
+    Returns:
+        True pokud jsou všechny futures hotové, False při shutdownu
+    """
+    pending = set(futures)
+    while pending:
+        if not running:
+            return False
+        _, pending = wait(pending, timeout=1)
+    return True
+
+def rsi_1h_qualifies(rsi, margin=0):
+    """Zda 1h RSI patří do výsledků (>= RSI_HIGH nebo <= RSI_LOW), volitelně s rezervou margin"""
+    return rsi >= RSI_HIGH - margin or rsi <= RSI_LOW + margin
+
+def estimate_rsi_from_ticker(symbols):
+    """
+    Odhadne aktuální 1h RSI symbolů z jednoho hromadného 24h tickeru
+    
+    Odhad lze určit jen pro symboly s RSI stavem, jehož tvořící se svíčka je
+    aktuální hodina - stačí do stavu dosadit poslední cenu z tickeru.
+    
+    Returns:
+        Dict symbol -> odhad RSI (jen pro symboly, kde ho lze určit)
+    """
+    interval = Client.KLINE_INTERVAL_1HOUR
+    step = INTERVAL_MS[interval]
+    current_open = int(time.time() * 1000) // step * step
+    
+    try:
+        tickers = binance_request('futures_ticker', fail_fast=True)
+    except Exception as e:
+        logger.warning(f"Nepodařilo se stáhnout hromadný ticker, předvýběr se přeskočí: {str(e)}")
+        return {}
+    
+    prices = {ticker['symbol']: float(ticker['lastPrice']) for ticker in tickers}
+    estimates = {}
+    for symbol in symbols:
+        state = rsi_states.get((symbol, interval))
+        price = prices.get(symbol)
+        if state is None or price is None or state.last_open_time + step != current_open:
+            continue
+        rsi = state.provisional(price)
+        if rsi is not None:
+            estimates[symbol] = rsi
+            # Odhad se zapíše i do tabulky všech symbolů - stažené symboly ho pak přepíší
+            rsi_table.update(symbol, rsi_1h=rsi, price=price)
+    
+    return estimates
+
+def prefilter_symbols(symbols, fetcher, refresh=True):
+    """
+    První fáze dvoufázového skenu - vybere symboly, jejichž 1h RSI splňuje podmínky
+    
+    Symboly, jejichž odhad z tickeru je daleko od prahů, se nestahují vůbec,
+    ostatním se stáhnou jen 1h svíčky. 15m a 1d svíčky se pak stahují jen
+    pro vybrané symboly, protože se používají jen v jejich řádcích.
+    
+    Args:
+        symbols: Symboly ke skenování
+        fetcher: Fetch engine (KlineFetcher)
+        refresh: False pokud se 1h svíčky v tomto skenu neobnovují - 1h RSI se
+                 vezme z uložených svíček a stahují se jen chybějící symboly
+    
+    Returns:
+        Tuple (vybrané symboly, statistiky předvýběru) nebo (None, None) při shutdownu
+    """
+    interval = Client.KLINE_INTERVAL_1HOUR
+    estimates = estimate_rsi_from_ticker(symbols) if refresh else {}
+    candidates = [symbol for symbol in symbols
+                  if symbol not in estimates or rsi_1h_qualifies(estimates[symbol], PREFILTER_MARGIN)]
+    
+    futures = {
+        symbol: [fetcher.submit(symbol, fetch_interval)
+                 for fetch_interval in fetch_plan(symbol, [interval] if refresh else [], needed=[interval])]
+        for symbol in candidates
+    }
+    futures = {symbol: symbol_futures for symbol, symbol_futures in futures.items() if symbol_futures}
+    if not wait_for_futures([future for symbol_futures in futures.values() for future in symbol_futures]):
+        return None, None
+    
+    fetched = [symbol for symbol in candidates if all(future.result() for future in futures.get(symbol, []))]
+    series = {symbol: candle_store.series(symbol, interval) for symbol in fetched}
+    series = {symbol: values for symbol, values in series.items() if values is not None}
+    rsi_1h = update_rsi_states(interval, series)
+    rsi_history.record(interval, series, rsi_1h)
+    qualified = [symbol for symbol in fetched
+                 if rsi_1h.get(symbol) is not None and rsi_1h_qualifies(rsi_1h[symbol])]
+    
+    for symbol, rsi in rsi_1h.items():
+        if rsi is not None:
+            rsi_table.update(symbol, rsi_1h=rsi, price=float(series[symbol][1][-1]))
+    
+    logger.info(f"Předvýběr: {len(symbols) - len(candidates)} symbolů přeskočeno podle tickeru, "
+                f"{len(qualified)}/{len(candidates)} splňuje podmínky 1h RSI")
+    
+    return qualified, {
+        'ticker_estimates': len(estimates),
+        'skipped_by_ticker': len(symbols) - len(candidates),
+        'fetched_1h': sum(len(symbol_futures) for symbol_futures in futures.values()),
+        'failed_1h': len(candidates) - len(fetched),
+        'qualified': len(qualified)
+    }
+
+def rank_symbols(symbols):
+    """
+    Seřadí symboly podle priority obnovy - blízkost 1h RSI k prahům, nedávná
+    volatilita 15m svíček a stáří dat. Symboly bez RSI (ještě neskenované) jdou první.
+    
+    Returns:
+        List symbolů od nejvyšší priority
+    """
+    if not symbols:
+        return []
+    
+    with rsi_table.lock:
+        rows = [rsi_table.rows.get(symbol) for symbol in symbols]
+    rsi = np.array([np.nan if row is None else row['rsi_1h'] for row in rows], dtype=np.float64)
+    updated = np.array([np.nan if row is None else row['updated'] for row in rows], dtype=np.float64)
+    
+    # Blízkost k nejbližšímu prahu (1 = na prahu) - symbol může práh překročit oběma směry
+    distance = np.minimum(np.abs(rsi - RSI_HIGH), np.abs(rsi - RSI_LOW))
+    closeness = np.where(np.isnan(distance), 1.0, np.exp(-np.nan_to_num(distance) / PRIORITY_RSI_SCALE))
+    
+    # Volatilita - směrodatná odchylka log výnosů posledních 15m svíček vůči mediánu trhu
+    volatility = np.full(len(symbols), np.nan)
+    for i, symbol in enumerate(symbols):
+        series = candle_store.series(symbol, Client.KLINE_INTERVAL_15MINUTE, PRIORITY_VOLATILITY_WINDOW + 1)
+        if series is not None and len(series[1]) > 2 and (series[1] > 0).all():
+            volatility[i] = np.diff(np.log(series[1])).std()
+    median = np.nanmedian(volatility) if not np.isnan(volatility).all() else np.nan
+    relative = np.clip(volatility / median, 0, 3) / 3 if median > 0 else np.zeros(len(symbols))
+    relative = np.nan_to_num(relative, nan=1.0)
+    
+    # Zastaralost - nikdy neobnovené symboly mají maximum
+    staleness = np.clip((time.time() - updated) / PRIORITY_STALENESS_HORIZON, 0, 1)
+    staleness = np.nan_to_num(staleness, nan=1.0)
+    
+    score = (PRIORITY_WEIGHTS.get('distance', 0) * closeness
+             + PRIORITY_WEIGHTS.get('volatility', 0) * relative
+             + PRIORITY_WEIGHTS.get('staleness', 0) * staleness)
+    order = np.argsort(-score, kind='stable')
+    
+    priority_stats['ranked'] = len(symbols)
+    priority_stats['top'] = [{
+        'symbol': symbols[i],
+        'score': round(float(score[i]), 3),
+        'rsi_1h': None if np.isnan(rsi[i]) else round(float(rsi[i]), 2),
+        'closeness': round(float(closeness[i]), 3),
+        'volatility': round(float(relative[i]), 3),
+        'staleness': round(float(staleness[i]), 3)
+    } for i in order[:10]]
+    return [symbols[i] for i in order]
+
+def hot_set(size=HOT_SET_SIZE):
+    """Symboly horké množiny - size symbolů trhu s nejvyšší prioritou"""
+    symbols = rank_symbols(symbol_universe.get())[:size]
+    priority_stats['hot_set'] = symbols
+    return symbols
+
+def get_futures_data(intervals=None, symbols=None, scope='all'):
+    """
+    Sken symbolů přes REST - stáhne svíčky, přepočítá RSI a publikuje výsledky.
+    Symboly se zpracují v pořadí podle priority (rank_symbols), takže průběžné
+    publikace po skupinách obsahují nejdřív symboly blízko prahů.
+    
+    Args:
+        intervals: Timeframy, jejichž svíčky se obnovují (výchozí všechny). Ostatní
+                   timeframy se berou z candle_store, stahují se jen chybějící.
+        symbols: Symboly ke skenování (výchozí celý trh) - ostatní si ponechají předchozí řádky
+        scope: Označení skenu pro statistiky ("all", "hot", "cold")
+    """
     try:
-        logger.info("Začínám získávat futures data...")
+        intervals = intervals or SCAN_INTERVALS
+        logger.info(f"Začínám získávat futures data ({', '.join(intervals)}, {scope})...")
         # Správné pořadí globálních proměnných
         global running
-        global data_version
         global results_cache
-        global previous_rsi_values  # Pro ukládání předchozích RSI hodnot
         
-        high_rsi_results = []  # Pro RSI >= 55 (možný SHORT)
-        low_rsi_results = []   # Pro RSI <= 28 (možný LONG)
+        scan_started = time.monotonic()
+        http_before = http_transport.counters()
+        apply_symbol_evictions()
+        high_rsi_results = []  # Pro RSI >= RSI_HIGH (možný SHORT)
+        low_rsi_results = []   # Pro RSI <= RSI_LOW (možný LONG)
         processed = 0
+        failed_requests = 0
         
-        # Získání futures symbolů
-        logger.info("Získávám seznam futures symbolů...")
-        symbols = get_futures_symbols_with_retry()
+        # Seznam futures symbolů z cache (obnovuje se na pozadí jednou za TTL)
+        universe = symbol_universe.get()
         
-        if not symbols:
+        if not universe:
             logger.error("Nepodařilo se získat seznam symbolů, končím zpracování")
             return {'high_rsi': [], 'low_rsi': []}
         
+        universe_set = set(universe)
+        symbols = rank_symbols([symbol for symbol in symbols if symbol in universe_set] if symbols is not None else universe)
+        
+        banned_for = rate_limiter.banned_for()
+        if banned_for > 0:
+            # Globální circuit - během banu IP necháme v cache předchozí výsledky
+            logger.warning(f"IP adresa je zablokována Binance API ještě {banned_for:.0f} s, sken přeskakuji")
+            return {'high_rsi': results_cache['high_rsi'], 'low_rsi': results_cache['low_rsi']}
+        
         total_symbols = len(symbols)
-        logger.info(f"Nalezeno {total_symbols} futures párů ke zpracování")
+        logger.info(f"Nalezeno {total_symbols} futures párů ke zpracování ({FETCH_CONCURRENCY} souběžných požadavků)")
         
-        # Rozdělíme páry do skupin po 20, abychom je mohli zpracovávat postupně
-        # a aktualizovat cache po každé skupině
-        symbol_batches = [symbols[i:i+20] for i in range(0, len(symbols), 20)]
-        batch_num = 0
+        scan_symbols = symbols
+        fetch_intervals = intervals
+        prefilter = None
+        kline_requests = 0
         
-        for batch in symbol_batches:
-            # Kontrola, zda nemáme ukončit aplikaci
-            if not running:
-                logger.info("Ukončuji zpracování futures dat - byl požadován shutdown")
-                break
-                
-            batch_num += 1
-            logger.info(f"Zpracovávám skupinu {batch_num}/{len(symbol_batches)} ({len(batch)} párů)")
+        # Během skenu zůstávají v cache předchozí řádky symbolů, které sken ještě nezpracoval
+        # (řádky symbolů, které se přestaly obchodovat, se zahodí)
+        previous_high = [row for row in results_cache['high_rsi'] if row['symbol'] in universe_set]
+        previous_low = [row for row in results_cache['low_rsi'] if row['symbol'] in universe_set]
+        done = set()
+        published = None
+        
+        executor = ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY, thread_name_prefix='kline-fetch')
+        fetcher = KlineFetcher(executor)
+        try:
+            if TWO_STAGE_SCAN:
+                # 1. fáze - 1h RSI všech symbolů, dál pokračují jen ty, které splňují podmínky
+                # (s odvozenými timeframy obnovuje BASE_INTERVAL a tím všechny timeframy)
+                scan_symbols, prefilter = prefilter_symbols(
+                    symbols, fetcher, refresh=Client.KLINE_INTERVAL_1HOUR in intervals or bool(DERIVED_INTERVALS))
+                if scan_symbols is None:
+                    logger.info("Ukončuji zpracování futures dat - byl požadován shutdown")
+                    scan_symbols = []
+                else:
+                    done.update(set(symbols) - set(scan_symbols))
+                    processed = total_symbols - len(scan_symbols)
+                    failed_requests = prefilter['failed_1h']
+                    kline_requests = prefilter['fetched_1h']
+                fetch_intervals = [interval for interval in intervals if interval != Client.KLINE_INTERVAL_1HOUR]
+                if DERIVED_INTERVALS:
+                    # BASE_INTERVAL už předvýběr obnovil, ostatní timeframy se z něj složily
+                    fetch_intervals = []
             
-            for symbol in batch:
+            # Rozdělíme páry do skupin, abychom je mohli zpracovávat postupně
+            # a aktualizovat cache po každé skupině
+            symbol_batches = [scan_symbols[i:i+SCAN_BATCH_SIZE] for i in range(0, len(scan_symbols), SCAN_BATCH_SIZE)]
+            batch_num = 0
+            
+            # Všechny požadavky symbol x timeframe zadáme najednou, pool je omezí
+            # na FETCH_CONCURRENCY souběžných - pořadí odpovídá skupinám.
+            # Neobnovované timeframy se stahují jen pro symboly, které je ještě nemají.
+            futures = {
+                symbol: {interval: fetcher.submit(symbol, interval) for interval in fetch_plan(symbol, fetch_intervals)}
+                for symbol in scan_symbols
+            }
+            kline_requests += sum(len(symbol_futures) for symbol_futures in futures.values())
+            
+            for batch in symbol_batches:
+                batch_num += 1
+                logger.info(f"Zpracovávám skupinu {batch_num}/{len(symbol_batches)} ({len(batch)} párů)")
+                
+                batch_futures = [future for symbol in batch for future in futures[symbol].values()]
+                
                 # Kontrola, zda nemáme ukončit aplikaci
-                if not running:
+                if not wait_for_futures(batch_futures):
+                    logger.info("Ukončuji zpracování futures dat - byl požadován shutdown")
                     break
-                    
-                try:
+                
+                fetched = []
+                for symbol in batch:
                     processed += 1
-                    logger.info(f"Zpracovávám {symbol} ({processed}/{total_symbols})")
-                    
-                    # Získání dat - 1h timeframe
-                    klines_1h = get_futures_data_with_retry(symbol, Client.KLINE_INTERVAL_1HOUR)
-                    if not klines_1h:
-                        logger.warning(f"Žádná 1h data pro {symbol}")
-                        continue
-                    
-                    # Získání dat - 15m timeframe
-                    klines_15m = get_futures_data_with_retry(symbol, Client.KLINE_INTERVAL_15MINUTE)
-                    if not klines_15m:
-                        logger.warning(f"Žádná 15m data pro {symbol}")
-                        continue
-                    
-                    # Získání dat - 1d timeframe
-                    klines_1d = get_futures_data_with_retry(symbol, Client.KLINE_INTERVAL_1DAY)
-                    if not klines_1d:
-                        logger.warning(f"Žádná 1d data pro {symbol}")
-                        continue
-                    
-                    # Zpracování dat - 1h
-                    df_1h = pd.DataFrame(klines_1h, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_av', 'trades', 'tb_base_av', 'tb_quote_av', 'ignore'])
-                    df_1h['close'] = pd.to_numeric(df_1h['close'])
-                    
-                    # Zpracování dat - 15m
-                    df_15m = pd.DataFrame(klines_15m, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_av', 'trades', 'tb_base_av', 'tb_quote_av', 'ignore'])
-                    df_15m['close'] = pd.to_numeric(df_15m['close'])
-                    
-                    # Zpracování dat - 1d
-                    df_1d = pd.DataFrame(klines_1d, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_av', 'trades', 'tb_base_av', 'tb_quote_av', 'ignore'])
-                    df_1d['close'] = pd.to_numeric(df_1d['close'])
-                    
-                    # Výpočet RSI - 1h
-                    rsi_1h = calculate_rsi(df_1h)
-                    if rsi_1h is None:
-                        logger.warning(f"Nelze vypočítat 1h RSI pro {symbol}")
-                        continue
-                    
-                    # Výpočet RSI - 15m
-                    rsi_15m = calculate_rsi(df_15m)
-                    if rsi_15m is None:
-                        logger.warning(f"Nelze vypočítat 15m RSI pro {symbol}")
-                        rsi_15m = 0  # Nastavíme na 0, abychom mohli pokračovat
-                    
-                    # Výpočet RSI - 1d
-                    rsi_1d = calculate_rsi(df_1d)
-                    if rsi_1d is None:
-                        logger.warning(f"Nelze vypočítat 1d RSI pro {symbol}")
-                        rsi_1d = 0  # Nastavíme na 0, abychom mohli pokračovat
-                    
-                    current_price = float(df_1h['close'].iloc[-1])
-                    
-                    # Kontrola podmínek pro RSI (pouze podle 1h timeframe)
-                    if rsi_1h >= 55:  # Signál pro možný SHORT
-                        # Určení trendu pro všechny časové rámce
-                        trend_1h = determine_trend(symbol, rsi_1h, "1h")
-                        trend_15m = determine_trend(symbol, rsi_15m, "15m") 
-                        trend_1d = determine_trend(symbol, rsi_1d, "1d")
-                        
-                        logger.info(f"✓ Nalezen {symbol} s RSI 1h {rsi_1h:.2f} ({trend_1h or 'initial'}), 15m {rsi_15m:.2f} ({trend_15m or 'initial'}), 1d {rsi_1d:.2f} ({trend_1d or 'initial'}) (možný SHORT)")
-                        
-                        high_rsi_results.append({
-                            'symbol': symbol,
-                            'rsi': round(rsi_1h, 2),
-                            'rsi_15m': round(rsi_15m, 2),
-                            'rsi_1d': round(rsi_1d, 2),
-                            'price': f"${current_price:.4f}",
-                            'trend': trend_1h or "stable",  # Trend pro 1h timeframe
-                            'trend_15m': trend_15m or "stable",  # Trend pro 15m timeframe
-                            'trend_1d': trend_1d or "stable"  # Trend pro 1d timeframe
-                        })
-                    elif rsi_1h <= 28:  # Signál pro možný LONG
-                        # Určení trendu pro všechny časové rámce
-                        trend_1h = determine_trend(symbol, rsi_1h, "1h")
-                        trend_15m = determine_trend(symbol, rsi_15m, "15m") 
-                        trend_1d = determine_trend(symbol, rsi_1d, "1d")
-                        
-                        logger.info(f"✓ Nalezen {symbol} s RSI 1h {rsi_1h:.2f} ({trend_1h or 'initial'}), 15m {rsi_15m:.2f} ({trend_15m or 'initial'}), 1d {rsi_1d:.2f} ({trend_1d or 'initial'}) (možný LONG)")
-                        
-                        low_rsi_results.append({
-                            'symbol': symbol,
-                            'rsi': round(rsi_1h, 2),
-                            'rsi_15m': round(rsi_15m, 2),
-                            'rsi_1d': round(rsi_1d, 2),
-                            'price': f"${current_price:.4f}",
-                            'trend': trend_1h or "stable",  # Trend pro 1h timeframe
-                            'trend_15m': trend_15m or "stable",  # Trend pro 15m timeframe
-                            'trend_1d': trend_1d or "stable"  # Trend pro 1d timeframe
-                        })
-                    
-                    # Kratší pauza mezi API calls
-                    time.sleep(0.02)  # Zkrátíme pauzu z 0.05 na 0.02
-                    
+                    failed = sum(1 for future in futures[symbol].values() if not future.result())
+                    failed_requests += failed
+                    if failed:
+                        logger.warning(f"Nepodařilo se stáhnout všechna data pro {symbol}")
+                    else:
+                        fetched.append(symbol)
+                
+                try:
+                    process_batch(fetched, high_rsi_results, low_rsi_results)
                 except Exception as e:
-                    logger.error(f"Chyba při zpracování {symbol}: {str(e)}")
-                    continue
-            
-            # Aktualizace cache po každé dokončené skupině párů
-            # Seřazení výsledků
-            high_rsi_sorted = sorted(high_rsi_results, key=lambda x: x['rsi'], reverse=True)
-            low_rsi_sorted = sorted(low_rsi_results, key=lambda x: x['rsi'])
-            
-            # Aktualizace globální cache
-            results_cache['high_rsi'] = high_rsi_sorted
-            results_cache['low_rsi'] = low_rsi_sorted
-            results_cache['last_update'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    logger.error(f"Chyba při zpracování skupiny {batch_num}: {str(e)}")
+                
+                # Aktualizace cache po každé dokončené skupině párů - symboly, které se
+                # nepodařilo stáhnout (rozpojený circuit, ban), si ponechají předchozí řádek
+                done.update(fetched)
+                published = publish_results(merge_with_previous(high_rsi_results, previous_high, done),
+                                            merge_with_previous(low_rsi_results, previous_low, done))
+                
+                logger.info(f"Cache aktualizována po zpracování skupiny {batch_num}/{len(symbol_batches)} (celkem {processed}/{total_symbols} párů)")
+        finally:
+            # Při shutdownu zrušíme požadavky, které ještě nezačaly
+            executor.shutdown(wait=running, cancel_futures=True)
+            fetcher.close()
+        
+        if DERIVED_VERIFY_SYMBOLS and DERIVED_INTERVALS and running and scope == 'all':
+            run_derived_verification(universe)
+        
+        if prefilter is not None:
+            # Úspora oproti stažení obnovovaných timeframe pro všechny symboly
+            full_requests = total_symbols * len(intervals)
+            saved = full_requests - kline_requests
+            prefilter['saved_requests'] = saved
+            prefilter['saved_percent'] = round(100 * saved / full_requests, 1)
+            logger.info(f"Dvoufázový sken ušetřil {saved} požadavků na klines ({prefilter['saved_percent']} %)")
+        
+        scan_duration = time.monotonic() - scan_started
+        scan_duration_seconds.observe(scan_duration, ','.join(intervals), scope)
+        scan_stats.update({
+            'last_scan_started': datetime.fromtimestamp(time.time() - scan_duration).strftime('%Y-%m-%d %H:%M:%S'),
+            'last_scan_duration': round(scan_duration, 2),
+            'intervals': list(intervals),
+            'symbols': total_symbols,
+            'processed': processed,
+            'kline_requests': kline_requests,
+            'failed_requests': failed_requests,
+            'prefilter': prefilter,
+            'http': http_transport.usage_since(http_before),
+            'scope': scope
+        })
+        
+        logger.info(f"Dokončeno zpracování všech {total_symbols} symbolů za {scan_duration:.1f} s")
+        logger.info(f"Nalezeno {len(high_rsi_results)} symbolů s RSI >= {RSI_HIGH:g} (možný SHORT)")
+        logger.info(f"Nalezeno {len(low_rsi_results)} symbolů s RSI <= {RSI_LOW:g} (možný LONG)")
+        
+        # Finální aktualizace cache - jen pokud ji nepublikovala už poslední skupina
+        if published is None:
+            published = publish_results(merge_with_previous(high_rsi_results, previous_high, done),
+                                        merge_with_previous(low_rsi_results, previous_low, done))
+        high_rsi_sorted, low_rsi_sorted = published
+        
+        return {
+            'high_rsi': high_rsi_sorted,  # Pro SHORT
+            'low_rsi': low_rsi_sorted     # Pro LONG
+        }
+    except Exception as e:
+        logger.error(f"Hlavní chyba při získávání futures dat: {str(e)}")
+        return {'high_rsi': [], 'low_rsi': []}
+
+def apply_kline_event(message):
+    """
+    Zapracuje jednu kline událost z combined streamu do in-memory stavu
+    
+    Args:
+        message: Dekódovaná zpráva {"stream": ..., "data": {"e": "kline", ...}}
+    
+    Returns:
+        True pokud byla událost zapracována
+    """
+    data = message.get('data', message)
+    if data.get('e') != 'kline':
+        return False
+    
+    k = data['k']
+    symbol = data['s']
+    
+    with stream_gaps_lock:
+        if symbol in stream_gaps:
+            return False
+    
+    if candle_store.has_gap(symbol, k['i'], int(k['t'])):
+        # Zmeškané svíčky (výpadek spojení) doplní REST backfill od poslední uložené svíčky
+        hold_for_backfill([symbol])
+        return False
+    
+    # Bez backfillu (neexistující buffer) nemá smysl RSI počítat - událost se ignoruje
+    if candle_store.update(symbol, k['i'], int(k['t']), float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v'])) is None:
+        return False
+    
+    if DERIVED_INTERVALS and k['i'] == BASE_INTERVAL:
+        derive_timeframes(symbol, since=int(k['t']))
+    
+    with dirty_symbols_lock:
+        dirty_symbols.add(symbol)
+    
+    stream_stats['events'] += 1
+    stream_stats['last_event'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return True
+
+def hold_for_backfill(symbols):
+    """Pozastaví zapracování událostí symbolů, dokud stream_ingestion nedoplní jejich svíčky přes REST"""
+    with stream_gaps_lock:
+        stream_gaps.update(symbols)
+
+async def consume_kline_stream(streams, connection_id, generation):
+    """
+    Udržuje jedno WebSocket spojení na combined stream a zpracovává jeho události.
+    Po výpadku se znovu připojí s exponenciálním backoffem a zmeškané svíčky
+    (včetně finálních hodnot uzavřených svíček) jeho symbolů nechá doplnit přes REST.
+    Skončí při shutdownu nebo když se kvůli změně seznamu symbolů spustí nová
+    generace spojení.
+    """
+    url = f"{BINANCE_FUTURES_WS_URL.rstrip('/')}/stream?streams={'/'.join(streams)}"
+    symbols = sorted({stream.split('@')[0].upper() for stream in streams})
+    delay = 1
+    connected = False
+    
+    def active():
+        return running and generation == stream_generation
+    
+    while active():
+        try:
+            async with websockets.connect(url, max_size=None) as websocket:
+                stream_stats['connections'] += 1
+                logger.info(f"WebSocket spojení {connection_id} navázáno ({len(streams)} streamů)")
+                delay = 1
+                if connected:
+                    hold_for_backfill(symbols)
+                connected = True
+                
+                try:
+                    while active():
+                        try:
+                            raw = await asyncio.wait_for(websocket.recv(), timeout=1)
+                        except asyncio.TimeoutError:
+                            continue
+                        apply_kline_event(json.loads(raw))
+                finally:
+                    stream_stats['connections'] -= 1
+        except Exception as e:
+            if not active():
+                break
+            stream_stats['reconnects'] += 1
+            logger.warning(f"WebSocket spojení {connection_id} přerušeno: {str(e)}. Připojuji znovu za {delay} s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+
+def run_kline_streams(symbols, generation):
+    """Spustí asyncio smyčku s WebSocket spojeními pro všechny symboly a timeframy"""
+    intervals = [BASE_INTERVAL] if DERIVED_INTERVALS else SCAN_INTERVALS
+    streams = [f"{symbol.lower()}@kline_{interval}" for symbol in symbols for interval in intervals]
+    chunks = [streams[i:i+STREAMS_PER_CONNECTION] for i in range(0, len(streams), STREAMS_PER_CONNECTION)]
+    logger.info(f"Připojuji {len(streams)} kline streamů přes {len(chunks)} WebSocket spojení")
+    
+    async def run_all():
+        await asyncio.gather(*(consume_kline_stream(chunk, i + 1, generation) for i, chunk in enumerate(chunks)))
+    
+    try:
+        asyncio.run(run_all())
+    except Exception as e:
+        logger.error(f"Chyba v WebSocket smyčce: {str(e)}")
+
+def backfill_klines(symbols):
+    """
+    Jednorázově stáhne historii klines přes REST (fetch engine) pro seed stream režimu
+    
+    Returns:
+        Množina symbolů s kompletní historií všech timeframů
+    """
+    complete = set(symbols)
+    
+    executor = ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY, thread_name_prefix='kline-fetch')
+    fetcher = KlineFetcher(executor)
+    try:
+        futures = {
+            fetcher.submit(symbol, interval): (symbol, interval)
+            for symbol in symbols
+            for interval in fetch_plan(symbol, SCAN_INTERVALS)
+        }
+        
+        if not wait_for_futures(futures):
+            return set()
+        
+        for future, (symbol, interval) in futures.items():
+            if not future.result():
+                complete.discard(symbol)
+    finally:
+        executor.shutdown(wait=running, cancel_futures=True)
+        fetcher.close()
+    
+    with dirty_symbols_lock:
+        dirty_symbols.update(complete)
+    
+    return complete
+
+def stream_ingestion():
+    """
+    Stream režim: seed přes REST, poté aktualizace z WebSocket kline streamů.
+    RSI se přepočítává jen pro symboly, které od poslední publikace dostaly událost.
+    Symboly s neúspěšným backfillem se zkouší znovu s backoffem - do té doby
+    nemají buffer a jejich události se ignorují. Stejnou cestou se po obnovení
+    WebSocket spojení (nebo při mezeře ve svíčkách) doplní zmeškané svíčky
+    přes REST od poslední uložené svíčky.
+    """
+    global stream_generation
+    
+    logger.info("Spouštím stream režim získávání dat")
+    streamed = set()
+    
+    # Poslední řádek výsledku pro každý symbol - (True pro SHORT / False pro LONG, řádek).
+    # Začínáme od publikovaných výsledků, aby je první publikace (po restartu režimu) nezahodila.
+    symbol_rows = {row['symbol']: (True, row) for row in results_cache['high_rsi']}
+    symbol_rows.update({row['symbol']: (False, row) for row in results_cache['low_rsi']})
+    
+    # Symboly, jejichž backfill selhal, a kdy je zkusit znovu
+    retry_symbols = set()
+    retry_delay = STREAM_BACKFILL_RETRY
+    next_retry = None
+    
+    while running:
+        pruned = False
+        apply_symbol_evictions()
+        symbols = symbol_universe.get()
+        
+        with stream_gaps_lock:
+            stream_gaps.intersection_update(symbols)
+            gaps = stream_gaps - retry_symbols
+        if gaps:
+            logger.info(f"Doplňuji zmeškané svíčky {len(gaps)} symbolů po výpadku WebSocket spojení")
+            stream_stats['gap_backfills'] += len(gaps)
+            retry_symbols |= gaps
+            next_retry = time.monotonic()
+        
+        if set(symbols) != streamed:
+            # První spuštění nebo změna seznamu symbolů - backfill nových a nová generace spojení
+            added = [symbol for symbol in symbols if symbol not in streamed]
+            backfill_started = time.monotonic()
+            complete = backfill_klines(added)
+            logger.info(f"Backfill dokončen za {time.monotonic() - backfill_started:.1f} s ({len(complete)}/{len(added)} symbolů)")
             
-            # Inkrementace verze dat pro SSE
-            data_version += 1
+            retry_symbols = (retry_symbols | set(added)) - complete
+            retry_symbols &= set(symbols)
+            if retry_symbols and next_retry is None:
+                next_retry = time.monotonic() + retry_delay
             
-            logger.info(f"Cache aktualizována po zpracování skupiny {batch_num}/{len(symbol_batches)} (celkem {processed}/{total_symbols} párů)")
+            for symbol in streamed - set(symbols):
+                pruned = symbol_rows.pop(symbol, None) is not None or pruned
             
-            # Krátká pauza mezi skupinami, aby Railway neukončil proces
-            time.sleep(1)
+            stream_generation += 1
+            stream_thread = threading.Thread(target=run_kline_streams, args=(symbols, stream_generation), name='kline-streams')
+            stream_thread.daemon = True
+            stream_thread.start()
+            streamed = set(symbols)
+        elif retry_symbols and time.monotonic() >= next_retry:
+            # Opakovaný backfill symbolů, které při předchozím selhaly (ban, circuit, výpadek)
+            complete = backfill_klines(sorted(retry_symbols))
+            retry_symbols -= complete
+            with stream_gaps_lock:
+                stream_gaps.difference_update(complete)
+            logger.info(f"Opakovaný backfill: {len(complete)} symbolů doplněno, {len(retry_symbols)} stále chybí")
+            retry_delay = STREAM_BACKFILL_RETRY if complete else min(retry_delay * 2, 600)
+            next_retry = time.monotonic() + retry_delay if retry_symbols else None
         
-        logger.info(f"Dokončeno zpracování všech {total_symbols} symbolů")
-        logger.info(f"Nalezeno {len(high_rsi_results)} symbolů s RSI >= 55 (možný SHORT)")
-        logger.info(f"Nalezeno {len(low_rsi_results)} symbolů s RSI <= 28 (možný LONG)")
+        stream_stats['backfill_pending'] = len(retry_symbols)
         
-        # Finální aktualizace cache
-        high_rsi_sorted = sorted(high_rsi_results, key=lambda x: x['rsi'], reverse=True)
-        low_rsi_sorted = sorted(low_rsi_results, key=lambda x: x['rsi'])
+        with dirty_symbols_lock:
+            changed = list(dirty_symbols)
+            dirty_symbols.clear()
         
-        results_cache['high_rsi'] = high_rsi_sorted
-        results_cache['low_rsi'] = low_rsi_sorted
-        results_cache['last_update'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if changed:
+            try:
+                high, low = [], []
+                process_batch(changed, high, low)
+                for symbol in changed:
+                    symbol_rows.pop(symbol, None)
+                symbol_rows.update({row['symbol']: (True, row) for row in high})
+                symbol_rows.update({row['symbol']: (False, row) for row in low})
+            except Exception as e:
+                logger.error(f"Chyba při zpracování změněných symbolů: {str(e)}")
         
-        # Inkrementace verze dat pro SSE při finální aktualizaci
-        data_version += 1
+        if changed or pruned:
+            publish_results([row for is_high, row in symbol_rows.values() if is_high],
+                            [row for is_high, row in symbol_rows.values() if not is_high])
         
-        return {
-            'high_rsi': high_rsi_sorted,  # Pro SHORT
-            'low_rsi': low_rsi_sorted     # Pro LONG
+        time.sleep(STREAM_PUBLISH_INTERVAL)
+    
+    logger.info("Ukončuji stream režim")
+
+class ScanTier:
+    """
+    Jeden timeframe plánovače skenů - obnovuje se hned po uzavření své svíčky.
+    Sleduje zpoždění publikace za uzavřením svíčky a dodržení časového rozpočtu.
+    """
+    
+    def __init__(self, interval, budget):
+        self.interval = interval
+        self.period = INTERVAL_MS[interval]
+        self.budget = budget
+        self.next_close = None
+        self.lag_total = 0.0
+        self.stats = {
+            'runs': 0,
+            'last_close': None,
+            'last_duration': None,
+            'last_lag': None,
+            'avg_lag': None,
+            'max_lag': None,
+            'over_budget': 0
         }
-    except Exception as e:
-        logger.error(f"Hlavní chyba při získávání futures dat: {str(e)}")
-        return {'high_rsi': [], 'low_rsi': []}
+    
+    def schedule(self, now_ms):
+        """Naplánuje obnovu na nejbližší uzavření svíčky po now_ms"""
+        self.next_close = (now_ms // self.period + 1) * self.period
+    
+    def is_due(self, now_ms, delay_ms):
+        return self.next_close is not None and now_ms >= self.next_close + delay_ms
+    
+    def record(self, close_ms, duration, finished_ms):
+        """Zapíše dokončenou obnovu - lag je čas od uzavření svíčky do publikace výsledků"""
+        lag = (finished_ms - close_ms) / 1000
+        self.lag_total += lag
+        self.stats['runs'] += 1
+        self.stats['last_close'] = datetime.fromtimestamp(close_ms / 1000).strftime('%Y-%m-%d %H:%M:%S')
+        self.stats['last_duration'] = round(duration, 2)
+        self.stats['last_lag'] = round(lag, 2)
+        self.stats['avg_lag'] = round(self.lag_total / self.stats['runs'], 2)
+        self.stats['max_lag'] = max(self.stats['max_lag'] or 0, round(lag, 2))
+        
+        if duration > self.budget:
+            self.stats['over_budget'] += 1
+            logger.warning(f"Obnova {self.interval} trvala {duration:.1f} s, rozpočet je {self.budget:.0f} s")
+    
+    def snapshot(self):
+        next_close = datetime.fromtimestamp(self.next_close / 1000).strftime('%Y-%m-%d %H:%M:%S') if self.next_close else None
+        return dict(self.stats, budget=self.budget, next_close=next_close)
+
+class ScanScheduler:
+    """
+    Plánovač REST skenů zarovnaný na uzavírání svíček.
+    
+    Každý timeframe se obnoví hned po uzavření své svíčky (15m čtyřikrát za hodinu,
+    1h každou hodinu, 1d jednou denně). Timeframy uzavírající se současně se
+    obnoví jedním skenem. Volitelný provisional tick mezi uzavřeními obnoví
+    tvořící se svíčky všech timeframe. Se zapnutou horkou množinou se symboly
+    s nejvyšší prioritou obnovují každých hot_interval sekund a provisional
+    tick obnovuje jen studený zbytek trhu.
+    """
+    
+    def __init__(self, intervals, budgets, close_delay, provisional_interval, hot_interval=0, hot_size=HOT_SET_SIZE):
+        self.tiers = [ScanTier(interval, budgets.get(interval, 300)) for interval in intervals]
+        self.close_delay = close_delay
+        self.provisional_interval = provisional_interval
+        self.hot_interval = hot_interval
+        self.hot_size = hot_size
+        self.next_provisional = None
+        self.next_hot = None
+        self.hot_symbols = []
+        self.stats = {'provisional_runs': 0, 'hot_runs': 0, 'last_run': None, 'last_intervals': None, 'last_scope': None}
+    
+    def _schedule_provisional(self):
+        if self.provisional_interval > 0:
+            self.next_provisional = time.time() + self.provisional_interval
+    
+    def _schedule_hot(self):
+        if self.hot_interval > 0:
+            self.next_hot = time.time() + self.hot_interval
+    
+    def wait(self):
+        """
+        Počká na nejbližší uzavření svíčky nebo provisional tick
+        
+        Returns:
+            False pokud byl mezitím požadován shutdown
+        """
+        while running:
+            targets = [tier.next_close / 1000 + self.close_delay for tier in self.tiers]
+            targets.extend(target for target in (self.next_provisional, self.next_hot) if target is not None)
+            remaining = min(targets) - time.time()
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, 1))
+        return False
+    
+    def run_once(self):
+        """
+        Spustí sken pro timeframy, jejichž svíčka se uzavřela, jinak obnovu horké
+        množiny nebo provisional tick (podle toho, co je splatné)
+        """
+        started_ms = int(time.time() * 1000)
+        due = [tier for tier in self.tiers if tier.is_due(started_ms, self.close_delay * 1000)]
+        intervals = [tier.interval for tier in due] or [tier.interval for tier in self.tiers]
+        symbols = None
+        scope = 'all'
+        
+        if due:
+            logger.info(f"Uzavřely se svíčky {', '.join(intervals)}, obnovuji")
+        elif self.next_hot is not None and time.time() >= self.next_hot:
+            self.hot_symbols = symbols = hot_set(self.hot_size)
+            scope = 'hot'
+            logger.info(f"Obnova horké množiny ({len(symbols)} symbolů)")
+            self.stats['hot_runs'] += 1
+        else:
+            if self.next_hot is not None:
+                # Horká množina se obnovuje zvlášť - provisional tick projde jen studený zbytek
+                hot = set(self.hot_symbols)
+                symbols = [symbol for symbol in symbol_universe.get() if symbol not in hot]
+                scope = 'cold'
+            logger.info(f"Provisional obnova tvořících se svíček ({scope})")
+            self.stats['provisional_runs'] += 1
+        
+        started = time.monotonic()
+        get_futures_data(intervals, symbols, scope)
+        duration = time.monotonic() - started
+        finished_ms = int(time.time() * 1000)
+        
+        for tier in due:
+            tier.record(tier.next_close, duration, finished_ms)
+            # Uzavření, která proběhla během skenu, zůstanou splatná a obnoví se hned
+            tier.schedule(started_ms)
+        
+        if scope == 'hot':
+            self._schedule_hot()
+        else:
+            # Plný sken i studený zbytek posouvají provisional tick
+            self._schedule_provisional()
+            if scope == 'all':
+                self._schedule_hot()
+        self.stats['last_run'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.stats['last_intervals'] = intervals
+        self.stats['last_scope'] = scope
+    
+    def run(self):
+        """Hlavní smyčka plánovače - úvodní plný sken, pak obnovy po uzavření svíček"""
+        logger.info("Spouštím úvodní sken všech timeframe")
+        get_futures_data()
+        
+        now_ms = int(time.time() * 1000)
+        for tier in self.tiers:
+            tier.schedule(now_ms)
+        self._schedule_provisional()
+        self._schedule_hot()
+        
+        while self.wait():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Chyba při plánované aktualizaci: {str(e)}")
+                time.sleep(5)
+        
+        logger.info("Ukončuji plánovač skenů")
+    
+    def snapshot(self):
+        return dict(self.stats,
+                    close_delay=self.close_delay,
+                    provisional_interval=self.provisional_interval,
+                    hot_interval=self.hot_interval,
+                    hot_symbols=len(self.hot_symbols),
+                    tiers={tier.interval: tier.snapshot() for tier in self.tiers})
+
+scan_scheduler = ScanScheduler(SCAN_INTERVALS, SCAN_TIER_BUDGETS, SCHEDULE_CLOSE_DELAY, PROVISIONAL_INTERVAL,
+                               HOT_REFRESH_INTERVAL, HOT_SET_SIZE)
 
 # Funkce pro spuštění na pozadí
 def background_update():
     global results_cache  # Přidáno - globální proměnná musí být deklarována před použitím
     global running
     
+    # Seznam symbolů se obnovuje na pozadí nezávisle na skenech
+    symbol_universe.start()
+    
+    if INGESTION_MODE == 'stream':
+        # Stream režim se po chybě spustí znovu (nová generace spojení, backfill jen chybějícího)
+        delay = 5
+        while running:
+            started = time.monotonic()
+            try:
+                stream_ingestion()
+            except Exception as e:
+                logger.error(f"Chyba ve stream režimu: {str(e)}")
+            if not running:
+                break
+            if time.monotonic() - started > 300:
+                delay = 5  # Po delším běhu začíná backoff znovu
+            stream_stats['restarts'] += 1
+            logger.warning(f"Stream režim skončil, spouštím ho znovu za {delay} s")
+            time.sleep(delay)
+            delay = min(delay * 2, 300)
+        return
+    
     while running:
         try:
-            logger.info("Spouštím aktualizaci dat na pozadí")
-            get_futures_data()
-            logger.info("Aktualizace dat dokončena, čekám 60 sekund")
-            
-            # Kontrolujeme stav běhu každých 5 sekund
-            for _ in range(12):  # 12 x 5 sekund = 60 sekund
-                if not running:
-                    logger.info("Ukončuji background thread")
-                    break
-                time.sleep(5)
-                
+            # Obnova jednotlivých timeframe po uzavření jejich svíček
+            scan_scheduler.run()
         except Exception as e:
             logger.error(f"Chyba při aktualizaci na pozadí: {str(e)}")
             time.sleep(60)  # I v případě chyby počkáme minutu
 
+# Obnovení posledního známého stavu z disku - /get_rsi_data hned vrací poslední výsledky
+restore_state_cache()
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+class SharedState:
+    """
+    Sdílený stav pro běh ve více gunicorn workerech (jeden producent, mnoho čtenářů).
+    
+    Skenovat smí jen proces, který drží zámek (flock) na lock souboru. Po každé
+    publikaci zapíše snímek výsledků, poslední SSE události a metriky skeneru do
+    sdíleného souboru (atomicky přes přejmenování). Ostatní workery soubor čtou
+    přes mmap, obsluhují jen HTTP a při pádu skeneru zámek převezme jeden z nich.
+    Poslední události kanálu alertů se doručují asynchronně po publikaci,
+    proto mají vlastní malý soubor vedle snímku.
+    """
+    
+    MAGIC = b'RSI1'
+    
+    def __init__(self, lock_path, snapshot_path, poll_interval=0.25, takeover_interval=5):
+        self.lock_path = lock_path
+        self.snapshot_path = snapshot_path
+        self.poll_interval = poll_interval
+        self.takeover_interval = takeover_interval
+        self.alerts_path = f"{snapshot_path}.alerts"
+        self.lock_file = None
+        self.is_scanner = False
+        self.loaded = None
+        self.alerts_loaded = None
+        self.last_alert_id = None
+        self.scanner_metrics = ''
+        self.stats = {'role': None, 'writes': 0, 'reads': 0, 'read_errors': 0, 'last_version': None,
+                      'alert_writes': 0, 'alert_reads': 0}
+    
+    def try_acquire(self):
+        """
+        Pokusí se získat zámek skeneru (neblokující)
+        
+        Returns:
+            True pokud tento proces je skener
+        """
+        if self.is_scanner:
+            return True
+        
+        lock_file = open(self.lock_path, 'a+')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            self.stats['role'] = 'reader'
+            return False
+        
+        # Zámek drží otevřený soubor - při ukončení procesu ho uvolní systém
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self.lock_file = lock_file
+        self.is_scanner = True
+        self.stats['role'] = 'scanner'
+        logger.info(f"Proces {os.getpid()} získal zámek {self.lock_path} a bude skenovat")
+        return True
+    
+    def write(self, snapshot, events, table_view):
+        """Zapíše snímek, SSE události, tabulku všech symbolů a metriky skeneru do sdíleného souboru (atomicky)"""
+        messages = [message.encode() for _, message in events]
+        table = table_view.to_payload()
+        scanner_metrics = metrics.render().encode()
+        header = json.dumps({
+            'version': snapshot.version,
+            'etag': snapshot.etag,
+            'last_update': snapshot.last_update,
+            'sizes': [len(snapshot.body), len(snapshot.gzip), len(snapshot.brotli) if snapshot.brotli is not None else -1,
+                      len(table), len(scanner_metrics)],
+            'events': [[event_id, len(message)] for (event_id, _), message in zip(events, messages)]
+        }).encode()
+        
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(self.MAGIC + struct.pack('<I', len(header)) + header)
+                f.write(snapshot.body)
+                f.write(snapshot.gzip)
+                f.write(snapshot.brotli or b'')
+                f.write(table)
+                f.write(scanner_metrics)
+                f.write(b''.join(messages))
+            os.replace(tmp_path, self.snapshot_path)
+            self.stats['writes'] += 1
+            self.stats['last_version'] = snapshot.version
+        except OSError as e:
+            logger.error(f"Nepodařilo se zapsat sdílený snímek {self.snapshot_path}: {str(e)}")
+    
+    def read(self):
+        """
+        Načte sdílený soubor, pokud se od posledního čtení změnil
+        
+        Returns:
+            Tuple (Snapshot, list (id, zpráva), RsiTableView) nebo None
+        """
+        try:
+            stat = os.stat(self.snapshot_path)
+        except FileNotFoundError:
+            return None
+        
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key == self.loaded:
+            return None
+        
+        try:
+            with open(self.snapshot_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data[:4] != self.MAGIC:
+                    raise ValueError("neplatná hlavička")
+                header_size = struct.unpack_from('<I', data, 4)[0]
+                header = json.loads(data[8:8 + header_size])
+                
+                offset = 8 + header_size
+                sections = []
+                for size in header['sizes']:
+                    sections.append(data[offset:offset + size] if size >= 0 else None)
+                    offset += max(size, 0)
+                
+                events = []
+                for event_id, size in header['events']:
+                    events.append((event_id, data[offset:offset + size].decode()))
+                    offset += size
+        except (OSError, ValueError) as e:
+            self.stats['read_errors'] += 1
+            logger.warning(f"Nepodařilo se načíst sdílený snímek: {str(e)}")
+            return None
+        
+        self.loaded = key
+        self.stats['reads'] += 1
+        self.stats['last_version'] = header['version']
+        if len(sections) > 4:
+            self.scanner_metrics = sections[4].decode()
+        snapshot = Snapshot.from_parts(header['version'], header['etag'], header['last_update'], *sections[:3])
+        return snapshot, events, RsiTableView.from_payload(sections[3])
+    
+    def write_alerts(self, events):
+        """Zapíše poslední dávky alertů (ID posledního alertu, SSE zpráva) atomicky - volá vlákno doručování alertů"""
+        tmp_path = f"{self.alerts_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(events, f, separators=(',', ':'))
+            os.replace(tmp_path, self.alerts_path)
+            self.stats['alert_writes'] += 1
+        except OSError as e:
+            logger.error(f"Nepodařilo se zapsat sdílené alerty {self.alerts_path}: {str(e)}")
+    
+    def read_alerts(self):
+        """
+        Načte sdílené události alertů, pokud se od posledního čtení změnily
+        
+        Returns:
+            List (id, zpráva) nebo None
+        """
+        try:
+            stat = os.stat(self.alerts_path)
+        except FileNotFoundError:
+            return None
+        
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key == self.alerts_loaded:
+            return None
+        
+        try:
+            with open(self.alerts_path, encoding='utf-8') as f:
+                events = json.load(f)
+        except (OSError, ValueError) as e:
+            self.stats['read_errors'] += 1
+            logger.warning(f"Nepodařilo se načíst sdílené alerty: {str(e)}")
+            return None
+        
+        self.alerts_loaded = key
+        self.stats['alert_reads'] += 1
+        return events
+    
+    def follow(self):
+        """
+        Smyčka čtecího workeru - přebírá snímky skeneru, dokud neuvolní zámek
+        
+        Returns:
+            True pokud tento worker převzal skenování
+        """
+        next_takeover = time.monotonic() + self.takeover_interval
+        while running:
+            update = self.read()
+            if update is not None:
+                apply_shared_snapshot(*update)
+            
+            alerts = self.read_alerts()
+            if alerts:
+                apply_shared_alerts(alerts)
+            
+            if time.monotonic() >= next_takeover:
+                if self.try_acquire():
+                    return True
+                next_takeover = time.monotonic() + self.takeover_interval
+            
+            time.sleep(self.poll_interval)
+        return False
+    
+    def snapshot(self):
+        return dict(self.stats, enabled=SHARED_STATE, pid=os.getpid())
+
+shared_state = SharedState(SCANNER_LOCK_PATH, SHARED_SNAPSHOT_PATH)
+
+def apply_shared_snapshot(snapshot, events, table_view):
+    """Převezme snímek skeneru - výsledky pro /get_rsi_data a /api/rsi, diagnostiku a SSE klienty workeru"""
+    global current_snapshot, data_version, rsi_table_view
+    
+    rsi_table_view = table_view
+    
+    payload = json.loads(snapshot.body)
+    results_cache['high_rsi'] = payload['high_rsi']
+    results_cache['low_rsi'] = payload['low_rsi']
+    results_cache['last_update'] = payload.get('last_update')
+    current_snapshot = snapshot
+    data_version = snapshot.version
+    
+    for event_id, message in events:
+        if event_id > sse_broadcaster.last_id:
+            sse_broadcaster.publish_message(event_id, message)
+
+def apply_shared_alerts(events):
+    """Převezme dávky alertů skeneru pro SSE klienty tohoto workeru (ID = ID posledního alertu dávky)"""
+    if shared_state.last_alert_id is None:
+        # Po startu workeru jen navážeme - staré alerty nově připojeným klientům nepřehráváme
+        shared_state.last_alert_id = max(alert_id for alert_id, _ in events)
+        return
+    for alert_id, message in events:
+        if alert_id > shared_state.last_alert_id:
+            sse_broadcaster.publish_message(None, message)
+            shared_state.last_alert_id = alert_id
+
+def shared_state_worker():
+    """Vlákno čtecího workeru - sleduje snímky skeneru, při jeho pádu převezme skenování"""
+    if shared_state.follow():
+        logger.info("Skener přestal běžet, tento worker přebírá skenování")
+        shared_state.write(current_snapshot, sse_broadcaster.recent(SHARED_EVENTS), rsi_table_view)
+        # Číslování alertů navazuje na převzaté, jinak by je klienti ostatních workerů zahodili
+        alert_engine.sequence = max(alert_engine.sequence, shared_state.last_alert_id or 0)
+        background_update()
+
+background_thread_lock = threading.Lock()
+
+def ensure_background_thread():
+    """
+    Spustí background thread pro aktualizaci dat, pokud ještě neběží.
+    Ve sdíleném režimu skenuje jen worker se zámkem, ostatní sledují jeho snímky.
+    """
+    with background_thread_lock:
+        if getattr(app, 'background_thread_started', False):
+            return
+        
+        target = background_update
+        if SHARED_STATE and not shared_state.try_acquire():
+            logger.info(f"Skenování běží v jiném workeru, proces {os.getpid()} bude číst sdílené snímky")
+            target = shared_state_worker
+        else:
+            logger.info("Spouštím aktualizaci na pozadí")
+            if SHARED_STATE:
+                # Obnovený snímek hned zpřístupníme ostatním workerům
+                shared_state.write(current_snapshot, sse_broadcaster.recent(SHARED_EVENTS), rsi_table_view)
+        
+        background_thread = threading.Thread(target=target)
+        background_thread.daemon = True
+        background_thread.start()
+        app.background_thread_started = True
+
 @app.route('/get_rsi_data')
 def get_rsi_data():
-    logger.info("Požadavek na RSI data")
+    logger.debug("Požadavek na RSI data")
     
-    global results_cache
-    if results_cache['last_update'] is None:
-        # První požadavek - vrátíme prázdná data, backend začne ihned zpracovávat
-        if not hasattr(app, 'background_thread_started') or not app.background_thread_started:
-            logger.info("Spouštím první aktualizaci na pozadí")
-            background_thread = threading.Thread(target=background_update)
-            background_thread.daemon = True
-            background_thread.start()
-            app.background_thread_started = True
-        return jsonify({'high_rsi': [], 'low_rsi': []})
-    
-    # Vrátíme data z cache
-    logger.info(f"Vracím data z cache, poslední aktualizace: {results_cache['last_update']}")
-    return jsonify({
-        'high_rsi': results_cache['high_rsi'],
-        'low_rsi': results_cache['low_rsi'],
-        'last_update': results_cache['last_update']
-    })
+    # Background thread spouštíme i při datech obnovených z disku - ty je potřeba aktualizovat
+    ensure_background_thread()
+    
+    # Před prvním skenem je ve snímku prázdný výsledek, backend začne ihned zpracovávat
+    snapshot = current_snapshot
+    
+    if snapshot.etag in request.headers.get('If-None-Match', ''):
+        snapshot_stats['not_modified'] += 1
+        rsi_data_requests.inc('304')
+        response = Response(status=304)
+    else:
+        snapshot_stats['full'] += 1
+        rsi_data_requests.inc('200')
+        body, encoding = snapshot.encoded(request.headers.get('Accept-Encoding', ''))
+        response = Response(body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    
+    # Klient si odpověď smí uložit, ale před použitím ji musí ověřit (ETag -> 304)
+    response.headers['ETag'] = snapshot.etag
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+@app.route('/api/rsi')
+def api_rsi():
+    """
+    Dotazy nad tabulkou všech symbolů a timeframe
+    
+    Parametry:
+        filter: Podmínky spojené AND, např. "rsi_1h>70,rsi_15m<30" nebo "rsi_1h>70%26rsi_15m<30"
+            (nezakódované & ukončí parametr - zbytek by byl neznámý parametr a vrátí 400)
+        sort: Sloupec pro řazení, s "-" sestupně (např. "-rsi_1h"), výchozí symbol
+        limit, offset: Stránkování (limit nejvýše 1000)
+        fields: Vrácené sloupce oddělené čárkou
+    """
+    ensure_background_thread()
+    view = rsi_table_view
+    
+    try:
+        unknown = [name for name in request.args if name not in API_RSI_PARAMS]
+        if unknown:
+            raise ValueError(f"Neznámý parametr: {unknown[0]} (& ve filtru zakódujte jako %26 nebo použijte čárku)")
+        
+        conditions = []
+        for expression in request.args.getlist('filter'):
+            conditions.extend(parse_filter(expression, view.fields()))
+        
+        sort = request.args.get('sort', 'symbol')
+        descending = sort.startswith('-')
+        sort = sort.lstrip('-+')
+        if sort not in view.fields():
+            raise ValueError(f"Neznámý sloupec pro řazení: {sort}")
+        
+        fields = [field for field in request.args.get('fields', '').split(',') if field] or None
+        unknown = [field for field in fields or [] if field not in view.fields()]
+        if unknown:
+            raise ValueError(f"Neznámé sloupce: {', '.join(unknown)}")
+        
+        limit = min(max(int(request.args.get('limit', API_DEFAULT_LIMIT)), 0), API_MAX_LIMIT)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError as e:
+        api_rsi_requests.inc('400')
+        return jsonify({'error': str(e)}), 400
+    
+    api_rsi_requests.inc('200')
+    total, rows = view.query(conditions, sort, descending, offset, limit, fields)
+    body = json.dumps({
+        'version': view.version,
+        'symbols': len(view),
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'rows': rows
+    }, separators=(',', ':'))
+    return Response(body, mimetype='application/json')
+
+def history_series(symbol, interval, count):
+    """Historie z paměti, ve workeru sdíleného režimu, který neskenuje, z perzistentní cache"""
+    if SHARED_STATE and not shared_state.is_scanner and state_cache is not None:
+        return state_cache.history(symbol, interval, count)
+    return rsi_history.series(symbol, interval, count)
+
+@app.route('/history/<symbol>')
+def history(symbol):
+    """
+    Historie RSI a ceny symbolu pro sparkline grafy
+    
+    Parametry:
+        interval: Timeframe (výchozí všechny)
+        points: Nejvýše kolik bodů vrátit na timeframe (delší historie se zředí)
+        window: Kolik posledních svíček historie vzít (výchozí celá historie)
+    """
+    ensure_background_thread()
+    symbol = symbol.upper()
+    
+    try:
+        intervals = [request.args['interval']] if 'interval' in request.args else SCAN_INTERVALS
+        unknown = [interval for interval in intervals if interval not in SCAN_INTERVALS]
+        if unknown:
+            raise ValueError(f"Neznámý timeframe: {unknown[0]}")
+        points = min(max(int(request.args.get('points', HISTORY_DEFAULT_POINTS)), 2), HISTORY_MAX_POINTS)
+        window = min(max(int(request.args.get('window', HISTORY_DEPTH)), 2), HISTORY_DEPTH)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    series = {}
+    for interval in intervals:
+        columns = history_series(symbol, interval, window)
+        if columns is None:
+            continue
+        
+        trend_window = columns[1][-TREND_WINDOW:].astype(np.float64)
+        open_times, rsi, prices = downsample(columns, points)
+        series[interval] = {
+            'open_time': open_times.tolist(),
+            'rsi': np.round(rsi.astype(np.float64), 2).tolist(),
+            'price': prices.tolist(),
+            'slope': round(rsi_slope(trend_window), 3) if len(trend_window) >= 2 else None
+        }
+    
+    if not series:
+        return jsonify({'error': f"Pro {symbol} nemáme historii"}), 404
+    
+    body = json.dumps({'symbol': symbol, 'trend_window': TREND_WINDOW, 'series': series}, separators=(',', ':'))
+    return Response(body, mimetype='application/json')
 
 @app.route('/test_data')
 def test_data():
@@ -610,8 +4434,11 @@ def diagnostics():
     
     # Informace o trendech
     trend_info = {
-        'tracked_pairs': len(previous_rsi_values),
-        'samples': {k: v for k, v in list(previous_rsi_values.items())[:5]} if previous_rsi_values else {}
+        'tracked_pairs': len(rsi_history.buffers),
+        'rsi_states': len(rsi_states),
+        'window': TREND_WINDOW,
+        'slope_threshold': TREND_SLOPE_THRESHOLD,
+        'history': rsi_history.memory_usage()
     }
     
     # Návratová hodnota
@@ -627,51 +4454,577 @@ def diagnostics():
             'running': running,
             'data_version': data_version
         },
-        'trends': trend_info
+        'scan': scan_stats,
+        'scheduler': scan_scheduler.snapshot(),
+        'priority': dict(priority_stats, hot_set=priority_stats['hot_set'][:20], weights=PRIORITY_WEIGHTS),
+        'sse': sse_broadcaster.snapshot(),
+        'alerts': dict(alert_engine.snapshot(), enabled=ALERTS_ENABLED, kinds=ALERT_KINDS, cooldown=ALERT_COOLDOWN,
+                       dispatch=alert_dispatcher.snapshot()),
+        'shared_state': shared_state.snapshot(),
+        'snapshot': dict(snapshot_stats, version=current_snapshot.version, etag=current_snapshot.etag,
+                         bytes=current_snapshot.sizes()),
+        'rate_limit': rate_limiter.snapshot(),
+        'http': http_transport.snapshot(),
+        'fetch': dict(fetch_stats, max_attempts=FETCH_MAX_ATTEMPTS, circuits=symbol_circuits.snapshot()),
+        'derived': dict(derived_stats, enabled=DERIVED_TIMEFRAMES, base_interval=BASE_INTERVAL,
+                        intervals=DERIVED_INTERVALS, verify_symbols=DERIVED_VERIFY_SYMBOLS),
+        'candle_store': candle_store.memory_usage(),
+        'symbol_universe': symbol_universe.snapshot(),
+        'stream': dict(stream_stats, mode=INGESTION_MODE),
+        'trends': trend_info,
+        'indicators': {
+            'enabled': [indicator.name for indicator in ENABLED_INDICATORS],
+            'available': {name: {'lookback': indicator.lookback, 'description': indicator.description}
+                          for name, indicator in INDICATOR_REGISTRY.items()},
+            'kline_history': KLINE_HISTORY,
+            'rules': {'rsi_high': RSI_HIGH, 'rsi_low': RSI_LOW,
+                      'screen_high': SCREEN_HIGH, 'screen_low': SCREEN_LOW}
+        }
     })
 
-@app.route('/sse')
-def sse():
+class SseBroadcaster:
     """
-    Velmi zjednodušená implementace SSE - odstranění všech problémů s kontextem
+    Rozesílá SSE události všem připojeným klientům.
+    
+    Klienti čekají na podmínce a probudí se jen při publikaci nové verze dat
+    (nebo po uplynutí heartbeatu), místo aby každý klient dotazoval data_version
+    každou sekundu. Poslední události se drží v historii, takže klient po
+    výpadku spojení dostane přes Last-Event-ID jen to, co zmeškal.
+    
+    Vedle datových událostí (ID = verze dat) nese stream i pojmenované události
+    bez ID (alerty), které Last-Event-ID klienta nemění. Pořadí v historii proto
+    drží vlastní pořadové číslo.
     """
-    def simple_stream():
-        last_version = 0
+    
+    def __init__(self, history=100, heartbeat=15):
+        self.condition = threading.Condition()
+        self.events = deque(maxlen=history)
+        self.sequence = 0
+        self.last_id = 0
+        self.heartbeat = heartbeat
+        self.closed = False
+        self.clients = 0
+        self.stats = {'connections': 0, 'peak_clients': 0, 'events': 0, 'heartbeats': 0, 'resumed': 0, 'resyncs': 0}
+    
+    @staticmethod
+    def format(payload, event_id=None, event=None):
+        """SSE zpráva s JSON daty, volitelně s ID a názvem události"""
+        message = f"data: {json.dumps(payload, separators=(',', ':'))}\n\n"
+        if event_id is not None:
+            message = f"id: {event_id}\n" + message
+        if event is not None:
+            message = f"event: {event}\n" + message
+        return message
+    
+    def publish(self, event_id, payload):
+        """
+        Uloží událost do historie a probudí všechny čekající klienty
         
-        # Jednoduchá zpráva při startu streamu
-        yield "data: {\"connected\": true}\n\n"
-        logger.info("SSE stream started")
+        Returns:
+            Velikost zprávy v bajtech (posílá se každému klientovi)
+        """
+        message = self.format(payload, event_id)
+        self.publish_message(event_id, message)
+        return len(message)
+    
+    def publish_message(self, event_id, message):
+        """
+        Rozešle hotovou SSE zprávu (např. převzatou od skeneru v jiném procesu).
+        Zpráva bez event_id (pojmenovaná událost) neposouvá last_id.
+        """
+        with self.condition:
+            if event_id is not None:
+                self.last_id = event_id
+            self.sequence += 1
+            self.events.append((self.sequence, event_id, message))
+            self.stats['events'] += 1
+            self.condition.notify_all()
+    
+    def recent(self, count):
+        """Posledních count datových událostí jako list (id, zpráva)"""
+        with self.condition:
+            return [(event_id, message) for _, event_id, message in self.events if event_id is not None][-count:]
+    
+    def close(self):
+        """Ukončí všechny streamy (při shutdownu)"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+    
+    def _resync(self):
+        """Při mezeře v historii jen poslední datová událost (klient si načte vše znovu)"""
+        self.stats['resyncs'] += 1
+        return [message for _, event_id, message in self.events if event_id is not None][-1:]
+    
+    def _events_since(self, sequence):
+        """Zprávy s pořadovým číslem vyšším než sequence"""
+        if self.events and self.events[0][0] > sequence + 1:
+            return self._resync()
+        return [message for stored, _, message in self.events if stored > sequence]
+    
+    def _events_after(self, event_id):
+        """Zprávy po datové události event_id (obnovení spojení přes Last-Event-ID)"""
+        if event_id == self.last_id and not any(stored_id == event_id for _, stored_id, _ in self.events):
+            return []
+        for sequence, stored_id, _ in self.events:
+            if stored_id == event_id:
+                return self._events_since(sequence)
+        return self._resync()
+    
+    def stream(self, last_event_id=None):
+        """
+        Generátor SSE zpráv pro jednoho klienta
         
-        # Uchováváme si aplikační kontext
-        app_ctx = app.app_context()
-        app_ctx.push()
+        Args:
+            last_event_id: ID poslední události, kterou klient dostal (obnovení spojení)
+        """
+        with self.condition:
+            self.clients += 1
+            self.stats['connections'] += 1
+            self.stats['peak_clients'] = max(self.stats['peak_clients'], self.clients)
         
         try:
-            while True:
-                # Jednoduché řešení bez problémů s kontextem
-                if data_version > last_version:
-                    last_version = data_version
-                    timestamp = results_cache['last_update'] if results_cache['last_update'] else datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    
-                    # Vytvoříme jednoduchý JSON string manuálně - bez jsonify
-                    json_str = f'{{\"update_available\": true, \"last_update\": \"{timestamp}\"}}'
-                    yield f"data: {json_str}\n\n"
-                    logger.info(f"SSE stream sent update, version: {last_version}")
+            # Prohlížeč se po výpadku připojí znovu za 5 s a pošle Last-Event-ID
+            yield "retry: 5000\ndata: {\"connected\": true}\n\n"
+            
+            with self.condition:
+                if last_event_id is None:
+                    pending = []
+                else:
+                    self.stats['resumed'] += 1
+                    pending = self._events_after(last_event_id)
+                sent = self.sequence
+            
+            for message in pending:
+                yield message
+            
+            while running and not self.closed:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.sequence != sent or self.closed or not running,
+                                            timeout=self.heartbeat)
+                    pending = self._events_since(sent) if self.sequence != sent else []
+                    sent = self.sequence
                 
-                time.sleep(1)
-        except GeneratorExit:
-            logger.info("SSE stream closed")
-            app_ctx.pop()  # Ukončení kontextu
-        except Exception as e:
-            logger.error(f"Error in SSE stream: {str(e)}")
-            yield f"data: {{\"error\": \"{str(e)}\"}}\n\n"
-            app_ctx.pop()  # Ukončení kontextu i při chybě
+                if pending:
+                    for message in pending:
+                        yield message
+                elif not self.closed:
+                    # Komentář udrží spojení otevřené přes proxy a odhalí odpojené klienty
+                    self.stats['heartbeats'] += 1
+                    yield ": heartbeat\n\n"
+        finally:
+            with self.condition:
+                self.clients -= 1
+    
+    def snapshot(self):
+        return dict(self.stats, clients=self.clients, last_event_id=self.last_id, heartbeat=self.heartbeat)
+
+sse_broadcaster = SseBroadcaster(SSE_HISTORY, SSE_HEARTBEAT)
+
+@app.route('/sse')
+def sse():
+    """
+    SSE stream s notifikacemi o nových datech. Klient může navázat přes
+    hlavičku Last-Event-ID (automaticky při reconnectu EventSource)
+    nebo parametr last_event_id.
+    
+    V gunicorn gthread workeru drží každý otevřený stream jedno vlákno, worker
+    proto obslouží nejvýš GUNICORN_THREADS souběžných streamů a požadavků (Procfile).
+    """
+    # Ve sdíleném režimu musí i worker obsluhující jen SSE sledovat snímky skeneru
+    ensure_background_thread()
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
     
-    response = Response(simple_stream(), mimetype="text/event-stream")
+    response = Response(sse_broadcaster.stream(last_event_id), mimetype="text/event-stream")
     response.headers['Cache-Control'] = 'no-cache'
     response.headers['X-Accel-Buffering'] = 'no'  # Pro Nginx
     return response
 
+class AlertEngine:
+    """
+    Sleduje stav každého symbolu ve výsledcích a při publikaci z přechodů
+    mezi stavy vytváří alerty.
+    
+    Stav symbolu je zóna (high = možný SHORT, low = možný LONG, None = mimo
+    tabulky) a shoda všech timeframe (1h, 15m i 1d za prahem RSI_HIGH/RSI_LOW).
+    Porovnává se jen proti stavu z předchozí publikace, takže práce je úměrná
+    počtu řádků tabulek. Stejný alert pro stejný symbol se během cooldownu
+    nezopakuje (symbol oscilující kolem prahu jinak generuje alert při každém skenu).
+    """
+    
+    def __init__(self, kinds, cooldown, recent=50):
+        self.kinds = set(kinds)
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.states = {}
+        self.rows = {}
+        self.last_sent = {}
+        self.primed = False
+        self.sequence = 0
+        self.recent = deque(maxlen=recent)
+        self.stats = {'publishes': 0, 'transitions': 0, 'alerts': 0, 'suppressed': 0}
+    
+    @staticmethod
+    def row_state(row, zone):
+        """
+        Stav symbolu z řádku výsledků dané zóny: (zóna, shoda timeframe nebo None).
+        RSI 0 je v řádku zástupná hodnota timeframe bez dostatku svíček (nový listing)
+        a shodu nezakládá.
+        """
+        values = (row['rsi'], row['rsi_15m'], row['rsi_1d'])
+        if not all(values):
+            return zone, None
+        if zone == 'high' and min(values) >= RSI_HIGH:
+            return zone, zone
+        if zone == 'low' and max(values) <= RSI_LOW:
+            return zone, zone
+        return zone, None
+    
+    @classmethod
+    def collect(cls, high_rows, low_rows):
+        """Stavy a řádky symbolů z obou tabulek výsledků"""
+        states = {}
+        rows = {}
+        for zone, zone_rows in (('high', high_rows), ('low', low_rows)):
+            for row in zone_rows:
+                states[row['symbol']] = cls.row_state(row, zone)
+                rows[row['symbol']] = row
+        return states, rows
+    
+    def prime(self, high_rows, low_rows):
+        """Nastaví výchozí stav bez alertů (výsledky obnovené z cache nebo první publikace)"""
+        with self.lock:
+            self.states, self.rows = self.collect(high_rows, low_rows)
+            self.primed = True
+    
+    @staticmethod
+    def transitions(old, new):
+        """Typy přechodů mezi dvěma stavy symbolu"""
+        old_zone, old_confluence = old
+        new_zone, new_confluence = new
+        kinds = []
+        if old_zone != new_zone:
+            if old_zone:
+                kinds.append(f"left_{ALERT_ZONES[old_zone]}")
+            if new_zone:
+                kinds.append(f"entered_{ALERT_ZONES[new_zone]}")
+        if new_confluence and new_confluence != old_confluence:
+            kinds.append(f"confluence_{ALERT_ZONES[new_confluence]}")
+        return kinds
+    
+    def observe(self, high_rows, low_rows, version):
+        """
+        Porovná nově publikované výsledky s předchozím stavem
+        
+        Returns:
+            List alertů (dict) k doručení, první publikace jen nastaví výchozí stav
+        """
+        states, rows = self.collect(high_rows, low_rows)
+        now = time.monotonic()
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        alerts = []
+        
+        with self.lock:
+            self.stats['publishes'] += 1
+            if not self.primed:
+                self.states, self.rows, self.primed = states, rows, True
+                return alerts
+            
+            empty = (None, None)
+            changed = [symbol for symbol, state in states.items() if self.states.get(symbol, empty) != state]
+            changed += [symbol for symbol in self.states if symbol not in states]
+            
+            for symbol in changed:
+                old = self.states.get(symbol, empty)
+                new = states.get(symbol, empty)
+                # Po odchodu z tabulek alert nese poslední známé hodnoty symbolu
+                row = rows.get(symbol) or self.rows[symbol]
+                for kind in self.transitions(old, new):
+                    self.stats['transitions'] += 1
+                    if kind not in self.kinds:
+                        continue
+                    key = (symbol, kind)
+                    if now - self.last_sent.get(key, -self.cooldown) < self.cooldown:
+                        self.stats['suppressed'] += 1
+                        alerts_suppressed.inc(kind)
+                        continue
+                    self.last_sent[key] = now
+                    self.sequence += 1
+                    alerts.append({
+                        'id': self.sequence,
+                        'kind': kind,
+                        'symbol': symbol,
+                        'rsi': row['rsi'],
+                        'rsi_15m': row['rsi_15m'],
+                        'rsi_1d': row['rsi_1d'],
+                        'price': row['price'],
+                        'trend': row['trend'],
+                        'version': version,
+                        'time': timestamp
+                    })
+                    alerts_generated.inc(kind)
+            
+            self.states, self.rows = states, rows
+            self.stats['alerts'] += len(alerts)
+            self.recent.extend(alerts)
+        
+        return alerts
+    
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats, tracked=len(self.states), primed=self.primed,
+                        cooldowns=len(self.last_sent), recent=list(self.recent)[-10:])
+
+class WebhookSink:
+    """POST dávky alertů jako JSON na webhook, dočasné chyby opakuje s backoffem"""
+    
+    name = 'webhook'
+    
+    def __init__(self, url, timeout, retries):
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.session = requests.Session()
+    
+    async def send(self, alerts):
+        loop = asyncio.get_running_loop()
+        body = json.dumps({'alerts': alerts}, separators=(',', ':'))
+        post = functools.partial(self.session.post, self.url, data=body, timeout=self.timeout,
+                                 headers={'Content-Type': 'application/json'})
+        error = None
+        for attempt in range(1, self.retries + 1):
+            try:
+                # Blokující requests běží v executoru, smyčka mezitím přijímá další alerty
+                response = await loop.run_in_executor(None, post)
+                if response.status_code < 300:
+                    return
+                error = f"HTTP {response.status_code}"
+                # Chyby klienta (kromě 429) opakování nevyřeší
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    break
+            except requests.RequestException as e:
+                error = str(e)
+            if attempt < self.retries:
+                await asyncio.sleep(min(RETRY_BASE_DELAY * 2 ** (attempt - 1), RETRY_MAX_DELAY))
+        raise RuntimeError(f"webhook {self.url}: {error}")
+
+class FileSink:
+    """Připisuje alerty do souboru jako JSON lines"""
+    
+    name = 'file'
+    
+    def __init__(self, path):
+        self.path = path
+    
+    def _write(self, lines):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+    
+    async def send(self, alerts):
+        lines = ''.join(json.dumps(alert, ensure_ascii=False) + '\n' for alert in alerts)
+        # Zápis na disk běží v executoru, smyčka mezitím obsluhuje ostatní sinky
+        await asyncio.get_running_loop().run_in_executor(None, self._write, lines)
+
+class SseSink:
+    """
+    Rozešle dávku alertů klientům /sse jako pojmenovanou událost 'alert' (bez ID,
+    datové události si číslování verzí ponechají). Ve sdíleném režimu předá
+    poslední dávky s ID posledního alertu i ostatním workerům.
+    """
+    
+    name = 'sse'
+    
+    def __init__(self, broadcaster, history=SHARED_EVENTS):
+        self.broadcaster = broadcaster
+        self.sent = deque(maxlen=history)
+    
+    async def send(self, alerts):
+        message = SseBroadcaster.format({'alerts': alerts}, event='alert')
+        self.broadcaster.publish_message(None, message)
+        self.sent.append((alerts[-1]['id'], message))
+        if shared_state.is_scanner:
+            await asyncio.get_running_loop().run_in_executor(None, shared_state.write_alerts, list(self.sent))
+
+class AlertDispatcher:
+    """
+    Doručuje alerty do sinků z vlastní asyncio smyčky ve vlákně na pozadí.
+    
+    Skener alerty jen předá přes call_soon_threadsafe a nečeká na doručení.
+    Každý sink má vlastní omezenou frontu a konzumenta, takže nedostupný
+    webhook (pokusy s timeoutem a backoffem) zdrží a při přetečení zahazuje
+    jen své alerty - soubor a SSE dostanou alerty hned. Konzument bere alerty
+    po dávkách až batch_size kusů, takže i nával stovek přechodů po jednom
+    skenu znamená jen několik požadavků na webhook.
+    """
+    
+    def __init__(self, sinks, queue_size, batch_size):
+        self.sinks = sinks
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.loop = None
+        self.queues = {}
+        self.thread = None
+        self.lock = threading.Lock()
+        self.stats = {'submitted': 0, 'queued': 0, 'dropped': 0}
+        self.sink_stats = {sink.name: {'queued': 0, 'dropped': 0, 'batches': 0, 'alerts': 0, 'failures': 0}
+                           for sink in sinks}
+    
+    def start(self):
+        """Spustí smyčku doručování (líně při prvních alertech, aby nevznikala ve forku před gunicorn workerem)"""
+        with self.lock:
+            if self.thread is not None:
+                return
+            ready = threading.Event()
+            self.thread = threading.Thread(target=self._run, args=(ready,), name='alert-dispatch', daemon=True)
+            self.thread.start()
+        ready.wait(timeout=5)
+    
+    def _run(self, ready):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.queues = {sink.name: asyncio.Queue(self.queue_size) for sink in self.sinks}
+        consumers = [loop.create_task(self._consume(sink)) for sink in self.sinks]
+        self.loop = loop
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            for consumer in consumers:
+                consumer.cancel()
+            loop.run_until_complete(asyncio.gather(*consumers, return_exceptions=True))
+            loop.close()
+    
+    def submit(self, alerts):
+        """Předá alerty do front sinků - z vlákna skeneru, bez čekání"""
+        if not alerts or not self.sinks:
+            return
+        self.start()
+        self.stats['submitted'] += len(alerts)
+        try:
+            self.loop.call_soon_threadsafe(self._enqueue, alerts)
+        except (RuntimeError, AttributeError):
+            # Smyčka neběží (shutdown)
+            self.stats['dropped'] += len(alerts) * len(self.sinks)
+    
+    def _enqueue(self, alerts):
+        for name, queue in self.queues.items():
+            stats = self.sink_stats[name]
+            for alert in alerts:
+                try:
+                    queue.put_nowait(alert)
+                    stats['queued'] += 1
+                    self.stats['queued'] += 1
+                except asyncio.QueueFull:
+                    stats['dropped'] += 1
+                    self.stats['dropped'] += 1
+    
+    async def _consume(self, sink):
+        queue = self.queues[sink.name]
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await self._deliver(sink, batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+    
+    async def _deliver(self, sink, batch):
+        stats = self.sink_stats[sink.name]
+        started = time.perf_counter()
+        try:
+            await sink.send(batch)
+            stats['batches'] += 1
+            stats['alerts'] += len(batch)
+        except Exception as e:
+            stats['failures'] += 1
+            alert_sink_failures.inc(sink.name)
+            logger.warning(f"Doručení {len(batch)} alertů do sinku {sink.name} selhalo: {str(e)}")
+        finally:
+            alert_dispatch_seconds.observe(time.perf_counter() - started, sink.name)
+    
+    def pending(self):
+        """Alerty čekající na doručení ve frontách všech sinků"""
+        return sum(queue.qsize() for queue in self.queues.values())
+    
+    def close(self, timeout=2):
+        """Při shutdownu počká na doručení front (nejvýš timeout) a zastaví smyčku"""
+        if self.loop is None or self.loop.is_closed():
+            return
+        
+        async def drain():
+            await asyncio.gather(*(queue.join() for queue in self.queues.values()))
+        
+        try:
+            asyncio.run_coroutine_threadsafe(asyncio.wait_for(drain(), timeout), self.loop).result(timeout + 1)
+        except Exception:
+            logger.warning(f"Při ukončení zůstalo nedoručeno {self.pending()} alertů")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=timeout)
+    
+    def snapshot(self):
+        sinks = {name: dict(stats, pending=self.queues[name].qsize() if name in self.queues else 0)
+                 for name, stats in self.sink_stats.items()}
+        return dict(self.stats, pending=self.pending(), queue_size=self.queue_size, batch_size=self.batch_size,
+                    sinks=sinks)
+
+def build_alert_sinks():
+    """Sinky alertů podle konfigurace"""
+    sinks = []
+    if ALERT_WEBHOOK_URL:
+        sinks.append(WebhookSink(ALERT_WEBHOOK_URL, ALERT_WEBHOOK_TIMEOUT, ALERT_WEBHOOK_RETRIES))
+    if ALERT_FILE_PATH:
+        sinks.append(FileSink(ALERT_FILE_PATH))
+    if ALERT_SSE:
+        sinks.append(SseSink(sse_broadcaster))
+    return sinks
+
+alert_engine = AlertEngine(ALERT_KINDS, ALERT_COOLDOWN)
+alert_dispatcher = AlertDispatcher(build_alert_sinks(), ALERT_QUEUE_SIZE, ALERT_BATCH_SIZE)
+
+# Metriky čtené až při scrapu ze stavu, který aplikace vede i bez /metrics
+worker_metrics.gauge('rsi_sse_clients', 'Aktuálně připojení SSE klienti', lambda: sse_broadcaster.clients)
+worker_metrics.gauge('rsi_sse_connections_total', 'Navázaná SSE spojení', lambda: sse_broadcaster.stats['connections'], 'counter')
+worker_metrics.gauge('rsi_sse_events_total', 'Rozeslané SSE události', lambda: sse_broadcaster.stats['events'], 'counter')
+worker_metrics.gauge('rsi_data_version', 'Verze dat obsluhovaná workerem', lambda: current_snapshot.version)
+worker_metrics.gauge('rsi_snapshot_age_seconds', 'Stáří snímku výsledků obsluhovaného workerem', lambda: snapshot_age(current_snapshot))
+metrics.gauge('rsi_rate_limit_window_weight', 'Váha využitá v aktuální minutě', lambda: rate_limiter.window_used)
+metrics.gauge('rsi_rate_limit_blocked_seconds', 'Zbývající doba pozastavení požadavků', lambda: round(rate_limiter.blocked_for(), 3))
+metrics.gauge('rsi_http_requests_total', 'HTTP požadavky na Binance', lambda: http_transport.stats['requests'], 'counter')
+metrics.gauge('rsi_http_connections_total', 'Nově navázaná HTTP spojení na Binance', lambda: http_transport.stats['connections'], 'counter')
+metrics.gauge('rsi_http_tls_handshakes_total', 'TLS handshaky při navazování spojení na Binance', lambda: http_transport.stats['tls_handshakes'], 'counter')
+metrics.gauge('rsi_ban_circuit_open_seconds', 'Zbývající doba globálního circuitu po banu IP', lambda: round(rate_limiter.banned_for(), 3))
+metrics.gauge('rsi_symbol_circuits_open', 'Symboly s rozpojeným circuitem', lambda: len(symbol_circuits.open_keys()))
+metrics.gauge('rsi_fetch_requeued_total', 'Pokusy o stažení klines vrácené do fronty s backoffem', lambda: fetch_stats['requeued'], 'counter')
+metrics.gauge('rsi_fetch_failed_total', 'Stažení klines, která selhala i po opakování', lambda: fetch_stats['failed'], 'counter')
+metrics.gauge('rsi_alert_queue_depth', 'Alerty čekající ve frontách sinků na doručení', alert_dispatcher.pending)
+metrics.gauge('rsi_alerts_dropped_total', 'Alerty zahozené při přetečení front sinků (součet přes sinky)', lambda: alert_dispatcher.stats['dropped'], 'counter')
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    Metriky ve formátu Prometheus. Metriky skeneru vede jen proces, který skenuje -
+    čtecí workery sdíleného režimu vrací jejich text ze sdíleného snímku (stav
+    k poslední publikaci). Metriky HTTP a SSE obsluhy jsou za každý worker zvlášť
+    s labely worker (PID) a role, takže se série workerů nepřepisují.
+    """
+    if SHARED_STATE and not shared_state.is_scanner:
+        # Worker obsluhující jen /metrics musí sledovat snímky skeneru
+        ensure_background_thread()
+        scanner = shared_state.scanner_metrics
+        role = 'reader'
+    else:
+        scanner = metrics.render()
+        role = 'scanner'
+    body = scanner + worker_metrics.render((('worker', os.getpid()), ('role', role)))
+    return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # Přidáme metodu pro restart aplikace v případě potřeby
 @app.route('/restart')
 def restart_app():
@@ -728,12 +5081,7 @@ if __name__ == '__main__':
     logger.info(f"Port: {port}")
     
     # Nastartujeme background thread pro aktualizaci dat
-    if not hasattr(app, 'background_thread_started') or not app.background_thread_started:
-        logger.info("Spouštím aktualizaci na pozadí")
-        background_thread = threading.Thread(target=background_update)
-        background_thread.daemon = True
-        background_thread.start()
-        app.background_thread_started = True
+    ensure_background_thread()
     
     # Nastavit Werkzeug logger na WARNING, abychom omezili výpisy
     werkzeug_logger = logging.getLogger('werkzeug')
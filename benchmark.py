@@ -0,0 +1,665 @@
+"""
+Benchmarky a kontroly výkonu RSI scanneru. Běží bez sítě nad syntetickými daty.
+
+Použití:
+    python benchmark.py rsi-state    # inkrementální RSI stav vs. plný přepočet
+    python benchmark.py rsi-matrix   # vektorové RSI přes matici vs. calculate_rsi
+    python benchmark.py indicators   # cena každého indikátoru z registru vůči samotnému RSI
+    python benchmark.py sse-load     # 1000 souběžných SSE klientů na jednom procesu
+    python benchmark.py snapshot     # /get_rsi_data: jsonify při každém požadavku vs. snímek s ETag
+    python benchmark.py scan         # celý sken proti fake Binance serveru pro 100/500/1000 symbolů
+    python benchmark.py alerts       # nával přechodů, cooldown, přetečení fronty a 503 proti fake webhooku
+
+Výsledky skenů lze připisovat do souboru a porovnávat mezi commity:
+    python benchmark.py scan --output bench_scan.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+# Benchmark nesmí sahat na reálné Binance API
+os.environ.setdefault('BINANCE_FUTURES_URL', 'http://127.0.0.1:9/fapi')
+# ani na perzistentní cache - import app by ji obnovil a publikace syntetických dat přepsala
+os.environ.setdefault('CANDLE_CACHE_PATH', '')
+
+import app
+from fake_binance import FakeWebhookServer
+
+KLINE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_av', 'trades', 'tb_base_av', 'tb_quote_av', 'ignore']
+
+def synthetic_klines(count, seed=0, step=3600000):
+    """Vygeneruje klines ve formátu REST odpovědi s náhodnou procházkou ceny"""
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+    start = 1700000000000
+    return [
+        [start + i * step, "0", "0", "0", f"{close:.8f}", "0", start + (i + 1) * step - 1, "0", 0, "0", "0", "0"]
+        for i, close in enumerate(closes)
+    ]
+
+def full_rsi(klines):
+    """Plný přepočet RSI přes calculate_rsi (stejně jako původní scan)"""
+    df = pd.DataFrame(klines, columns=KLINE_COLUMNS)
+    df['close'] = pd.to_numeric(df['close'])
+    return app.calculate_rsi(df)
+
+def bench_rsi_state(args):
+    """
+    Regresní kontrola a benchmark RsiState.
+    
+    1. Stav založený na začátku historie a posouvaný po jedné svíčce musí dát
+       bitově stejné RSI jako plný přepočet calculate_rsi nad stejnou historií.
+    2. Produkce ale stahuje jen posuvné okno posledních 50 svíček a dřívější
+       calculate_rsi počítal nad ním, takže jeho Wilder průměry začínaly vždy
+       znovu 50 svíček zpátky. Inkrementální stav naopak nese průměry od svého
+       založení - RSI tak záměrně odpovídá celé historii od startu procesu (jako
+       na grafu burzy) a od RSI posuvného okna se liší. Kontrola tento rozdíl
+       měří a selže jen při překročení --max-drift bodů RSI.
+    """
+    mismatches = 0
+    checks = 0
+    full_time = 0.0
+    incremental_time = 0.0
+    
+    for seed in range(args.symbols):
+        klines = synthetic_klines(args.candles, seed)
+        app.rsi_states.clear()
+        
+        # Seed z prvních 50 svíček, pak posun o jednu uzavřenou svíčku v každém kroku
+        for end in range(50, args.candles + 1):
+            window = klines[:end]
+            
+            started = time.perf_counter()
+            incremental = app.update_rsi_state('TEST', '1h', window)
+            incremental_time += time.perf_counter() - started
+            
+            started = time.perf_counter()
+            expected = full_rsi(window)
+            full_time += time.perf_counter() - started
+            
+            checks += 1
+            if incremental != expected:
+                mismatches += 1
+                print(f"Neshoda seed={seed} end={end}: inkrementálně {incremental!r}, plný přepočet {expected!r}")
+    
+    print(f"Rostoucí historie - kontrol: {checks}, neshod: {mismatches}")
+    print(f"Plný přepočet:  {full_time / checks * 1e6:8.1f} µs na výpočet")
+    print(f"Inkrementálně:  {incremental_time / checks * 1e6:8.1f} µs na výpočet")
+    
+    # Posuvné okno 50 svíček jako v produkci: stav se posouvá, calculate_rsi začíná vždy znovu
+    drifts = []
+    for seed in range(args.symbols):
+        klines = synthetic_klines(args.candles, seed)
+        app.rsi_states.clear()
+        for end in range(50, args.candles + 1):
+            window = klines[end - 50:end]
+            drifts.append(abs(app.update_rsi_state('TEST', '1h', window) - full_rsi(window)))
+    
+    drifts = np.array(drifts)
+    print(f"Posuvné okno 50 svíček - kontrol: {len(drifts)}, rozdíl RSI proti calculate_rsi: "
+          f"průměr {drifts.mean():.3f}, p99 {np.percentile(drifts, 99):.3f}, max {drifts.max():.3f} bodů "
+          f"(limit {args.max_drift})")
+    if drifts[0] != 0:
+        print("Neshoda: první okno (stav založený z něj) se musí shodovat s calculate_rsi")
+        mismatches += 1
+    if drifts.max() > args.max_drift:
+        print(f"Rozdíl proti posuvnému oknu překročil {args.max_drift} bodů RSI")
+        mismatches += 1
+    return 1 if mismatches else 0
+
+def bench_rsi_matrix(args):
+    """
+    Benchmark vektorového batch_rsi nad maticí symboly x svíčky proti
+    calculate_rsi volanému pro každý symbol zvlášť (DataFrame + smyčka v Pythonu).
+    """
+    klines_list = [synthetic_klines(args.candles, seed) for seed in range(args.symbols)]
+    
+    started = time.perf_counter()
+    expected = [full_rsi(klines) for klines in klines_list]
+    full_time = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    closes = app.klines_to_close_matrix(klines_list)
+    parse_time = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    vectorized = app.batch_rsi(closes)
+    kernel_time = time.perf_counter() - started
+    
+    mismatches = sum(1 for a, b in zip(expected, vectorized.tolist()) if a != b)
+    
+    print(f"Matice: {args.symbols} symbolů x {args.candles} svíček, neshod: {mismatches}")
+    print(f"calculate_rsi po symbolech: {full_time * 1000:9.1f} ms")
+    print(f"Parsování do matice:        {parse_time * 1000:9.1f} ms")
+    print(f"batch_rsi:                  {kernel_time * 1000:9.1f} ms ({full_time / kernel_time:.0f}x rychlejší)")
+    return 1 if mismatches else 0
+
+async def sse_client(port, received, last_event_id=None):
+    """
+    Jeden SSE klient nad holým socketem - zapisuje čas přijetí každé události
+    
+    Args:
+        port: Port testovaného serveru
+        received: Dict event_id -> čas přijetí (perf_counter)
+        last_event_id: Volitelné ID pro navázání streamu
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    headers = f"Last-Event-ID: {last_event_id}\r\n" if last_event_id is not None else ""
+    # HTTP/1.0 - server posílá stream bez chunked kódování
+    writer.write(f"GET /sse HTTP/1.0\r\nHost: localhost\r\n{headers}\r\n".encode())
+    await writer.drain()
+    
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.startswith(b'id: '):
+                received[int(line[4:])] = time.perf_counter()
+    finally:
+        writer.close()
+
+async def run_sse_load(args, port):
+    broadcaster = app.sse_broadcaster
+    received = [{} for _ in range(args.clients)]
+    tasks = []
+    
+    # Připojujeme po dávkách, aby se nepřeplnila fronta příchozích spojení serveru
+    started = time.perf_counter()
+    for i in range(args.clients):
+        tasks.append(asyncio.create_task(sse_client(port, received[i])))
+        if i % 100 == 99:
+            await asyncio.sleep(0.2)
+    while broadcaster.clients < args.clients:
+        if time.perf_counter() - started > 60:
+            print(f"Připojilo se jen {broadcaster.clients}/{args.clients} klientů")
+            return 1
+        await asyncio.sleep(0.1)
+    print(f"Připojeno {broadcaster.clients} klientů za {time.perf_counter() - started:.1f} s, "
+          f"vláken: {threading.active_count()}")
+    
+    # Nečinnost - klienti nesmí spotřebovávat CPU, dokud se nic nepublikuje
+    cpu_before = time.process_time()
+    await asyncio.sleep(args.idle)
+    idle_cpu = time.process_time() - cpu_before
+    print(f"CPU při nečinnosti: {idle_cpu / args.idle * 100:.1f} % jednoho jádra "
+          f"(heartbeatů: {broadcaster.stats['heartbeats']})")
+    
+    # Publikace událostí a měření zpoždění doručení všem klientům
+    latencies = []
+    first_id = broadcaster.last_id + 1
+    for event_id in range(first_id, first_id + args.events):
+        published = time.perf_counter()
+        broadcaster.publish(event_id, {'update_available': True, 'last_update': 'benchmark'})
+        deadline = published + 10
+        while sum(1 for r in received if event_id in r) < args.clients and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        delays = [r[event_id] - published for r in received if event_id in r]
+        latencies.append((max(delays), statistics.median(delays), len(delays)))
+        await asyncio.sleep(args.interval)
+    
+    missing = sum(args.clients - delivered for _, _, delivered in latencies)
+    print(f"Událostí: {args.events}, nedoručeno: {missing}")
+    print(f"Zpoždění doručení všem klientům: medián {statistics.median(l[1] for l in latencies) * 1000:.1f} ms, "
+          f"nejhorší {max(l[0] for l in latencies) * 1000:.1f} ms")
+    
+    # Navázání přes Last-Event-ID - klient musí dostat právě zmeškané události
+    resumed = {}
+    resume_from = first_id + args.events - 3
+    resume_task = asyncio.create_task(sse_client(port, resumed, last_event_id=resume_from))
+    await asyncio.sleep(1)
+    replayed = sorted(resumed)
+    print(f"Last-Event-ID {resume_from}: přehráno {replayed}")
+    
+    print(f"Špičková paměť procesu: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    
+    for task in tasks + [resume_task]:
+        task.cancel()
+    await asyncio.gather(*tasks, resume_task, return_exceptions=True)
+    
+    ok = missing == 0 and replayed == list(range(resume_from + 1, first_id + args.events))
+    return 0 if ok else 1
+
+def bench_sse_load(args):
+    """
+    Zátěžový test SSE broadcasteru: mnoho souběžných klientů na jednom procesu
+    (vláknový Werkzeug server jako v app.run), publikace událostí a Last-Event-ID.
+    """
+    from werkzeug.serving import make_server
+    
+    # Každé spojení drží jedno vlákno serveru - menší zásobník šetří paměť
+    threading.stack_size(512 * 1024)
+    app.sse_broadcaster.heartbeat = args.heartbeat
+    
+    server = make_server('127.0.0.1', args.port, app.app, threaded=True)
+    server.socket.listen(1024)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    
+    try:
+        return asyncio.run(run_sse_load(args, args.port))
+    finally:
+        app.sse_broadcaster.close()
+        server.shutdown()
+
+def synthetic_rows(count, seed=0):
+    """Vygeneruje řádky výsledků ve formátu build_result_row"""
+    rng = np.random.default_rng(seed)
+    trends = ['up', 'down', 'stable']
+    return [
+        {
+            'symbol': f"S{i:04d}USDT",
+            'rsi': round(float(rng.uniform(0, 100)), 2),
+            'rsi_15m': round(float(rng.uniform(0, 100)), 2),
+            'rsi_1d': round(float(rng.uniform(0, 100)), 2),
+            'price': f"${rng.uniform(0.001, 1000):.4f}",
+            'trend': trends[i % 3],
+            'trend_15m': trends[(i + 1) % 3],
+            'trend_1d': trends[(i + 2) % 3]
+        }
+        for i in range(count)
+    ]
+
+def legacy_get_rsi_data():
+    """Původní /get_rsi_data - jsonify celé cache při každém požadavku"""
+    app.logger.info("Požadavek na RSI data")
+    return app.jsonify({
+        'high_rsi': app.results_cache['high_rsi'],
+        'low_rsi': app.results_cache['low_rsi'],
+        'last_update': app.results_cache['last_update']
+    })
+
+def bench_snapshot(args):
+    """
+    Propustnost /get_rsi_data: původní jsonify při každém požadavku proti
+    předem serializovanému snímku (gzip) a odpovědi 304 na shodný ETag.
+    """
+    app.ensure_background_thread = lambda: None
+    rows = synthetic_rows(args.rows)
+    app.publish_results(rows[:args.rows // 2], rows[args.rows // 2:])
+    app.app.add_url_rule('/benchmark/legacy', 'benchmark_legacy', legacy_get_rsi_data)
+    client = app.app.test_client()
+    
+    def measure(label, path, headers=None):
+        for _ in range(50):
+            client.get(path, headers=headers)
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        for _ in range(args.requests):
+            response = client.get(path, headers=headers)
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+        print(f"{label:32s} {args.requests / elapsed:9.0f} req/s  {cpu / args.requests * 1e6:7.0f} µs CPU/req  "
+              f"{len(response.data):7d} B  HTTP {response.status_code}")
+        return args.requests / elapsed
+    
+    print(f"Výsledky: {args.rows} řádků, snímek {app.current_snapshot.sizes()}")
+    legacy = measure("jsonify při každém požadavku", '/benchmark/legacy')
+    measure("snímek bez komprese", '/get_rsi_data')
+    measure("snímek gzip", '/get_rsi_data', {'Accept-Encoding': 'gzip'})
+    not_modified = measure("304 Not Modified", '/get_rsi_data', {'If-None-Match': app.current_snapshot.etag})
+    print(f"304 oproti původnímu řešení: {not_modified / legacy:.1f}x více požadavků za sekundu")
+    return 0
+
+def bench_scan_run(args):
+    """
+    Jeden běh skenu v samostatném procesu (spouští ho bench_scan), aby špičková
+    paměť a CPU patřily jen tomuto běhu. Výsledek vypíše jako JSON řádek.
+    """
+    # Seznam symbolů se stáhne předem - v provozu je v cache a do skenu nepatří
+    app.symbol_universe.refresh()
+    result = {'symbols': len(app.symbol_universe.get())}
+    
+    for phase in ('cold', 'warm'):
+        requests_before = app.rate_limiter.stats['requests']
+        cpu_started = time.process_time()
+        started = time.perf_counter()
+        app.get_futures_data()
+        result[phase] = {
+            'wall': round(time.perf_counter() - started, 3),
+            'cpu': round(time.process_time() - cpu_started, 3),
+            'requests': app.rate_limiter.stats['requests'] - requests_before,
+            'failed': app.scan_stats['failed_requests'],
+            'rows': len(app.results_cache['high_rsi']) + len(app.results_cache['low_rsi']),
+            'connections': app.scan_stats['http']['connections'],
+            'reuse_rate': app.scan_stats['http']['reuse_rate']
+        }
+    
+    result['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    print("RESULT " + json.dumps(result))
+    return 0
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_server(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"{url}/v1/ping", timeout=1)
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def bench_scan(args):
+    """
+    End-to-end benchmark skenu: pro každou velikost trhu spustí fake Binance server
+    a v samostatném procesu studený (prázdný candle store) a teplý (inkrementální)
+    get_futures_data. Měří čas, počet požadavků, CPU a špičkovou paměť.
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    
+    print(f"{'symbolů':>8} {'fáze':>5} {'čas s':>8} {'CPU s':>7} {'požadavků':>10} {'spojení':>8} {'chyb':>5} {'řádků':>6} {'RSS MB':>7}")
+    for count in args.sizes:
+        rest_port, ws_port = free_port(), free_port()
+        fake = subprocess.Popen(
+            [sys.executable, os.path.join(base_dir, 'fake_binance.py'), '--symbols', str(count),
+             '--rest-port', str(rest_port), '--ws-port', str(ws_port), '--tick', '3600',
+             '--latency', str(args.latency), '--jitter', str(args.jitter),
+             '--error-rate', str(args.error_rate), '--weight-limit', str(args.server_weight_limit)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        
+        try:
+            url = f"http://127.0.0.1:{rest_port}/fapi"
+            if not wait_for_server(url):
+                print(f"Fake server pro {count} symbolů se nespustil")
+                return 1
+            
+            env = dict(os.environ, BINANCE_FUTURES_URL=url, CANDLE_CACHE_PATH='',
+                       BINANCE_WEIGHT_LIMIT=str(args.weight_limit))
+            run = subprocess.run([sys.executable, os.path.abspath(__file__), 'scan-run'],
+                                 env=env, capture_output=True, text=True, cwd=args.workdir)
+            lines = [line for line in run.stdout.splitlines() if line.startswith('RESULT ')]
+            if not lines:
+                print(f"Sken pro {count} symbolů selhal:\n{run.stderr[-2000:]}")
+                return 1
+            result = json.loads(lines[-1][len('RESULT '):])
+        finally:
+            fake.terminate()
+            fake.wait()
+        
+        results.append(result)
+        for phase in ('cold', 'warm'):
+            r = result[phase]
+            print(f"{result['symbols']:>8} {phase:>5} {r['wall']:>8.2f} {r['cpu']:>7.2f} {r['requests']:>10} "
+                  f"{r.get('connections', ''):>8} {r['failed']:>5} {r['rows']:>6} {result['peak_rss_mb'] if phase == 'cold' else '':>7}")
+    
+    if args.output:
+        record = {
+            'revision': git_revision(),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'latency': args.latency,
+            'jitter': args.jitter,
+            'error_rate': args.error_rate,
+            'results': results
+        }
+        with open(args.output, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"Výsledky připsány do {args.output}")
+    return 0
+
+def synthetic_ohlcv(symbols, candles, seed=0):
+    """Vygeneruje matice open/high/low/close/volume (symboly x svíčky) s náhodnou procházkou ceny"""
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (symbols, candles)), axis=1))
+    opens = np.hstack([closes[:, :1], closes[:, :-1]])
+    spread = np.abs(rng.normal(0, 0.005, (symbols, candles)))
+    return {
+        'open': opens,
+        'high': np.maximum(opens, closes) * (1 + spread),
+        'low': np.minimum(opens, closes) * (1 - spread),
+        'close': closes,
+        'volume': rng.lognormal(10, 1, (symbols, candles))
+    }
+
+def time_best(fn, repeat):
+    """Nejlepší čas z repeat běhů (s)"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def bench_indicators(args):
+    """
+    Cena indikátorů z registru nad jednou maticí timeframe. "Samostatně" je výpočet
+    nad čerstvým IndicatorInput, "přidaný" je přírůstek při zapínání indikátorů
+    v pořadí registru nad sdíleným vstupem (společné mezivýsledky se nepočítají znovu).
+    """
+    columns = synthetic_ohlcv(args.symbols, args.candles)
+    names = args.names or list(app.INDICATOR_REGISTRY)
+    unknown = [name for name in names if name not in app.INDICATOR_REGISTRY]
+    if unknown:
+        print(f"Neznámé indikátory: {', '.join(unknown)}")
+        return 1
+    
+    baseline = time_best(lambda: app.batch_rsi(columns['close']), args.repeat)
+    print(f"Matice: {args.symbols} symbolů x {args.candles} svíček, nejlepší z {args.repeat} běhů")
+    print(f"{'indikátor':<14} {'lookback':>8} {'samostatně':>12} {'přidaný':>12} {'vs. RSI':>8} {'NaN':>5}")
+    print(f"{'rsi (batch)':<14} {'':>8} {baseline * 1000:9.2f} ms {'':>12} {'1.0x':>8}")
+    
+    def cumulative(count):
+        data = app.IndicatorInput(columns)
+        for name in names[:count]:
+            app.INDICATOR_REGISTRY[name].compute(data)
+    
+    previous = 0.0
+    for i, name in enumerate(names):
+        indicator = app.INDICATOR_REGISTRY[name]
+        alone = time_best(lambda: indicator.compute(app.IndicatorInput(columns)), args.repeat)
+        total = time_best(lambda: cumulative(i + 1), args.repeat)
+        added = max(0.0, total - previous)
+        previous = total
+        missing = int(np.isnan(indicator.compute(app.IndicatorInput(columns))).sum())
+        print(f"{name:<14} {indicator.lookback:>8} {alone * 1000:9.2f} ms {added * 1000:9.2f} ms "
+              f"{added / baseline:7.1f}x {missing:>5}")
+    
+    print(f"{'celkem':<14} {'':>8} {'':>12} {previous * 1000:9.2f} ms {previous / baseline:7.1f}x")
+    return 0
+
+def alert_rows(symbols, rsi):
+    """Řádky výsledků se stejným RSI na všech timeframe (pro přechody alertů)"""
+    return [{'symbol': symbol, 'rsi': rsi, 'rsi_15m': rsi, 'rsi_1d': rsi, 'price': '$1.0000', 'trend': 'stable'}
+            for symbol in symbols]
+
+def wait_until(condition, timeout):
+    """Čeká, dokud condition() neplatí (nejvýš timeout s)"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def bench_alerts(args):
+    """
+    Alert engine proti lokální náhradě webhooku: nával přechodů po jedné publikaci
+    se doručí po dávkách do všech sinků, aniž by zdržel skener, cooldown potlačí
+    opakovaný vstup, přetečení fronty zahazuje místo blokování a webhook
+    odpovídající 503 se opakuje a započítá jako selhání, aniž by zdržel ostatní sinky.
+    """
+    failures = []
+    
+    def check(label, ok, detail=''):
+        print(f"{'OK ' if ok else 'CHYBA'} {label}{f' ({detail})' if detail else ''}")
+        if not ok:
+            failures.append(label)
+    
+    half = args.symbols // 2
+    symbols = [f"S{i:04d}USDT" for i in range(args.symbols)]
+    high, low = symbols[:half], symbols[half:]
+    expected = 2 * len(high) + 2 * len(low)  # vstup do zóny + shoda všech timeframe
+    alert_path = os.path.join(args.workdir, 'benchmark_alerts.jsonl')
+    if os.path.exists(alert_path):
+        os.remove(alert_path)
+    
+    hook = FakeWebhookServer(port=0, latency=args.latency).start()
+    broadcaster = app.SseBroadcaster()
+    webhook = app.WebhookSink(hook.url, timeout=5, retries=3)
+    dispatcher = app.AlertDispatcher([webhook, app.FileSink(alert_path), app.SseSink(broadcaster)],
+                                     args.queue_size, args.batch_size)
+    engine = app.AlertEngine(app.ALERT_KIND_NAMES, cooldown=60)
+    
+    try:
+        # Nával: všechny symboly najednou vstoupí do zón se shodou timeframe
+        engine.observe([], [], 1)
+        started = time.perf_counter()
+        dispatcher.submit(engine.observe(alert_rows(high, 80), alert_rows(low, 10), 2))
+        handoff = time.perf_counter() - started
+        delivered = wait_until(lambda: dispatcher.sink_stats['webhook']['alerts'] >= expected, 30)
+        elapsed = time.perf_counter() - started
+        batches = -(-expected // args.batch_size)
+        print(f"Nával {expected} alertů: předání skeneru {handoff * 1000:.1f} ms, doručení {elapsed * 1000:.0f} ms "
+              f"({len(hook.batches)} dávek, latence webhooku {args.latency * 1000:.0f} ms)")
+        check("webhook dostal všechny alerty", delivered and len(hook.alerts) == expected, f"{len(hook.alerts)}/{expected}")
+        check("alerty odeslány po dávkách", len(hook.batches) == batches, f"{len(hook.batches)} dávek, čekáno {batches}")
+        check("předání neblokuje skener", handoff < args.latency * batches, f"{handoff * 1000:.1f} ms")
+        wait_until(lambda: dispatcher.sink_stats['file']['alerts'] >= expected, 5)
+        with open(alert_path, encoding='utf-8') as f:
+            lines = sum(1 for _ in f)
+        check("soubor obsahuje všechny alerty", lines == expected, f"{lines} řádků")
+        wait_until(lambda: dispatcher.sink_stats['sse']['alerts'] >= expected, 5)
+        check("SSE kanál dostal všechny alerty", dispatcher.sink_stats['sse']['alerts'] == expected)
+        events = [message for _, _, message in broadcaster.events]
+        check("alerty jsou pojmenovaná událost bez ID",
+              events and all(message.startswith('event: alert\ndata: ') for message in events)
+              and broadcaster.last_id == 0 and not broadcaster.recent(10), f"{len(events)} událostí")
+        
+        # Cooldown: odchod ze zóny se ohlásí, opakovaný vstup do cooldownu ne
+        left = engine.observe([], alert_rows(low, 10), 3)
+        again = engine.observe(alert_rows(high, 80), alert_rows(low, 10), 4)
+        check("odchod ze zóny ohlášen", len(left) == len(high) and all(a['kind'] == 'left_overbought' for a in left))
+        check("opakovaný vstup potlačen cooldownem", not again and engine.stats['suppressed'] == 2 * len(high),
+              f"potlačeno {engine.stats['suppressed']}")
+    finally:
+        dispatcher.close()
+    
+    try:
+        # Přetečení fronty: jedno předání větší než fronta se zčásti zahodí, neblokuje
+        overflow = app.AlertDispatcher([app.WebhookSink(hook.url, timeout=5, retries=1)], 50, 10)
+        alerts = [dict(alert, id=i + 1) for i, alert in enumerate(engine.recent)] * 10
+        started = time.perf_counter()
+        overflow.submit(alerts[:500])
+        handoff = time.perf_counter() - started
+        wait_until(lambda: overflow.pending() == 0 and overflow.sink_stats['webhook']['alerts'] >= 50, 30)
+        check("přetečení fronty zahazuje", overflow.stats['queued'] == 50 and overflow.stats['dropped'] == 450,
+              f"ve frontě {overflow.stats['queued']}, zahozeno {overflow.stats['dropped']}, předání {handoff * 1000:.1f} ms")
+    finally:
+        overflow.close()
+        hook.stop()
+    
+    failing = FakeWebhookServer(port=0, error_rate=1.0).start()
+    isolated_path = os.path.join(args.workdir, 'benchmark_alerts_isolated.jsonl')
+    if os.path.exists(isolated_path):
+        os.remove(isolated_path)
+    try:
+        # Webhook odpovídající 503: dávka se zkusí retries-krát, pak se započítá selhání.
+        # Soubor má vlastní frontu, takže alerty dostane hned, ne až po backoffu webhooku.
+        rejecting = app.AlertDispatcher([app.WebhookSink(failing.url, timeout=5, retries=3),
+                                         app.FileSink(isolated_path)], 100, 100)
+        started = time.perf_counter()
+        rejecting.submit(list(engine.recent)[:10])
+        wait_until(lambda: rejecting.sink_stats['file']['alerts'] >= 10, 5)
+        isolated = time.perf_counter() - started
+        check("pomalý webhook nezdrží ostatní sinky",
+              rejecting.sink_stats['file']['alerts'] == 10 and rejecting.sink_stats['webhook']['failures'] == 0,
+              f"soubor za {isolated * 1000:.0f} ms")
+        wait_until(lambda: rejecting.sink_stats['webhook']['failures'] >= 1, 30)
+        check("503 se opakuje a započítá", failing.requests == 3 and rejecting.sink_stats['webhook']['failures'] == 1,
+              f"{failing.requests} pokusů")
+    finally:
+        rejecting.close()
+        failing.stop()
+    
+    print(f"Kontrol selhalo: {len(failures)}")
+    return 1 if failures else 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarky RSI scanneru')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    rsi_state = subparsers.add_parser('rsi-state', help='Inkrementální RSI stav vs. plný přepočet')
+    rsi_state.add_argument('--symbols', type=int, default=20)
+    rsi_state.add_argument('--candles', type=int, default=300)
+    rsi_state.add_argument('--max-drift', type=float, default=5.0,
+                           help='Povolený rozdíl proti calculate_rsi nad posuvným oknem 50 svíček (body RSI)')
+    rsi_state.set_defaults(func=bench_rsi_state)
+    
+    rsi_matrix = subparsers.add_parser('rsi-matrix', help='Vektorové RSI přes matici vs. calculate_rsi')
+    rsi_matrix.add_argument('--symbols', type=int, default=500)
+    rsi_matrix.add_argument('--candles', type=int, default=500)
+    rsi_matrix.set_defaults(func=bench_rsi_matrix)
+    
+    indicators = subparsers.add_parser('indicators', help='Cena indikátorů z registru vůči samotnému RSI')
+    indicators.add_argument('--symbols', type=int, default=500)
+    indicators.add_argument('--candles', type=int, default=64, help='Délka řady (lookback zapnutých indikátorů)')
+    indicators.add_argument('--repeat', type=int, default=20)
+    indicators.add_argument('names', nargs='*', help='Indikátory v pořadí zapínání (výchozí celý registr)')
+    indicators.set_defaults(func=bench_indicators)
+    
+    sse_load = subparsers.add_parser('sse-load', help='Souběžní SSE klienti na jednom procesu')
+    sse_load.add_argument('--clients', type=int, default=1000)
+    sse_load.add_argument('--events', type=int, default=10)
+    sse_load.add_argument('--interval', type=float, default=0.5, help='Pauza mezi událostmi (s)')
+    sse_load.add_argument('--idle', type=float, default=5, help='Délka měření nečinnosti (s)')
+    sse_load.add_argument('--heartbeat', type=float, default=2)
+    sse_load.add_argument('--port', type=int, default=5090)
+    sse_load.set_defaults(func=bench_sse_load)
+    
+    snapshot = subparsers.add_parser('snapshot', help='/get_rsi_data: jsonify vs. předem serializovaný snímek')
+    snapshot.add_argument('--rows', type=int, default=300)
+    snapshot.add_argument('--requests', type=int, default=2000)
+    snapshot.set_defaults(func=bench_snapshot)
+    
+    scan = subparsers.add_parser('scan', help='Celý sken proti fake Binance serveru')
+    scan.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 1000], help='Počty symbolů trhu')
+    scan.add_argument('--latency', type=float, default=0.02, help='Latence fake serveru (s)')
+    scan.add_argument('--jitter', type=float, default=0.02)
+    scan.add_argument('--error-rate', type=float, default=0.0, help='Podíl vynucených odpovědí 429')
+    scan.add_argument('--weight-limit', type=int, default=1000000,
+                      help='Limit váhy rate limiteru aplikace (výchozí bez omezení - měříme fetch engine)')
+    scan.add_argument('--server-weight-limit', type=int, default=0, help='Limit váhy fake serveru (0 = bez limitu)')
+    scan.add_argument('--workdir', default=os.getcwd(), help='Pracovní adresář skenu (app.log)')
+    scan.add_argument('--output', help='Soubor JSON lines pro sledování výsledků mezi commity')
+    scan.set_defaults(func=bench_scan)
+    
+    alerts = subparsers.add_parser('alerts', help='Alert engine a sinky proti fake webhooku')
+    alerts.add_argument('--symbols', type=int, default=450, help='Symbolů v návalu (každý dá 2 alerty)')
+    alerts.add_argument('--latency', type=float, default=0.05, help='Latence fake webhooku (s)')
+    alerts.add_argument('--queue-size', type=int, default=1000)
+    alerts.add_argument('--batch-size', type=int, default=100)
+    alerts.add_argument('--workdir', default=os.getcwd(), help='Adresář pro soubor alertů')
+    alerts.set_defaults(func=bench_alerts)
+    
+    scan_run = subparsers.add_parser('scan-run', help='Interní: jeden běh skenu (spouští ho "scan")')
+    scan_run.set_defaults(func=bench_scan_run)
+    
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+if __name__ == '__main__':
+    main()
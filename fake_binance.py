@@ -0,0 +1,693 @@
+"""
+Lokální náhrada Binance USDⓈ-M futures API pro testování bez sítě.
+
+Server generuje syntetický trh (náhodná procházka cen pro zvolený počet symbolů)
+a obsluhuje REST endpointy, které scanner používá, a combined kline WebSocket streamy.
+
+Spuštění:
+    python fake_binance.py --symbols 50 --rest-port 9001 --ws-port 9002
+
+Simulace zhoršených podmínek (latence, náhodné 429, limit váhy s banem):
+    python fake_binance.py --latency 0.05 --jitter 0.05 --error-rate 0.01 --weight-limit 2400
+
+Nahrání skutečných 15m svíček z Binance a jejich přehrávání:
+    python fake_binance.py --record recording.json --symbols 50 --history-days 30
+    python fake_binance.py --recording recording.json
+
+Aplikaci pak přesměrujeme proměnnými prostředí:
+    BINANCE_FUTURES_URL=http://127.0.0.1:9001/fapi
+    BINANCE_FUTURES_WS_URL=ws://127.0.0.1:9002
+
+Náhrada webhooku pro alerty (přijaté dávky vypisuje do logu):
+    python fake_binance.py --webhook-port 9003
+    ALERT_WEBHOOK_URL=http://127.0.0.1:9003/alerts
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import requests
+import websockets
+
+logger = logging.getLogger('fake_binance')
+
+# Délky intervalů v milisekundách
+INTERVAL_MS = {
+    '15m': 15 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000
+}
+
+# Základní interval, ze kterého se skládají delší svíčky
+BASE_INTERVAL = '15m'
+
+def symbol_names(count):
+    """Vygeneruje deterministická jména symbolů (BTCUSDT, ETHUSDT, ... S0042USDT)"""
+    known = ["BTC", "ETH", "BNB", "SOL", "XRP", "ADA", "DOGE", "MATIC", "AVAX", "DOT"]
+    return [f"{known[i] if i < len(known) else f'S{i:04d}'}USDT" for i in range(count)]
+
+def format_number(value):
+    return f"{value:.8f}"
+
+def request_weight(path, params):
+    """Váha požadavku podle dokumentace Binance USDⓈ-M futures API"""
+    if path == '/fapi/v1/klines':
+        limit = int(params.get('limit', 500))
+        if limit < 100:
+            return 1
+        elif limit < 500:
+            return 2
+        elif limit <= 1000:
+            return 5
+        return 10
+    elif path == '/fapi/v1/ticker/24hr':
+        return 1 if 'symbol' in params else 40
+    return 1
+
+class FakeMarket:
+    """
+    Syntetický trh - pro každý symbol drží 15m svíčky jako NumPy pole.
+    Delší intervaly se skládají z 15m svíček na UTC hranicích, takže jsou konzistentní.
+    """
+
+    def __init__(self, symbols=100, history_days=60, seed=42, volatility=0.004):
+        self.symbols = symbol_names(symbols)
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.history_days = history_days
+        self.seed = seed
+        self.volatility = volatility
+        self.series = {}
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_recording(cls, path, seed=42, volatility=0.004):
+        """
+        Vytvoří trh z nahraných 15m svíček (soubor z record()).
+        Časy se posunou tak, aby poslední nahraná svíčka byla aktuální.
+        """
+        with open(path) as f:
+            recording = json.load(f)
+
+        market = cls(0, seed=seed, volatility=volatility)
+        market.symbols = list(recording)
+        market.symbol_index = {symbol: i for i, symbol in enumerate(market.symbols)}
+
+        step = INTERVAL_MS[BASE_INTERVAL]
+        now_open = int(time.time() * 1000) // step * step
+        for symbol, rows in recording.items():
+            data = np.array(rows, dtype=np.float64)
+            open_times = data[:, 0].astype(np.int64)
+            market.series[symbol] = {
+                'open_time': open_times + (now_open - open_times[-1]),
+                'open': data[:, 1],
+                'high': data[:, 2],
+                'low': data[:, 3],
+                'close': data[:, 4],
+                'volume': data[:, 5]
+            }
+
+        return market
+
+    def _generate(self, symbol):
+        """Vygeneruje historii 15m svíček pro symbol (lazy - až při prvním přístupu)"""
+        index = self.symbol_index[symbol]
+        rng = np.random.default_rng(self.seed + index)
+        step = INTERVAL_MS[BASE_INTERVAL]
+        count = self.history_days * (INTERVAL_MS['1d'] // step)
+
+        now_ms = int(time.time() * 1000)
+        last_open = now_ms // step * step
+        open_times = last_open - step * np.arange(count - 1, -1, -1, dtype=np.int64)
+
+        # Každý symbol má vlastní drift, aby se na trhu objevovaly i extrémní hodnoty RSI
+        drift = rng.normal(0, self.volatility / 40)
+        returns = rng.normal(drift, self.volatility, count)
+        start_price = float(10 ** rng.uniform(-3, 4))
+        closes = start_price * np.exp(np.cumsum(returns))
+        opens = np.concatenate(([start_price], closes[:-1]))
+        spread = np.abs(rng.normal(0, self.volatility / 2, count))
+        highs = np.maximum(opens, closes) * (1 + spread)
+        lows = np.minimum(opens, closes) * (1 - spread)
+        volumes = rng.uniform(100, 10000, count)
+
+        return {
+            'open_time': open_times,
+            'open': opens,
+            'high': highs,
+            'low': lows,
+            'close': closes,
+            'volume': volumes
+        }
+
+    def _get(self, symbol):
+        series = self.series.get(symbol)
+        if series is None:
+            series = self._generate(symbol)
+            self.series[symbol] = series
+        return series
+
+    def advance(self):
+        """Posune trh o jeden tick - změní cenu tvořící se svíčky, případně založí novou"""
+        step = INTERVAL_MS[BASE_INTERVAL]
+        now_open = int(time.time() * 1000) // step * step
+
+        with self.lock:
+            for symbol, s in self.series.items():
+                if s['open_time'][-1] < now_open:
+                    # Uzavřeme svíčku a založíme novou začínající na poslední ceně
+                    last_close = s['close'][-1]
+                    s['open_time'] = np.append(s['open_time'], now_open)
+                    for column in ('open', 'high', 'low', 'close'):
+                        s[column] = np.append(s[column], last_close)
+                    s['volume'] = np.append(s['volume'], 0.0)
+
+                price = s['close'][-1] * float(np.exp(self.rng.normal(0, self.volatility / 4)))
+                s['close'][-1] = price
+                s['high'][-1] = max(s['high'][-1], price)
+                s['low'][-1] = min(s['low'][-1], price)
+                s['volume'][-1] += float(self.rng.uniform(1, 50))
+
+    def candles(self, symbol, interval):
+        """
+        Vrátí svíčky symbolu pro daný interval jako dict NumPy polí
+
+        Raises:
+            KeyError: Neznámý symbol nebo interval
+        """
+        if symbol not in self.symbol_index or interval not in INTERVAL_MS:
+            raise KeyError(symbol)
+
+        with self.lock:
+            s = {column: values.copy() for column, values in self._get(symbol).items()}
+
+        if interval == BASE_INTERVAL:
+            return s
+
+        # Agregace 15m svíček na UTC hranice delšího intervalu
+        step = INTERVAL_MS[interval]
+        buckets = s['open_time'] // step * step
+        starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+        ends = np.concatenate((starts[1:], [len(buckets)])) - 1
+
+        return {
+            'open_time': buckets[starts],
+            'open': s['open'][starts],
+            'high': np.maximum.reduceat(s['high'], starts),
+            'low': np.minimum.reduceat(s['low'], starts),
+            'close': s['close'][ends],
+            'volume': np.add.reduceat(s['volume'], starts)
+        }
+
+    def klines(self, symbol, interval, limit=500, start_time=None, end_time=None):
+        """Vrátí klines ve formátu REST odpovědi /fapi/v1/klines"""
+        c = self.candles(symbol, interval)
+        mask = np.ones(len(c['open_time']), dtype=bool)
+        if start_time is not None:
+            mask &= c['open_time'] >= start_time
+        if end_time is not None:
+            mask &= c['open_time'] <= end_time
+
+        indexes = np.flatnonzero(mask)
+        # Se startTime vrací Binance nejstarší svíčky, jinak ty nejnovější
+        indexes = indexes[:limit] if start_time is not None else indexes[-limit:]
+        step = INTERVAL_MS[interval]
+
+        return [
+            self.kline_row(c, i, step)
+            for i in indexes
+        ]
+
+    @staticmethod
+    def kline_row(c, i, step):
+        open_time = int(c['open_time'][i])
+        volume = float(c['volume'][i])
+        return [
+            open_time,
+            format_number(c['open'][i]),
+            format_number(c['high'][i]),
+            format_number(c['low'][i]),
+            format_number(c['close'][i]),
+            format_number(volume),
+            open_time + step - 1,
+            format_number(volume * float(c['close'][i])),
+            int(volume // 10),
+            format_number(volume / 2),
+            format_number(volume * float(c['close'][i]) / 2),
+            "0"
+        ]
+
+    def exchange_info(self):
+        return {
+            'timezone': 'UTC',
+            'serverTime': int(time.time() * 1000),
+            'rateLimits': [
+                {'rateLimitType': 'REQUEST_WEIGHT', 'interval': 'MINUTE', 'intervalNum': 1, 'limit': 2400}
+            ],
+            'symbols': [
+                {'symbol': symbol, 'status': 'TRADING', 'contractType': 'PERPETUAL', 'quoteAsset': 'USDT'}
+                for symbol in self.symbols
+            ]
+        }
+
+    def ticker_24h(self, symbol=None):
+        """Vrátí 24h ticker ve formátu /fapi/v1/ticker/24hr (pro jeden nebo všechny symboly)"""
+        if symbol is not None and symbol not in self.symbol_index:
+            raise KeyError(symbol)
+
+        window = INTERVAL_MS['1d'] // INTERVAL_MS[BASE_INTERVAL]
+        tickers = []
+        for name in ([symbol] if symbol is not None else self.symbols):
+            with self.lock:
+                s = {column: values[-window:].copy() for column, values in self._get(name).items()}
+            open_price, last_price = float(s['open'][0]), float(s['close'][-1])
+            volume = float(s['volume'].sum())
+            quote_volume = float((s['volume'] * s['close']).sum())
+            tickers.append({
+                'symbol': name,
+                'priceChange': format_number(last_price - open_price),
+                'priceChangePercent': f"{100 * (last_price - open_price) / open_price:.3f}",
+                'weightedAvgPrice': format_number(quote_volume / volume),
+                'lastPrice': format_number(last_price),
+                'lastQty': '1',
+                'openPrice': format_number(open_price),
+                'highPrice': format_number(s['high'].max()),
+                'lowPrice': format_number(s['low'].min()),
+                'volume': format_number(volume),
+                'quoteVolume': format_number(quote_volume),
+                'openTime': int(s['open_time'][0]),
+                'closeTime': int(time.time() * 1000),
+                'firstId': 0,
+                'lastId': 0,
+                'count': int(volume // 10)
+            })
+
+        return tickers[0] if symbol is not None else tickers
+
+    def kline_event(self, symbol, interval, closed_only=False):
+        """
+        Vrátí poslední dvě svíčky jako kline události WebSocket streamu
+
+        Returns:
+            List (předposlední uzavřená svíčka s x=true, aktuální tvořící se svíčka)
+        """
+        c = self.candles(symbol, interval)
+        step = INTERVAL_MS[interval]
+        now_ms = int(time.time() * 1000)
+        events = []
+
+        for i, is_closed in ((len(c['open_time']) - 2, True), (len(c['open_time']) - 1, False)):
+            row = self.kline_row(c, i, step)
+            events.append({
+                'e': 'kline',
+                'E': now_ms,
+                's': symbol,
+                'k': {
+                    't': row[0], 'T': row[6], 's': symbol, 'i': interval,
+                    'f': 0, 'L': 0,
+                    'o': row[1], 'c': row[4], 'h': row[2], 'l': row[3], 'v': row[5],
+                    'n': row[8], 'x': is_closed, 'q': row[7], 'V': row[9], 'Q': row[10], 'B': '0'
+                }
+            })
+
+        return events
+
+def record(path, symbols=50, history_days=30, base_url='https://fapi.binance.com'):
+    """
+    Stáhne 15m svíčky prvních symbolů ze skutečného Binance API a uloží je
+    pro FakeMarket.from_recording (JSON: symbol -> [[open_time, o, h, l, c, v], ...])
+    """
+    session = requests.Session()
+    info = session.get(f"{base_url}/fapi/v1/exchangeInfo", timeout=30).json()
+    names = [s['symbol'] for s in info['symbols']
+             if s['status'] == 'TRADING' and s['contractType'] == 'PERPETUAL' and s['symbol'].endswith('USDT')][:symbols]
+
+    step = INTERVAL_MS[BASE_INTERVAL]
+    end_time = int(time.time() * 1000)
+    start_time = end_time - history_days * INTERVAL_MS['1d']
+    recording = {}
+
+    for name in names:
+        rows = []
+        cursor = start_time
+        while cursor < end_time:
+            klines = session.get(f"{base_url}/fapi/v1/klines", timeout=30, params={
+                'symbol': name, 'interval': BASE_INTERVAL, 'startTime': cursor, 'limit': 1500
+            }).json()
+            if not klines:
+                break
+            rows.extend([k[0], float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5])] for k in klines)
+            cursor = klines[-1][0] + step
+            # Šetříme limit váhy skutečného API
+            time.sleep(0.2)
+        recording[name] = rows
+        logger.info(f"Nahráno {len(rows)} svíček {name}")
+
+    with open(path, 'w') as f:
+        json.dump(recording, f)
+    return len(recording)
+
+class RestHandler(BaseHTTPRequestHandler):
+    """HTTP handler pro REST endpointy /fapi/v1/*"""
+
+    server_version = 'FakeBinance/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        fake = self.server.fake
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        market = fake.market
+
+        fake.delay()
+        rejected = fake.admit(request_weight(url.path, params))
+        if rejected is not None:
+            self.send_json(*rejected)
+            return
+        weight_headers = {'X-MBX-USED-WEIGHT-1M': fake.used_weight}
+
+        try:
+            if url.path == '/fapi/v1/ping':
+                payload = {}
+            elif url.path == '/fapi/v1/exchangeInfo':
+                payload = market.exchange_info()
+            elif url.path == '/fapi/v1/ticker/24hr':
+                payload = market.ticker_24h(params.get('symbol'))
+            elif url.path == '/fapi/v1/klines':
+                payload = market.klines(
+                    params['symbol'],
+                    params['interval'],
+                    limit=min(int(params.get('limit', 500)), 1500),
+                    start_time=int(params['startTime']) if 'startTime' in params else None,
+                    end_time=int(params['endTime']) if 'endTime' in params else None
+                )
+            else:
+                self.send_json(404, {'code': -1, 'msg': 'Not found'})
+                return
+        except KeyError:
+            self.send_json(400, {'code': -1121, 'msg': 'Invalid symbol.'}, weight_headers)
+            return
+
+        self.send_json(200, payload, weight_headers)
+
+class FakeBinanceServer:
+    """
+    Spouští REST i WebSocket server ve vláknech na pozadí.
+    Lze použít z příkazové řádky i přímo z testovacích skriptů.
+    """
+
+    def __init__(self, market=None, host='127.0.0.1', rest_port=9001, ws_port=9002, tick=1.0,
+                 latency=0.0, jitter=0.0, error_rate=0.0, weight_limit=0, ban_after=3, ban_seconds=60):
+        self.market = market or FakeMarket()
+        self.host = host
+        self.rest_port = rest_port
+        self.ws_port = ws_port
+        self.tick = tick
+
+        # Simulace zhoršených podmínek: latence odpovědí, náhodné 429 a limit váhy za minutu
+        # (po ban_after překročeních limitu v jedné minutě následuje 418 ban na ban_seconds)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.weight_limit = weight_limit
+        self.ban_after = ban_after
+        self.ban_seconds = ban_seconds
+
+        self.used_weight = 0
+        self.weight_window = None
+        self.violations = 0
+        self.banned_until = 0.0
+        self.limit_lock = threading.Lock()
+
+        self.stats = {'requests': 0, 'weight': 0, 'throttled': 0, 'injected_errors': 0, 'banned': 0,
+                      'ws_connections': 0, 'ws_messages': 0}
+        self.running = False
+        self.http_server = None
+        self.loop = None
+        self.threads = []
+
+    def delay(self):
+        """Simulovaná latence sítě a serveru"""
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    def admit(self, weight):
+        """
+        Započítá váhu požadavku do minutového okna a rozhodne o jeho odmítnutí
+        stejně jako Binance (429 při překročení limitu, 418 ban po opakování)
+
+        Returns:
+            None pokud požadavek projde, jinak (status, payload, hlavičky) odpovědi
+        """
+        now = time.time()
+        with self.limit_lock:
+            self.stats['requests'] += 1
+
+            if now < self.banned_until:
+                self.stats['banned'] += 1
+                retry_after = int(self.banned_until - now) + 1
+                return 418, {'code': -1003, 'msg': f'Way too many requests; IP banned until {int(self.banned_until * 1000)}.'}, {'Retry-After': retry_after}
+
+            window = int(now // 60)
+            if window != self.weight_window:
+                self.weight_window = window
+                self.used_weight = 0
+                self.violations = 0
+
+            if self.error_rate and random.random() < self.error_rate:
+                self.stats['injected_errors'] += 1
+                return 429, {'code': -1003, 'msg': 'Too many requests (injected).'}, {'Retry-After': 1, 'X-MBX-USED-WEIGHT-1M': self.used_weight}
+
+            self.used_weight += weight
+            if self.weight_limit and self.used_weight > self.weight_limit:
+                self.stats['throttled'] += 1
+                self.violations += 1
+                if self.violations > self.ban_after:
+                    self.banned_until = now + self.ban_seconds
+                    logger.warning(f"Limit váhy opakovaně překročen, ban na {self.ban_seconds} s")
+                retry_after = 60 - int(now % 60)
+                return 429, {'code': -1003, 'msg': 'Too many requests; current limit is exceeded.'}, {'Retry-After': retry_after, 'X-MBX-USED-WEIGHT-1M': self.used_weight}
+
+            self.stats['weight'] += weight
+            return None
+
+    @property
+    def rest_url(self):
+        return f"http://{self.host}:{self.rest_port}/fapi"
+
+    @property
+    def ws_url(self):
+        return f"ws://{self.host}:{self.ws_port}"
+
+    async def handle_stream(self, websocket, path=None):
+        """Obslouží jedno combined stream spojení (/stream?streams=a@kline_1h/b@kline_15m)"""
+        if path is None:
+            path = websocket.request.path if hasattr(websocket, 'request') else websocket.path
+        streams = parse_qs(urlparse(path).query).get('streams', [''])[0].split('/')
+        subscriptions = []
+        for stream in filter(None, streams):
+            symbol, _, interval = stream.partition('@kline_')
+            if symbol.upper() in self.market.symbol_index and interval in INTERVAL_MS:
+                subscriptions.append((stream, symbol.upper(), interval))
+
+        self.stats['ws_connections'] += 1
+        last_open = {}
+        try:
+            while self.running:
+                for stream, symbol, interval in subscriptions:
+                    closed, current = self.market.kline_event(symbol, interval)
+                    # Při přechodu na novou svíčku pošleme nejdřív finální stav uzavřené
+                    if last_open.get(stream) not in (None, current['k']['t']):
+                        await websocket.send(json.dumps({'stream': stream, 'data': closed}))
+                        self.stats['ws_messages'] += 1
+                    last_open[stream] = current['k']['t']
+                    await websocket.send(json.dumps({'stream': stream, 'data': current}))
+                    self.stats['ws_messages'] += 1
+                await asyncio.sleep(self.tick)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    def _run_ws(self, ready):
+        async def main():
+            async with websockets.serve(self.handle_stream, self.host, self.ws_port):
+                ready.set()
+                while self.running:
+                    await asyncio.sleep(0.2)
+
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(main())
+
+    def _run_ticker(self):
+        while self.running:
+            self.market.advance()
+            time.sleep(self.tick)
+
+    def start(self):
+        self.running = True
+
+        self.http_server = ThreadingHTTPServer((self.host, self.rest_port), RestHandler)
+        self.http_server.daemon_threads = True
+        self.http_server.fake = self
+        self.rest_port = self.http_server.server_address[1]
+
+        ready = threading.Event()
+        for target, args in ((self.http_server.serve_forever, ()), (self._run_ws, (ready,)), (self._run_ticker, ())):
+            thread = threading.Thread(target=target, args=args, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        ready.wait(timeout=10)
+
+        logger.info(f"Fake Binance běží: REST {self.rest_url}, WebSocket {self.ws_url}")
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.http_server:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Přijímá POST dávky alertů a ukládá je na serveru"""
+
+    server_version = 'FakeWebhook/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_POST(self):
+        hook = self.server.hook
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with hook.lock:
+            hook.requests += 1
+
+        if hook.latency:
+            time.sleep(hook.latency)
+        if hook.error_rate and hook.random.random() < hook.error_rate:
+            status = 503
+        else:
+            status = 200
+            hook.receive(json.loads(body))
+
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+class FakeWebhookServer:
+    """
+    Lokální náhrada webhooku pro alerty. Přijaté dávky drží v paměti
+    (batches) a počítá všechny požadavky včetně odmítnutých (requests),
+    takže testovací skript může ověřit, co aplikace odeslala a kolikrát to zkusila.
+    """
+
+    def __init__(self, host='127.0.0.1', port=9003, latency=0.0, error_rate=0.0, seed=42):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.batches = []
+        self.requests = 0
+        self.http_server = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/alerts"
+
+    @property
+    def alerts(self):
+        with self.lock:
+            return [alert for batch in self.batches for alert in batch]
+
+    def receive(self, payload):
+        alerts = payload.get('alerts', [])
+        with self.lock:
+            self.batches.append(alerts)
+        for alert in alerts[:5]:
+            logger.info(f"Alert {alert.get('kind')} {alert.get('symbol')} RSI {alert.get('rsi')}")
+        if len(alerts) > 5:
+            logger.info(f"... a dalších {len(alerts) - 5} alertů v dávce")
+
+    def start(self):
+        self.http_server = ThreadingHTTPServer((self.host, self.port), WebhookHandler)
+        self.http_server.daemon_threads = True
+        self.http_server.hook = self
+        self.port = self.http_server.server_address[1]
+        threading.Thread(target=self.http_server.serve_forever, daemon=True).start()
+        logger.info(f"Fake webhook běží: {self.url}")
+        return self
+
+    def stop(self):
+        if self.http_server:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Lokální fake Binance futures API')
+    parser.add_argument('--symbols', type=int, default=100, help='Počet symbolů na trhu')
+    parser.add_argument('--history-days', type=int, default=60, help='Délka generované historie ve dnech')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--rest-port', type=int, default=9001)
+    parser.add_argument('--ws-port', type=int, default=9002)
+    parser.add_argument('--tick', type=float, default=1.0, help='Interval změny cen a WebSocket událostí (s)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency', type=float, default=0.0, help='Pevná latence odpovědí (s)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Náhodná latence navíc 0..jitter (s)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Podíl požadavků s vynucenou chybou 429')
+    parser.add_argument('--weight-limit', type=int, default=0, help='Limit váhy za minutu (0 = bez limitu)')
+    parser.add_argument('--ban-after', type=int, default=3, help='Počet překročení limitu za minutu před banem 418')
+    parser.add_argument('--ban-seconds', type=int, default=60, help='Délka banu (s)')
+    parser.add_argument('--recording', help='Přehrávat nahrané svíčky ze souboru místo syntetického trhu')
+    parser.add_argument('--record', metavar='OUTPUT', help='Nahrát svíčky ze skutečného Binance API do souboru a skončit')
+    parser.add_argument('--webhook-port', type=int, default=0, help='Spustit i náhradu webhooku pro alerty (0 = ne)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.record:
+        count = record(args.record, args.symbols, args.history_days)
+        logger.info(f"Uloženo {count} symbolů do {args.record}")
+        return
+
+    if args.recording:
+        market = FakeMarket.from_recording(args.recording, seed=args.seed)
+    else:
+        market = FakeMarket(symbols=args.symbols, history_days=args.history_days, seed=args.seed)
+    server = FakeBinanceServer(market, args.host, args.rest_port, args.ws_port, args.tick,
+                               latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                               weight_limit=args.weight_limit, ban_after=args.ban_after,
+                               ban_seconds=args.ban_seconds).start()
+    webhook = FakeWebhookServer(args.host, args.webhook_port).start() if args.webhook_port else None
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+        if webhook:
+            webhook.stop()
+
+if __name__ == '__main__':
+    main()
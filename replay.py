@@ -0,0 +1,397 @@
+"""
+Replay / backtest RSI scanneru nad nahranou historií svíček.
+
+Nahrané 15m svíčky se přehrají přes stejný výpočet RSI, trendů a pravidel skenu
+jako v app.py. V každé 15m svíčce se vyhodnotí všechny symboly najednou - 1h a 1d
+svíčky se skládají z 15m na UTC hranicích a tvořící se svíčka má cenu aktuální 15m
+svíčky, stejně jako při živém skenu. Výstupem jsou signály a statistiky výnosů po nich.
+
+Data jsou sloupcový soubor NumPy .npz: symbols, open_time (15m mřížka) a matice
+open/high/low/close/volume (symboly x svíčky, NaN tam, kde symbol neobchodoval).
+
+Použití:
+    python replay.py build data.npz --symbols 300 --days 90       # syntetický trh z fake_binance
+    python replay.py build data.npz --recording recording.json    # nahrávka z fake_binance.py --record
+    python replay.py run data.npz                                 # signály a výnosy po 1h/4h/1d
+    python replay.py run data.npz --horizons 4 16 96 --signals signals.csv --output replay.jsonl
+
+Prahy a pravidla skenu se berou z prostředí stejně jako v aplikaci (RSI_HIGH, RSI_LOW,
+SCREEN_HIGH, SCREEN_LOW) - podmínky SCREEN_* ale smí používat jen sloupce REPLAY_COLUMNS.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Replay nesmí sahat na reálné Binance API
+os.environ.setdefault('BINANCE_FUTURES_URL', 'http://127.0.0.1:9/fapi')
+# ani na perzistentní cache - import app by ji obnovil a publikace syntetických dat přepsala
+os.environ.setdefault('CANDLE_CACHE_PATH', '')
+
+import app
+from fake_binance import BASE_INTERVAL, INTERVAL_MS, FakeMarket
+
+OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# Sloupce tabulky, které replay umí spočítat pro pravidla skenu
+REPLAY_COLUMNS = ('symbol', 'rsi_1h', 'rsi_15m', 'rsi_1d', 'price')
+
+# Timeframe a jeho sloupec RSI
+REPLAY_INTERVALS = {
+    app.Client.KLINE_INTERVAL_1HOUR: 'rsi_1h',
+    app.Client.KLINE_INTERVAL_15MINUTE: 'rsi_15m',
+    app.Client.KLINE_INTERVAL_1DAY: 'rsi_1d'
+}
+
+def save_recording(path, series_by_symbol):
+    """
+    Uloží 15m svíčky symbolů do .npz na společnou časovou mřížku
+
+    Args:
+        path: Cílový soubor
+        series_by_symbol: Dict symbol -> dict NumPy polí (open_time + OHLCV)
+
+    Returns:
+        Tuple (počet symbolů, počet svíček mřížky)
+    """
+    step = INTERVAL_MS[BASE_INTERVAL]
+    first = min(int(series['open_time'][0]) for series in series_by_symbol.values())
+    last = max(int(series['open_time'][-1]) for series in series_by_symbol.values())
+    open_time = np.arange(first, last + step, step, dtype=np.int64)
+
+    columns = {name: np.full((len(series_by_symbol), len(open_time)), np.nan) for name in OHLCV_COLUMNS}
+    for row, series in enumerate(series_by_symbol.values()):
+        indexes = (np.asarray(series['open_time'], dtype=np.int64) - first) // step
+        for name in OHLCV_COLUMNS:
+            columns[name][row, indexes] = series[name]
+
+    np.savez_compressed(path, symbols=np.array(list(series_by_symbol)), open_time=open_time, **columns)
+    return len(series_by_symbol), len(open_time)
+
+def load_recording(path):
+    """Načte nahrávku z .npz jako dict NumPy polí"""
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+def timeframe_rsi(closes, open_time, interval, periods=14):
+    """
+    RSI timeframe v každé 15m svíčce - tvořící se svíčka s aktuální cenou nad
+    Wilderovými průměry uzavřených svíček (jako RsiState.provisional)
+
+    Args:
+        closes: 15m uzavírací ceny (symboly x svíčky) bez NaN
+        open_time: Časy otevření 15m svíček
+        interval: Timeframe (15m, 1h, 1d)
+        periods: Perioda RSI
+
+    Returns:
+        Tuple (RSI tvořící se svíčky v každé 15m svíčce, RSI po každé uzavřené svíčce
+        timeframe, index svíčky timeframe pro každou 15m svíčku)
+    """
+    buckets = open_time // INTERVAL_MS[interval]
+    boundaries = buckets[1:] != buckets[:-1]
+    candle = np.concatenate(([0], np.cumsum(boundaries)))
+    closed = closes[:, np.flatnonzero(np.append(boundaries, True))]
+
+    avg_gain = np.full(closed.shape, np.nan)
+    avg_loss = np.full(closed.shape, np.nan)
+    if closed.shape[1] >= periods:
+        for i, gain, loss in app.wilder_steps(closed, periods):
+            avg_gain[:, i] = gain
+            avg_loss[:, i] = loss
+
+    # Historie RSI uzavřených svíček (jako rsi_series_matrix - první SMA ještě bez hodnoty)
+    closed_rsi = app.rsi_from_averages_array(avg_gain, avg_loss)
+    closed_rsi[:, :periods] = np.nan
+
+    # Tvořící se svíčka: jeden Wilderův krok od poslední uzavřené svíčky s aktuální cenou
+    previous = np.maximum(candle - 1, 0)
+    delta = closes - closed[:, previous]
+    gain = (avg_gain[:, previous] * (periods - 1) + np.where(delta > 0, delta, 0.0)) / periods
+    loss = (avg_loss[:, previous] * (periods - 1) + np.where(delta < 0, -delta, 0.0)) / periods
+    forming = app.rsi_from_averages_array(gain, loss)
+    forming[:, candle < periods] = np.nan
+
+    return forming, closed_rsi, candle
+
+def signal_trends(forming, closed_rsi, candle, rows, steps):
+    """
+    Trend RSI v okamžiku signálů - sklon přes posledních TREND_WINDOW bodů historie
+    (uzavřené svíčky + tvořící se svíčka), stejně jako determine_trend
+    """
+    offsets = np.arange(-(app.TREND_WINDOW - 1), 0)
+    indexes = candle[steps][:, np.newaxis] + offsets
+    window = np.where(indexes >= 0, closed_rsi[rows[:, np.newaxis], np.maximum(indexes, 0)], np.nan)
+    window = np.hstack((window, forming[rows, steps][:, np.newaxis]))
+
+    trends = np.full(len(rows), "stable", dtype=object)
+    complete = ~np.isnan(window).any(axis=1)
+    if complete.any():
+        trends[complete] = app.classify_trend(app.rsi_slope(window[complete]))
+    return trends
+
+def replay_group(symbols, open_time, closes, valid, horizons, entries_only, timings):
+    """
+    Přehraje skupinu symbolů se stejným začátkem historie
+
+    Returns:
+        Tuple (DataFrame signálů, dict horizont -> výnosy všech platných svíček pro srovnání s trhem)
+    """
+    columns = {'price': closes}
+    timeframes = {}
+    for interval, column in REPLAY_INTERVALS.items():
+        started = time.perf_counter()
+        timeframes[interval] = timeframe_rsi(closes, open_time, interval)
+        columns[column] = timeframes[interval][0]
+        timings[f"rsi_{interval}"] = timings.get(f"rsi_{interval}", 0.0) + time.perf_counter() - started
+
+    # Pravidla skenu pro všechny symboly a svíčky najednou (sloupce zploštělé do jedné tabulky)
+    started = time.perf_counter()
+    shape = closes.shape
+    flat = {name: values.ravel() for name, values in columns.items()}
+    high, low = app.screen_masks(np.repeat(np.asarray(symbols, dtype=object), shape[1]), flat)
+    high = high.reshape(shape) & valid
+    low = low.reshape(shape) & valid
+    if entries_only:
+        # Jen vstupy do výsledků - symbol, který v nich zůstává, nedává nový signál
+        high[:, 1:] &= ~high[:, :-1]
+        low[:, 1:] &= ~low[:, :-1]
+    timings['screen'] = timings.get('screen', 0.0) + time.perf_counter() - started
+
+    started = time.perf_counter()
+    frames = []
+    positions = []
+    for side, mask in (('SHORT', high), ('LONG', low)):
+        rows, steps = np.nonzero(mask)
+        positions.append((rows, steps))
+        frame = {
+            'open_time': open_time[steps],
+            'symbol': np.asarray(symbols)[rows],
+            'side': side,
+            'price': closes[rows, steps]
+        }
+        for interval, column in REPLAY_INTERVALS.items():
+            forming, closed_rsi, candle = timeframes[interval]
+            frame[column] = forming[rows, steps]
+            frame[f"trend{'' if column == 'rsi_1h' else column[3:]}"] = signal_trends(forming, closed_rsi, candle, rows, steps)
+        frames.append(pd.DataFrame(frame))
+    signals = pd.concat(frames, ignore_index=True)
+    timings['trends'] = timings.get('trends', 0.0) + time.perf_counter() - started
+
+    # Výnosy po signálu a výnosy všech platných svíček (srovnání s trhem)
+    started = time.perf_counter()
+    rows = np.concatenate([rows for rows, _ in positions])
+    steps = np.concatenate([steps for _, steps in positions])
+    market = {}
+    for horizon in horizons:
+        target = steps + horizon
+        inside = target < shape[1]
+        future = np.full(len(steps), np.nan)
+        future[inside] = np.where(valid[rows[inside], target[inside]], closes[rows[inside], target[inside]], np.nan)
+        signals[f"return_{horizon}"] = (future / signals['price'].to_numpy() - 1) * 100
+
+        if shape[1] > horizon:
+            both = valid[:, :-horizon] & valid[:, horizon:] & ~np.isnan(columns['rsi_1h'][:, :-horizon])
+            market[horizon] = ((closes[:, horizon:] / closes[:, :-horizon] - 1) * 100)[both]
+        else:
+            market[horizon] = np.array([])
+    timings['returns'] = timings.get('returns', 0.0) + time.perf_counter() - started
+
+    return signals, market
+
+def replay(recording, horizons, entries_only=True):
+    """
+    Přehraje celou nahrávku - symboly se seskupí podle začátku historie
+    a každá skupina se vyhodnotí jedním vektorovým průchodem
+
+    Returns:
+        Tuple (DataFrame signálů, dict horizont -> výnosy trhu, dict časů fází)
+    """
+    symbols = recording['symbols']
+    open_time = recording['open_time']
+    closes = recording['close']
+    valid = ~np.isnan(closes)
+    first = np.where(valid.any(axis=1), valid.argmax(axis=1), -1)
+
+    timings = {}
+    signals = []
+    market = {horizon: [] for horizon in horizons}
+    for start in np.unique(first[first >= 0]):
+        rows = np.flatnonzero(first == start)
+        # Díry v datech překlene poslední známá cena, signály v nich ale nevznikají
+        group = pd.DataFrame(closes[rows, start:].T).ffill().to_numpy().T
+        group_signals, group_market = replay_group(
+            symbols[rows], open_time[start:], group, valid[rows, start:], horizons, entries_only, timings)
+        signals.append(group_signals)
+        for horizon, values in group_market.items():
+            market[horizon].append(values)
+
+    signals = pd.concat(signals, ignore_index=True) if signals else pd.DataFrame()
+    market = {horizon: np.concatenate(values) if values else np.array([]) for horizon, values in market.items()}
+    if len(signals):
+        signals = signals.sort_values(['open_time', 'symbol'], kind='stable', ignore_index=True)
+    return signals, market, timings
+
+def summarize(signals, market, horizons):
+    """
+    Statistiky výnosů po signálech pro každou stranu a horizont
+
+    Úspěšnost je podíl signálů, po kterých se cena pohnula ve směru signálu
+    (SHORT dolů, LONG nahoru). Náskok je průměrný výnos ve směru signálu
+    nad průměrným výnosem všech symbolů a svíček trhu.
+    """
+    summary = {}
+    for side, direction in (('SHORT', -1), ('LONG', 1)):
+        subset = signals[signals['side'] == side] if len(signals) else signals
+        summary[side] = {'signals': int(len(subset)), 'horizons': {}, 'by_trend': {}}
+        for horizon in horizons:
+            returns = subset[f"return_{horizon}"].dropna().to_numpy() if len(subset) else np.array([])
+            baseline = float(market[horizon].mean()) if len(market[horizon]) else None
+            stats = {'count': int(len(returns))}
+            if len(returns):
+                stats.update({
+                    'mean': float(returns.mean()),
+                    'median': float(np.median(returns)),
+                    'hit_rate': float((returns * direction > 0).mean() * 100),
+                    'edge': float(direction * (returns.mean() - baseline)) if baseline is not None else None
+                })
+            summary[side]['horizons'][horizon] = stats
+        if len(subset):
+            first = horizons[0]
+            for trend, group in subset.groupby('trend'):
+                returns = group[f"return_{first}"].dropna()
+                summary[side]['by_trend'][trend] = {
+                    'signals': int(len(group)),
+                    f"mean_{first}": float(returns.mean()) if len(returns) else None
+                }
+    summary['market'] = {horizon: {'count': int(len(values)), 'mean': float(values.mean()) if len(values) else None}
+                         for horizon, values in market.items()}
+    return summary
+
+def format_pct(value):
+    return f"{value:+8.3f} %" if value is not None else f"{'-':>10}"
+
+def print_summary(summary, horizons):
+    print(f"{'strana':<7} {'horizont':>9} {'signálů':>8} {'průměr':>10} {'medián':>10} {'úspěšnost':>10} {'náskok':>10}")
+    for side in ('SHORT', 'LONG'):
+        for horizon in horizons:
+            stats = summary[side]['horizons'][horizon]
+            hit_rate = f"{stats['hit_rate']:8.1f} %" if 'hit_rate' in stats else f"{'-':>10}"
+            print(f"{side:<7} {horizon * 15:>7}m {stats['count']:>8} {format_pct(stats.get('mean'))} "
+                  f"{format_pct(stats.get('median'))} {hit_rate} {format_pct(stats.get('edge'))}")
+    for horizon in horizons:
+        market = summary['market'][horizon]
+        print(f"{'trh':<7} {horizon * 15:>7}m {market['count']:>8} {format_pct(market['mean'])}")
+    for side in ('SHORT', 'LONG'):
+        trends = ', '.join(f"{trend} {stats['signals']}" for trend, stats in sorted(summary[side]['by_trend'].items()))
+        if trends:
+            print(f"{side} podle 1h trendu: {trends}")
+
+def check_screen_rules():
+    """Ověří, že pravidla skenu používají jen sloupce, které replay počítá"""
+    unsupported = sorted({field for field, _, _ in app.SCREEN_HIGH + app.SCREEN_LOW if field not in REPLAY_COLUMNS})
+    if unsupported:
+        print(f"Pravidla skenu používají sloupce, které replay nepočítá: {', '.join(unsupported)}")
+        return False
+    return True
+
+def command_build(args):
+    """Vytvoří .npz nahrávku ze syntetického trhu nebo z JSON nahrávky fake_binance.py --record"""
+    if args.recording:
+        with open(args.recording) as f:
+            recording = json.load(f)
+        series = {}
+        for symbol, rows in recording.items():
+            data = np.array(rows, dtype=np.float64)
+            if not len(data):
+                continue
+            series[symbol] = {'open_time': data[:, 0].astype(np.int64),
+                              **{name: data[:, i + 1] for i, name in enumerate(OHLCV_COLUMNS)}}
+    else:
+        market = FakeMarket(args.symbols, history_days=args.days, seed=args.seed)
+        series = {symbol: market.candles(symbol, BASE_INTERVAL) for symbol in market.symbols}
+
+    symbols, candles = save_recording(args.path, series)
+    print(f"Uloženo {symbols} symbolů x {candles} svíček {BASE_INTERVAL} do {args.path}")
+    return 0
+
+def command_run(args):
+    """Přehraje nahrávku a vypíše statistiky signálů"""
+    if not check_screen_rules():
+        return 1
+    horizons = sorted(set(args.horizons))
+
+    started = time.perf_counter()
+    recording = load_recording(args.path)
+    load_time = time.perf_counter() - started
+    symbols, candles = recording['close'].shape
+
+    started = time.perf_counter()
+    signals, market, timings = replay(recording, horizons, entries_only=not args.all_steps)
+    replay_time = time.perf_counter() - started
+    summary = summarize(signals, market, horizons)
+
+    days = candles * INTERVAL_MS[BASE_INTERVAL] / INTERVAL_MS['1d']
+    print(f"Nahrávka: {symbols} symbolů x {candles} svíček {BASE_INTERVAL} ({days:.0f} dní), "
+          f"prahy RSI {app.RSI_HIGH:g}/{app.RSI_LOW:g}, {'všechny svíčky' if args.all_steps else 'jen vstupy do výsledků'}")
+    print(f"Načtení {load_time:.2f} s, replay {replay_time:.2f} s "
+          f"({symbols * candles / replay_time / 1e6:.1f} M symbol-svíček/s): "
+          + ', '.join(f"{name} {seconds:.2f} s" for name, seconds in timings.items()))
+    print_summary(summary, horizons)
+
+    if args.signals:
+        output = signals.copy()
+        if len(output):
+            output.insert(0, 'time', pd.to_datetime(output.pop('open_time'), unit='ms', utc=True)
+                          + pd.Timedelta(milliseconds=INTERVAL_MS[BASE_INTERVAL]))
+        output.round(4).to_csv(args.signals, index=False)
+        print(f"Signály uloženy do {args.signals}")
+
+    if args.output:
+        record = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'file': args.path,
+            'symbols': symbols,
+            'candles': candles,
+            'rsi_high': app.RSI_HIGH,
+            'rsi_low': app.RSI_LOW,
+            'entries_only': not args.all_steps,
+            'load_seconds': round(load_time, 3),
+            'replay_seconds': round(replay_time, 3),
+            'timings': {name: round(seconds, 3) for name, seconds in timings.items()},
+            'summary': summary
+        }
+        with open(args.output, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay / backtest RSI scanneru nad nahranými svíčkami')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='Vytvořit .npz nahrávku 15m svíček')
+    build.add_argument('path', help='Cílový soubor .npz')
+    build.add_argument('--recording', help='JSON nahrávka z fake_binance.py --record (jinak syntetický trh)')
+    build.add_argument('--symbols', type=int, default=300)
+    build.add_argument('--days', type=int, default=90)
+    build.add_argument('--seed', type=int, default=42)
+    build.set_defaults(func=command_build)
+
+    run = subparsers.add_parser('run', help='Přehrát nahrávku a spočítat výnosy po signálech')
+    run.add_argument('path', help='Soubor .npz z příkazu build')
+    run.add_argument('--horizons', type=int, nargs='+', default=[4, 16, 96], help='Horizonty výnosů v 15m svíčkách')
+    run.add_argument('--all-steps', action='store_true',
+                     help='Signál v každé svíčce, kdy symbol splňuje pravidla (výchozí jen vstupy do výsledků)')
+    run.add_argument('--signals', help='Uložit signály do CSV')
+    run.add_argument('--output', help='Připsat souhrn do souboru JSON lines')
+    run.set_defaults(func=command_run)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+if __name__ == '__main__':
+    main()